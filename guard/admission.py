@@ -0,0 +1,148 @@
+# guard/admission.py
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import discord
+
+from .schemas import EventKind
+from .config import Config
+from .cache import LRUTTLCache
+from . import metrics
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "t")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate, self.burst = rate, max(1.0, burst)
+        self.tokens, self.t = self.burst, now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+@dataclass(frozen=True)
+class Admit:
+    """메시지 1건에 허용된 처리 범위 (텍스트 점수화는 항상 수행 — 가장 싸고 주 탐지 수단)"""
+    fast: bool = False          # 이미 제재 중인 유저 → 탐지 생략, 정책대로 삭제 + 로그
+    enforced_by: Optional[EventKind] = None   # fast일 때 그 유저를 제재한 탐지 종류
+    qr: bool = True             # 첨부 QR 스캔
+    qr_escalate: bool = True    # QR 단계 확장 + 원본 해상도 폴백
+    qr_max_atts: int = 0        # 스캔할 첨부 수 상한(0=무제한)
+    phash: bool = True          # 온디맨드 아바타 pHash
+    reason: str = ""            # 축소 사유(user_rate|channel_rate|inflight|lag)
+
+FULL = Admit()
+
+class Admission:
+    """
+    레이드 부하 적응형 입장 제어.
+    - 유저/채널 토큰 버킷: 초과분은 비싼 단계부터 축소
+      (유저 초과 → QR 확장·원본 폴백 생략, 1단계 gray_small은 유지 — QR 도배가 곧 탐지 대상이므로;
+       채널 초과 → 확장·pHash 생략)
+    - 제재 중(밴/타임아웃 진행·완료) 유저 → 탐지 없이 일괄 삭제 경로
+    - 루프 지연(LoopLag.last) 기준 단계적 셰딩, hold 동안 유지(플래핑 방지)
+        L1 ≥ shed_lag_sec: QR 확장/원본 폴백·pHash·아바타 이벤트 스캔 중단
+        L2 ≥ 2×shed_lag_sec: + 메시지당 첫 첨부만 QR 스캔
+    - 처리 중 메시지 수 상한 초과 → 새 메시지는 텍스트만(대기 코루틴 적체 방지)
+    """
+    def __init__(self, cfg: Config, enforcer=None, lag=None):
+        self.cfg = cfg
+        self.enforcer = enforcer
+        self.lag = lag              # monitor.LoopLag (app에서 연결, .last 사용)
+        self.inflight = 0
+        self._users = LRUTTLCache("admit_users", cfg.cache_max_users, 3600)
+        self._channels = LRUTTLCache("admit_channels", 10_000, 3600)
+        self._lvl = 0
+        self._until = 0.0
+
+    # --- 지연 기반 셰딩 레벨 --------------------------------------------------
+    def level(self) -> int:
+        thr = self.cfg.shed_lag_sec
+        if thr <= 0 or self.lag is None:
+            return 0
+        lag = self.lag.last
+        now = time.monotonic()
+        want = 2 if lag >= 2 * thr else 1 if lag >= thr else 0
+        if want >= self._lvl:
+            if want != self._lvl:
+                metrics.inc("shed_level_change", to=want)
+            self._lvl = want
+            if want:
+                self._until = now + self.cfg.shed_hold_sec
+        elif now >= self._until:
+            metrics.inc("shed_level_change", to=want)
+            self._lvl = want
+        metrics.set_gauge("shed_level", self._lvl)
+        return self._lvl
+
+    def shedding(self) -> bool:
+        return self.level() >= 1
+
+    # --- 메시지 입장 -----------------------------------------------------------
+    def _bucket_ok(self, msg: discord.Message, now: float) -> tuple[bool, bool]:
+        cfg = self.cfg
+        user_ok = chan_ok = True
+        if cfg.admit_user_rate > 0:
+            uid = msg.author.id
+            b = self._users.get(uid)
+            if b is None:
+                b = TokenBucket(cfg.admit_user_rate, cfg.admit_user_burst, now)
+                self._users.set(uid, b)
+            user_ok = b.take(now)
+        if cfg.admit_channel_rate > 0:
+            ch = getattr(msg.channel, "id", 0)
+            b = self._channels.get(ch)
+            if b is None:
+                b = TokenBucket(cfg.admit_channel_rate, cfg.admit_channel_burst, now)
+                self._channels.set(ch, b)
+            chan_ok = b.take(now)
+        return user_ok, chan_ok
+
+    def _enforced(self, msg: discord.Message) -> Optional[EventKind]:
+        if not self.cfg.admit_fast_path or self.enforcer is None:
+            return None
+        return self.enforcer.enforced(getattr(msg.guild, "id", 0), msg.author.id)
+
+    def admit(self, msg: discord.Message) -> Admit:
+        kind = self._enforced(msg)
+        if kind:
+            metrics.inc("admission", decision="fast")
+            return Admit(fast=True, enforced_by=kind, reason="enforced")
+
+        now = time.monotonic()
+        user_ok, chan_ok = self._bucket_ok(msg, now)
+        lvl = self.level()
+        over = self.cfg.admit_max_inflight and self.inflight >= self.cfg.admit_max_inflight
+        if user_ok and chan_ok and not lvl and not over:
+            metrics.inc("admission", decision="ok")
+            return FULL
+
+        qr, esc, phash, max_atts = True, True, True, 0
+        reasons = []
+        if not user_ok:
+            esc = False; reasons.append("user_rate")
+        if not chan_ok:
+            esc = phash = False; reasons.append("channel_rate")
+        if over:
+            qr = False; reasons.append("inflight")
+        if lvl:
+            esc = phash = False; reasons.append(f"lag{lvl}")
+            if lvl >= 2:
+                max_atts = 1
+        metrics.inc("admission", decision="degraded")
+        return Admit(qr=qr, qr_escalate=esc, qr_max_atts=max_atts, phash=phash, reason="+".join(reasons))
+
+    def enter(self):
+        self.inflight += 1
+        metrics.set_gauge("admission_inflight", self.inflight)
+
+    def leave(self):
+        self.inflight -= 1
+
+def shed(stage: str, reason: str):
+    metrics.inc("shed", stage=stage, reason=reason or "-")
@@ -1,35 +1,125 @@
 # guard/app.py
-import logging, asyncio
+import logging, asyncio, time
 import discord
 from discord.ext import commands
 
-from .config import load_config
-from .rules import load_rules
-from .state import init_state
+from .config import Config, load_config
+from .rules import Rules, load_rules
+from .state import State, init_state
+from .store import Snapshot
+from .reload import LiveRules, Reloader
+from .monitor import MetricsServer
 from .detectors.avatar import load_refs
-from .handlers.on_message_qr import handle_message_qr
-from .handlers.messages import handle_message
+from .handlers.on_message_qr import handle_message_qr, _channel_in_list
+from .handlers.messages import handle_message, handle_enforced_message
+from .handlers.context import MessageContext
+from .admission import FULL
+from . import metrics, trace
+from . import emit as emit_mod
 from .handlers.threads import handle_thread_create
 from .handlers.members import handle_member_join, handle_member_update, handle_user_update
 
+async def _timed(pipeline: str, coro):
+    t0 = time.perf_counter()
+    try:
+        with trace.span(f"pipeline:{pipeline}"):
+            return await coro
+    finally:
+        metrics.observe("pipeline_seconds", time.perf_counter() - t0, pipeline=pipeline)
+
+async def run_pipelines(client, cfg: Config, rules: Rules, state: State, msg: discord.Message,
+                        where: str = "on_message") -> list:
+    """
+    첨부 QR과 텍스트 파이프라인 동시 실행 — 멤버/조인 윈도/지문/제재 1회는 ctx가 공유.
+    반환: 파이프라인별 결과 또는 예외(gather return_exceptions). 리플레이 하네스도 이 경로를 사용.
+    """
+    adm = FULL
+    adm_ctl = state.admission if _admissible(cfg, msg) else None
+    if adm_ctl is not None:
+        adm = adm_ctl.admit(msg)
+        if adm.fast:
+            # 이미 밴/타임아웃 중인 유저 — 탐지 생략, 제재한 탐지 종류의 정책대로 삭제 + 로그
+            with trace.start(where, mid=msg.id, uid=msg.author.id, fast=adm.enforced_by):
+                try:
+                    await handle_enforced_message(client, cfg, state, msg, adm.enforced_by)
+                except Exception as e:
+                    return [e]
+            return []
+    ctx = MessageContext.of(msg, cfg, state, adm)
+    t0 = time.perf_counter()
+    if adm_ctl is not None:
+        adm_ctl.enter()
+    try:
+        with trace.start(where, mid=msg.id, ch=getattr(msg.channel, "id", 0), uid=msg.author.id,
+                         atts=len(msg.attachments or ()), adm=adm.reason or "ok"):
+            results = await asyncio.gather(
+                _timed("qr", handle_message_qr(client, cfg, rules, state, msg, ctx)),
+                _timed("text", handle_message(client, cfg, rules, state, msg, ctx)),
+                return_exceptions=True,
+            )
+    finally:
+        if adm_ctl is not None:
+            adm_ctl.leave()
+    metrics.observe("pipeline_seconds", time.perf_counter() - t0, pipeline="total")
+    return results
+
+def _admissible(cfg: Config, msg: discord.Message) -> bool:
+    # 감시 채널의 일반 유저 메시지만 입장 제어 대상(버킷 소모/빠른 삭제 범위)
+    if not getattr(msg, "guild", None) or msg.author.bot or msg.webhook_id is not None:
+        return False
+    return _channel_in_list(msg, cfg.channel_msg_monitor_ids) or _channel_in_list(msg, cfg.channel_qr_monitor_ids)
+
+class _GuardBot(commands.Bot):
+    async def close(self):
+        # 게이트웨이/HTTP 종료 전에 채널별 큐에 남은 로그 전송
+        d = emit_mod._DISPATCHER
+        if d is not None and d.client is self and not self.is_closed():
+            await d.flush()
+        await super().close()
+
 def create_bot():
     cfg = load_config()
     logging.basicConfig(level=(logging.DEBUG if cfg.debug else logging.INFO))
     log = logging.getLogger("guard.app")
+    trace.configure(cfg.trace_slow_ms, cfg.trace_log_path, cfg.trace_log_max_bytes,
+                    cfg.trace_log_backups, cfg.trace_profile_rate)
 
     intents = discord.Intents.default()
     intents.guilds = True
     intents.members = True
     intents.message_content = True  # 텍스트 감시 채널에서만 사용
-    bot = commands.Bot(command_prefix="!", intents=intents)
+    bot = _GuardBot(command_prefix="!", intents=intents)
     ALLOW_NONE = discord.AllowedMentions.none()
 
-    rules = load_rules(cfg.rules_path)
-    state = init_state(cfg.qr_sem, cfg.phash_sem)
+    live = LiveRules(load_rules(cfg.rules_path))
+    log.info("rules 로드: v=%s (compile %.1fms)", live.rules.version, live.rules.compile_ms)
+    reloader = Reloader(cfg, live)
+    state = init_state(cfg)
+    snapshot = Snapshot(cfg.snapshot_path) if cfg.snapshot_path else None
+    monitor = MetricsServer(cfg, state)
+    if state.admission is not None:
+        state.admission.lag = monitor.lag
+    bg_tasks: list[asyncio.Task] = []
+
+    async def _pipelines(msg: discord.Message, where: str):
+        # 이 메시지는 끝까지 같은 rules 버전으로 처리
+        for r in await run_pipelines(bot, cfg, live.rules, state, msg, where):
+            if isinstance(r, Exception):
+                log.error("%s 오류", where, exc_info=r)
 
     @bot.event
     async def on_ready():
         log.info("로그인: %s (%s)", bot.user, getattr(bot.user, 'id', '?'))
+        # 백그라운드 작업은 1회만 (재연결 시 on_ready가 다시 와도)
+        if not bg_tasks:
+            # 상태 스냅샷 복원 + 주기 체크포인트
+            if snapshot:
+                bg_tasks.append(asyncio.create_task(snapshot.run(state.caches, cfg.snapshot_interval_sec)))
+            # rules.json / 레퍼런스 아바타 핫 리로드 (파일 변경 또는 SIGHUP)
+            reloader.install_signal()
+            bg_tasks.append(asyncio.create_task(reloader.run()))
+            # 루프 지연/시간 집계 + Prometheus 엔드포인트(METRICS_PORT)
+            bg_tasks.extend(await monitor.start())
         try:
             n = load_refs(cfg)
             log.info("아바타 레퍼런스 로드: %d개", n)
@@ -45,52 +135,47 @@ def create_bot():
 
     @bot.event
     async def on_message(msg: discord.Message):
-        try:
-            await handle_message_qr(bot, cfg, rules, state, msg)     # 첨부 QR 상시
-            await handle_message(bot, cfg, rules, state, msg)        # 텍스트 파이프라인
-        except Exception:
-            logging.getLogger("guard.app").exception("on_message 오류")
+        await _pipelines(msg, "on_message")
 
     @bot.event
     async def on_message_edit(before: discord.Message, after: discord.Message):
-        try:
-            await handle_message_qr(bot, cfg, rules, state, after)
-            await handle_message(bot, cfg, rules, state, after)
-        except Exception:
-            logging.getLogger("guard.app").exception("on_message_edit 오류")
+        await _pipelines(after, "on_message_edit")
 
     @bot.event
     async def on_thread_create(thread: discord.Thread):
         try:
-            await handle_thread_create(bot, cfg, rules, state, thread)
+            with trace.start("on_thread_create", thread=thread.id, uid=getattr(thread, "owner_id", 0)):
+                await handle_thread_create(bot, cfg, live.rules, state, thread)
         except Exception:
             logging.getLogger("guard.app").exception("on_thread_create 오류")
 
     @bot.event
     async def on_member_join(m: discord.Member):
         try:
-            await handle_member_join(cfg, rules, state, m)
+            await handle_member_join(cfg, live.rules, state, m)
         except Exception:
             logging.getLogger("guard.app").exception("on_member_join 오류")
 
     @bot.event
     async def on_member_update(before: discord.Member, after: discord.Member):
         try:
-            await handle_member_update(cfg, rules, state, before, after)
+            await handle_member_update(cfg, live.rules, state, before, after)
         except Exception:
             logging.getLogger("guard.app").exception("on_member_update 오류")
 
     @bot.event
     async def on_user_update(before: discord.User, after: discord.User):
         try:
-            await handle_user_update(cfg, rules, state, bot, before, after)
+            await handle_user_update(cfg, live.rules, state, bot, before, after)
         except Exception:
             logging.getLogger("guard.app").exception("on_user_update 오류")
 
     # 외부에서 start() 호출용
     bot._guard_cfg = cfg      # optional: 디버그/명령에서 접근
-    bot._guard_rules = rules
+    bot._guard_rules = live   # LiveRules — 현재 버전은 .rules
     bot._guard_state = state
+    bot._guard_snapshot = snapshot
+    bot._guard_monitor = monitor
     return bot
 
 async def main():
@@ -98,7 +183,19 @@ async def main():
     cfg = bot._guard_cfg
     if not (cfg.token and cfg.guild_id and (cfg.log_qr_channel_id or cfg.log_phish_channel_id)):
         raise SystemExit("환경변수(DISCORD_TOKEN/GUILD_ID/LOG_*_CHANNEL_ID) 필요")
-    await bot.start(cfg.token)
+    try:
+        await bot.start(cfg.token)
+    finally:
+        # 취소(Ctrl+C/SIGTERM)로 빠져나온 경우에도 로그 큐 비우기 → 연결 종료
+        if not bot.is_closed():
+            await bot.close()
+        await bot._guard_state.http.close()
+        await bot._guard_monitor.close()
+        snap = bot._guard_snapshot
+        if snap:
+            n = snap.checkpoint_sync(bot._guard_state.caches)
+            snap.close()
+            logging.getLogger("guard.app").info("종료 체크포인트: %d건", n)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,53 @@
+# guard/bench/fixtures.py
+"""벤치/리플레이용 합성 이미지 (QR, 스크린샷 배경 등)"""
+import io
+import warnings
+
+import numpy as np
+from PIL import Image
+import zxingcpp
+
+def qr_image(text: str, module_px: int = 4) -> Image.Image:
+    """QR 심볼(quiet zone 포함) 그레이 이미지. zxing-cpp 3.x create_barcode, 구버전은 write_barcode"""
+    fmt = zxingcpp.BarcodeFormat.QRCode
+    if hasattr(zxingcpp, "create_barcode"):
+        arr = np.asarray(zxingcpp.create_barcode(text, fmt).to_image(scale=module_px))
+    else:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            arr = np.asarray(zxingcpp.write_barcode(fmt, text, 0, 0))
+        arr = np.kron(arr, np.ones((module_px, module_px), dtype=arr.dtype))
+    return Image.fromarray(arr.astype(np.uint8), "L")
+
+def screenshot(w: int, h: int, seed: int = 0) -> Image.Image:
+    """휴대폰 스크린샷 비슷한 배경: 밝은 바탕 + 텍스트 줄 모양 블록"""
+    rng = np.random.default_rng(seed)
+    a = np.full((h, w), 235, np.uint8)
+    y = 40
+    while y < h - 30:
+        lh = int(rng.integers(12, 28))
+        x1 = int(rng.integers(20, max(21, w // 3)))
+        x2 = int(rng.integers(min(w - 21, w // 2), w - 20))
+        a[y:y + lh, x1:x2] = rng.integers(40, 120, size=(lh, x2 - x1), dtype=np.uint8) // 40 * 40
+        y += lh + int(rng.integers(10, 40))
+    return Image.fromarray(a, "L")
+
+def photo_noise(w: int, h: int, seed: int = 0) -> Image.Image:
+    """QR 없는 사진형 이미지(저주파 + 노이즈)"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, size=(max(2, h // 64), max(2, w // 64)), dtype=np.uint8)
+    base = np.asarray(Image.fromarray(small, "L").resize((w, h), Image.BILINEAR), dtype=np.int16)
+    a = np.clip(base + rng.normal(0, 12, size=(h, w)), 0, 255).astype(np.uint8)
+    return Image.fromarray(a, "L")
+
+def paste_qr(bg: Image.Image, text: str, side: int, pos=None) -> Image.Image:
+    q = qr_image(text).resize((side, side), Image.NEAREST)
+    out = bg.copy()
+    x, y = pos if pos else ((bg.width - side) // 2, (bg.height - side) // 2)
+    out.paste(q, (x, y))
+    return out
+
+def encode(img: Image.Image, fmt: str = "PNG", **kw) -> bytes:
+    b = io.BytesIO()
+    img.convert("RGB" if fmt.upper() in ("JPEG", "WEBP") else img.mode).save(b, fmt, **kw)
+    return b.getvalue()
@@ -0,0 +1,58 @@
+# guard/bench/phash_index.py
+"""
+pHash 레퍼런스 인덱스 조회 비용 벤치.
+실행: python -m guard.bench.phash_index [--sizes 10000,100000] [--queries 200] [--k 5]
+"""
+import argparse, time
+
+import numpy as np
+import imagehash
+
+from ..detectors.phash_index import PHashIndex
+
+def _int_to_imagehash(v: int) -> imagehash.ImageHash:
+    bits = np.unpackbits(np.frombuffer(int(v).to_bytes(8, "big"), dtype=np.uint8)).astype(bool)
+    return imagehash.ImageHash(bits.reshape(8, 8))
+
+def _bench_index(idx: PHashIndex, queries: np.ndarray, k: int) -> float:
+    t = time.perf_counter()
+    for q in queries:
+        idx.topk(int(q), k)
+    return (time.perf_counter() - t) / len(queries)
+
+def _bench_legacy(refs: list, queries: np.ndarray) -> float:
+    # 기존 _min_dist 방식: ImageHash 객체 하나씩 빼기
+    qs = [_int_to_imagehash(int(q)) for q in queries]
+    t = time.perf_counter()
+    for q in qs:
+        best = 999
+        for _, h in refs:
+            d = int(q - h)
+            if d < best: best = d
+    return (time.perf_counter() - t) / len(qs)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--legacy-queries", type=int, default=3, help="기존 루프 비교용 쿼리 수(0=생략)")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'refs':>8} {'index/query':>14} {'legacy/query':>14} {'speedup':>8}")
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        vals = rng.integers(0, 2**63, size=n, dtype=np.uint64) | (rng.integers(0, 2, size=n, dtype=np.uint64) << np.uint64(63))
+        idx = PHashIndex.build((f"ref{i}", int(v)) for i, v in enumerate(vals))
+        queries = rng.integers(0, 2**63, size=args.queries, dtype=np.uint64)
+        t_idx = _bench_index(idx, queries, args.k)
+        t_old = None
+        if args.legacy_queries > 0:
+            refs = [(f"ref{i}", _int_to_imagehash(int(v))) for i, v in enumerate(vals)]
+            t_old = _bench_legacy(refs, queries[: args.legacy_queries])
+        old_s = f"{t_old * 1e3:11.2f} ms" if t_old else f"{'-':>14}"
+        sp = f"{t_old / t_idx:7.0f}x" if t_old else f"{'-':>8}"
+        print(f"{n:>8} {t_idx * 1e3:11.3f} ms {old_s} {sp}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# guard/bench/qr_corpus.py
+"""
+QR 디코더 벤치 — 라벨 달린 합성 코퍼스(결정적 시드)로 detectors.qr 디코드 파이프라인 측정.
+양성: 크기/회전/반전/JPEG 품질/노이즈/대형 스크린샷 삽입, 음성: QR 없는 스크린샷·사진·다른 바코드.
+보고: 그룹별 recall, 오탐, 평균/p99 디코드 시간, 이미지당 read_barcodes 호출 수, 히트 단계 분포.
+
+실행:
+  python -m guard.bench.qr_corpus [--seed 0] [--json out.json] [--compare base.json]
+  python -m guard.bench.qr_corpus --matrix            # 단계(변형) × 바이너라이저 조합별 단독 히트율
+  python -m guard.bench.qr_corpus --save DIR          # 코퍼스 이미지 + labels.jsonl 저장
+  python -m guard.bench.qr_corpus --corpus DIR        # 저장/수집한 코퍼스로 실행(labels.jsonl)
+버전 간 비교: 같은 시드 → 같은 코퍼스(digest 일치 확인), --json 결과를 --compare로 대조.
+"""
+import argparse, hashlib, io, json, os, subprocess, time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image, ImageOps
+import zxingcpp
+
+from ..config import load_config
+from ..detectors.qr import _decode_job, _read, _stages, _BIN, _SMALL_SIDE
+from . import fixtures
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    data: bytes
+    text: Optional[str]                 # None = 음성
+    tags: dict = field(default_factory=dict)
+
+# --- 코퍼스 생성 -------------------------------------------------------------------
+
+def _on_canvas(q: Image.Image, pad: int = 40) -> Image.Image:
+    out = Image.new("L", (q.width + pad * 2, q.height + pad * 2), 255)
+    out.paste(q, (pad, pad))
+    return out
+
+def _noise(img: Image.Image, sigma: float, rng: np.random.Generator) -> Image.Image:
+    a = np.asarray(img, dtype=np.float32)
+    return Image.fromarray(np.clip(a + rng.normal(0, sigma, a.shape), 0, 255).astype(np.uint8), "L")
+
+def _other_barcode(text: str, rng: np.random.Generator) -> Image.Image:
+    fmts = [getattr(zxingcpp.BarcodeFormat, n) for n in ("DataMatrix", "Aztec", "Code128") if hasattr(zxingcpp.BarcodeFormat, n)]
+    fmt = fmts[int(rng.integers(len(fmts)))]
+    if hasattr(zxingcpp, "create_barcode"):
+        arr = np.asarray(zxingcpp.create_barcode(text, fmt).to_image(scale=4))
+    else:
+        arr = np.asarray(zxingcpp.write_barcode(fmt, text, 0, 0))
+    return _on_canvas(Image.fromarray(arr.astype(np.uint8), "L"))
+
+def build_corpus(seed: int = 0, scale: int = 1) -> List[Case]:
+    """scale: 변형당 반복 수(텍스트/위치만 다름)"""
+    rng = np.random.default_rng(seed)
+    cases: List[Case] = []
+    n = 0
+
+    def text() -> str:
+        nonlocal n
+        n += 1
+        return f"https://pubg-gift.example/r/{seed}-{n}-{int(rng.integers(1e9))}"
+
+    def add(group: str, img: Image.Image, t: Optional[str], fmt: str = "PNG", **tags):
+        kw = {"quality": tags["quality"]} if "quality" in tags else {}
+        cases.append(Case(f"{group}-{len(cases):04d}", group, fixtures.encode(img, fmt, **kw), t, tags))
+
+    for _ in range(scale):
+        for side in (60, 90, 140, 250, 500):
+            t = text(); add("size", _on_canvas(fixtures.qr_image(t).resize((side, side), Image.NEAREST)), t, side=side)
+        for deg in (0, 10, 30, 45, 90, 180):
+            t = text()
+            q = _on_canvas(fixtures.qr_image(t).resize((300, 300), Image.NEAREST))
+            add("rotate", q.rotate(deg, resample=Image.BILINEAR, expand=True, fillcolor=255), t, deg=deg)
+        for side in (150, 400):
+            t = text(); add("invert", ImageOps.invert(_on_canvas(fixtures.qr_image(t).resize((side, side), Image.NEAREST))), t, side=side)
+        for quality in (90, 60, 30, 15):
+            t = text()
+            add("jpeg", fixtures.paste_qr(fixtures.screenshot(1080, 2340, int(rng.integers(1e6))), t, 360), t, "JPEG", quality=quality)
+        for sigma in (10, 30, 60):
+            t = text()
+            add("noise", _noise(_on_canvas(fixtures.qr_image(t).resize((300, 300), Image.NEAREST)), sigma, rng), t, sigma=sigma)
+        for (w, h), side in (((1080, 2340), 240), ((1080, 2340), 600), ((4000, 3000), 300), ((4000, 3000), 900)):
+            t = text()
+            bg = fixtures.screenshot(w, h, int(rng.integers(1e6)))
+            pos = (int(rng.integers(0, w - side)), int(rng.integers(0, h - side)))
+            add("screenshot", fixtures.paste_qr(bg, t, side, pos), t, w=w, h=h, side=side)
+        for (w, h) in ((1080, 2340), (4000, 3000)):
+            add("neg_screenshot", fixtures.screenshot(w, h, int(rng.integers(1e6))), None, w=w, h=h)
+        for (w, h) in ((800, 600), (1920, 1080), (4000, 3000)):
+            add("neg_photo", fixtures.photo_noise(w, h, int(rng.integers(1e6))), None, "JPEG", w=w, h=h, quality=85)
+        for _ in range(2):
+            add("neg_barcode", _other_barcode(text(), rng), None)
+    return cases
+
+def corpus_digest(cases: List[Case]) -> str:
+    h = hashlib.sha1()
+    for c in cases:
+        h.update(c.name.encode()); h.update(c.data); h.update((c.text or "").encode())
+    return h.hexdigest()[:12]
+
+def save_corpus(cases: List[Case], d: str):
+    os.makedirs(d, exist_ok=True)
+    with open(os.path.join(d, "labels.jsonl"), "w", encoding="utf-8") as f:
+        for c in cases:
+            fn = c.name + (".jpg" if c.data[:2] == b"\xff\xd8" else ".png")
+            with open(os.path.join(d, fn), "wb") as g:
+                g.write(c.data)
+            f.write(json.dumps({"file": fn, "group": c.group, "text": c.text, "tags": c.tags}, ensure_ascii=False) + "\n")
+
+def load_corpus(d: str) -> List[Case]:
+    out = []
+    with open(os.path.join(d, "labels.jsonl"), "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            r = json.loads(line)
+            with open(os.path.join(d, r["file"]), "rb") as g:
+                out.append(Case(os.path.splitext(r["file"])[0], r.get("group", "-"), g.read(), r.get("text"), r.get("tags", {})))
+    return out
+
+# --- 실행 ----------------------------------------------------------------------
+
+def _p(xs: list, q: float) -> float:
+    if not xs: return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+def run(cases: List[Case], stage_ms: float, image_ms: float, repeat: int) -> list[dict]:
+    """이미지당 결과(디코드는 봇과 같은 _decode_job: 바이트 → PIL 열기 → 단계 파이프라인)"""
+    rows = []
+    for c in cases:
+        wall = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            res = _decode_job(c.data, stage_ms, image_ms)
+            wall.append((time.perf_counter() - t) * 1000)
+        hit = c.text is not None and c.text in res.texts
+        rows.append({
+            "name": c.name, "group": c.group, "positive": c.text is not None,
+            "hit": hit, "fp": c.text is None and bool(res.texts),
+            "wrong": c.text is not None and bool(res.texts) and not hit,
+            "stage": res.stage, "likely": res.likely, "calls": res.calls,
+            "cpu_ms": res.cpu_ms, "wall_ms": min(wall), "over_budget": res.over_budget,
+        })
+    return rows
+
+def summarize(rows: list[dict]) -> dict:
+    groups = defaultdict(list)
+    for r in rows:
+        groups[r["group"]].append(r)
+    groups["ALL"] = rows
+    out = {}
+    for g, rs in groups.items():
+        pos = [r for r in rs if r["positive"]]
+        ms = [r["wall_ms"] for r in rs]
+        out[g] = {
+            "n": len(rs),
+            "recall": (sum(r["hit"] for r in pos) / len(pos)) if pos else None,
+            "fp": sum(r["fp"] for r in rs),
+            "wrong": sum(r["wrong"] for r in rs),
+            "mean_ms": sum(ms) / len(ms),
+            "p99_ms": _p(ms, .99),
+            "calls": sum(r["calls"] for r in rs) / len(rs),
+            "over_budget": sum(r["over_budget"] for r in rs),
+        }
+    return out
+
+def print_summary(summary: dict, rows: list[dict], base: Optional[dict] = None):
+    print(f"{'그룹':16s} {'n':>4s} {'recall':>7s} {'FP':>3s} {'오독':>4s} {'mean ms':>8s} {'p99 ms':>8s} {'calls':>6s} {'예산초과':>8s}")
+    for g in sorted(summary, key=lambda k: (k == "ALL", k)):
+        s = summary[g]
+        rec = f"{s['recall']:.2f}" if s["recall"] is not None else "-"
+        line = (f"{g:16s} {s['n']:>4d} {rec:>7s} {s['fp']:>3d} {s['wrong']:>4d} "
+                f"{s['mean_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['calls']:>6.2f} {s['over_budget']:>8d}")
+        b = (base or {}).get(g)
+        if b:
+            d_rec = (s["recall"] or 0) - (b["recall"] or 0)
+            line += f"   Δrecall {d_rec:+.2f} Δmean {s['mean_ms'] - b['mean_ms']:+.1f}ms Δcalls {s['calls'] - b['calls']:+.2f}"
+        print(line)
+    stages = Counter(r["stage"] for r in rows if r["stage"])
+    print("\n히트 단계:", dict(stages.most_common()) or "-")
+    misses = [r["name"] for r in rows if r["positive"] and not r["hit"]]
+    if misses:
+        print(f"미검출 {len(misses)}건:", ", ".join(misses[:20]) + (" ..." if len(misses) > 20 else ""))
+    fps = [r["name"] for r in rows if r["fp"]]
+    if fps:
+        print(f"오탐 {len(fps)}건:", ", ".join(fps))
+
+# --- 단계 × 바이너라이저 매트릭스 -----------------------------------------------------
+
+_ALL_BIN = [b for b in (_BIN.LocalAverage, _BIN.GlobalHistogram, _BIN.FixedThreshold, getattr(_BIN, "BoolCast", None)) if b is not None]
+
+def matrix(cases: List[Case]):
+    """양성 이미지마다 각 (단계 이미지, 바이너라이저)를 단독 실행 → 조합별 히트율/평균 시간(사다리 순서 튜닝용)"""
+    tries: Counter = Counter()
+    hits: Counter = Counter()
+    ms: defaultdict = defaultdict(float)
+    pos = [c for c in cases if c.text is not None]
+    for c in pos:
+        with Image.open(io.BytesIO(c.data)) as img:
+            g = img.convert("L")
+        k = max(1, -(-max(g.size) // _SMALL_SIDE))
+        small = g.reduce(k) if k > 1 else g
+        variants = [("gray_small", small)] + [(n, im) for n, im, _ in _stages(g, small)]
+        for name, im in variants:
+            arr = np.ascontiguousarray(np.asarray(im))
+            for b in _ALL_BIN:
+                key = (name, b.name)
+                t = time.perf_counter()
+                ok = c.text in _read(arr, b)
+                ms[key] += (time.perf_counter() - t) * 1000
+                tries[key] += 1
+                hits[key] += ok
+    print(f"\n양성 {len(pos)}장 — 조합별 단독 히트율")
+    print(f"{'단계':14s} {'바이너라이저':16s} {'hit':>5s} {'try':>5s} {'rate':>6s} {'mean ms':>8s}")
+    for key in sorted(tries, key=lambda k: (-hits[k] / tries[k], ms[k] / tries[k])):
+        print(f"{key[0]:14s} {key[1]:16s} {hits[key]:>5d} {tries[key]:>5d} {hits[key] / tries[key]:>6.2f} {ms[key] / tries[key]:>8.1f}")
+
+def _rev() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or "-"
+    except Exception:
+        return "-"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--scale", type=int, default=1, help="변형당 이미지 수")
+    ap.add_argument("--corpus", default="", help="labels.jsonl이 있는 디렉터리(생성 대신 사용)")
+    ap.add_argument("--save", default="", help="생성한 코퍼스 저장 디렉터리")
+    ap.add_argument("--repeat", type=int, default=1, help="이미지당 반복(벽시계 최소값 사용)")
+    ap.add_argument("--matrix", action="store_true", help="단계×바이너라이저 조합별 단독 히트율")
+    ap.add_argument("--json", default="", help="결과 저장(버전 간 비교용)")
+    ap.add_argument("--compare", default="", help="이전 --json 결과와 비교")
+    args = ap.parse_args()
+
+    cfg = load_config()
+    t = time.perf_counter()
+    cases = load_corpus(args.corpus) if args.corpus else build_corpus(args.seed, args.scale)
+    digest = corpus_digest(cases)
+    print(f"코퍼스 {len(cases)}장 (양성 {sum(c.text is not None for c in cases)}) digest={digest} "
+          f"/ 준비 {time.perf_counter() - t:.1f}s / rev {_rev()} / 예산 stage {cfg.qr_stage_budget_ms:g}ms image {cfg.qr_image_budget_ms:g}ms\n")
+    if args.save:
+        save_corpus(cases, args.save)
+
+    base = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            prev = json.load(f)
+        if prev.get("digest") != digest:
+            print(f"경고: 코퍼스 digest 불일치({prev.get('digest')} ≠ {digest}) — 비교 의미 제한적\n")
+        base = prev.get("summary")
+        print(f"기준: rev {prev.get('rev', '-')}\n")
+
+    rows = run(cases, cfg.qr_stage_budget_ms, cfg.qr_image_budget_ms, args.repeat)
+    summary = summarize(rows)
+    print_summary(summary, rows, base)
+    if args.matrix:
+        matrix(cases)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rev": _rev(), "digest": digest, "seed": args.seed, "scale": args.scale,
+                       "summary": summary, "rows": rows}, f, ensure_ascii=False, indent=1)
+
+if __name__ == "__main__":
+    main()
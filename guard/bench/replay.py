@@ -0,0 +1,481 @@
+# guard/bench/replay.py
+"""
+오프라인 리플레이 하네스 — 게이트웨이 없이 실제 핸들러(app.run_pipelines, handle_member_join)에
+녹화/합성 이벤트를 흘려 처리량·단계별 지연·할당량 측정.
+Discord 객체는 최소 스탠드인, REST(밴/삭제/타임아웃/멤버 조회/로그 전송)는 지연만 흉내내는 가짜 계층.
+
+실행:
+  python -m guard.bench.replay --synthetic 2000 [--phish 0.1] [--qr 0.02] [--latency-ms 50]
+  python -m guard.bench.replay --events raid.jsonl [--fixtures DIR] [--speed 1]
+  python -m guard.bench.replay --score-only --synthetic 20000     # score_message 단독 처리량
+  옵션: --miss 0.3 (멤버 캐시 미스 비율 → fetch_member), --alloc (tracemalloc), --dump out.jsonl,
+        --trace-ms 500 [--trace-log slow.log] (느린 이벤트 스팬 트리)
+
+이벤트 JSONL (1줄 1이벤트, t는 초 단위 상대 시각):
+  {"t": 0.12, "type": "message", "user": 11, "channel": 1, "content": "...",
+   "attachments": ["qr1.png"], "joined_days": 2, "name": "닉네임", "avatar": "pubg.png"}
+  {"t": 0.10, "type": "join", "user": 11, "joined_days": 0, "avatar": "pubg.png"}
+  attachments/avatar는 --fixtures 기준 상대 경로(아바타는 PHISH_DIR도 탐색).
+"""
+import argparse, asyncio, dataclasses, io, json, logging, os, random, time, tracemalloc
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import discord
+from PIL import Image
+
+from ..config import Config, load_config
+from ..rules import load_rules
+from ..state import init_state
+from ..monitor import LoopLag
+from ..fetch import FetchRejected, Downloader, sniff
+from ..app import run_pipelines
+from ..handlers.members import handle_member_join
+from ..detectors.avatar import load_refs
+from ..detectors.qr import resized_url
+from ..detectors.message import score_message
+from .. import emit as emit_mod
+from .. import metrics, trace
+from . import fixtures
+
+UTC = timezone.utc
+_GUILD_ID = 1000
+_LOG_QR, _LOG_PHISH = 9001, 9002
+
+# --- 가짜 REST ------------------------------------------------------------------
+
+class FakeREST:
+    """REST 호출 = 지연(평균 latency, ±50% 지터) + 호출 수 집계"""
+    def __init__(self, latency_ms: float, seed: int = 0):
+        self.latency = latency_ms / 1000.0
+        self.calls: Counter = Counter()
+        self._rng = random.Random(seed)
+
+    async def call(self, op: str):
+        self.calls[op] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency * self._rng.uniform(0.5, 1.5))
+
+class FakeAsset:
+    def __init__(self, rest: FakeREST, key: str, data: bytes):
+        self.key, self.url, self._data, self._rest = key, f"replay://avatars/{key}.png", data, rest
+
+    def with_size(self, _):
+        return self
+
+    def with_format(self, _):
+        return self
+
+    async def read(self) -> bytes:
+        await self._rest.call("avatar_read")
+        return self._data
+
+class FakeMember:
+    bot = False
+
+    def __init__(self, guild: "FakeGuild", uid: int, name: str, joined_at: datetime, avatar: FakeAsset):
+        self.guild, self.id, self.display_name, self.name = guild, uid, name, name
+        self.joined_at, self.display_avatar, self.avatar = joined_at, avatar, avatar
+        self.mention = f"<@{uid}>"
+        self.roles = []
+
+    async def ban(self, **kw):
+        await self.guild.rest.call("ban")
+
+    async def edit(self, **kw):
+        await self.guild.rest.call("timeout")
+
+class FakeChannel:
+    parent = None
+
+    def __init__(self, rest: FakeREST, cid: int):
+        self.id, self.rest = cid, rest
+        self.mention = f"<#{cid}>"
+
+    async def send(self, *a, **kw):
+        await self.rest.call("log_send")
+
+    async def delete_messages(self, msgs):
+        await self.rest.call("bulk_delete")
+
+class FakeGuild:
+    def __init__(self, rest: FakeREST, miss: float, seed: int = 0):
+        self.id, self.rest, self.miss = _GUILD_ID, rest, miss
+        self.members: dict[int, FakeMember] = {}
+        self.channels: dict[int, FakeChannel] = {}
+        self._rng = random.Random(seed)
+
+    def get_member(self, uid: int):
+        # 게이트웨이 멤버 캐시 미스 비율 흉내 → resolver가 fetch_member로 감
+        if self.miss and self._rng.random() < self.miss:
+            return None
+        return self.members.get(uid)
+
+    async def fetch_member(self, uid: int):
+        await self.rest.call("fetch_member")
+        m = self.members.get(uid)
+        if m is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Member")
+        return m
+
+    def get_channel_or_thread(self, cid: int):
+        return self.channels.get(cid)
+
+    def channel(self, cid: int) -> FakeChannel:
+        ch = self.channels.get(cid)
+        if ch is None:
+            ch = self.channels[cid] = FakeChannel(self.rest, cid)
+        return ch
+
+class FakeAttachment:
+    def __init__(self, aid: int, name: str, data: bytes):
+        self.id, self.filename, self.size = aid, name, len(data)
+        sn = sniff(data[:65536])
+        fmt, dims = sn if sn else ("png", None)
+        self.content_type = f"image/{fmt}"
+        self.width, self.height = dims if dims else (None, None)
+        self.url = f"replay://att/{aid}/{name}"
+        self.proxy_url = f"replay://proxy/{aid}/{name}"
+
+class FakeMessage:
+    webhook_id = None
+
+    def __init__(self, mid: int, author: FakeMember, channel: FakeChannel, content: str, attachments: list):
+        self.id, self.author, self.guild, self.channel = mid, author, author.guild, channel
+        self.content, self.attachments = content, attachments
+        self.created_at = datetime.now(UTC)
+        self.jump_url = f"replay://{_GUILD_ID}/{channel.id}/{mid}"
+
+    async def delete(self):
+        await self.guild.rest.call("delete")
+
+class FakeClient:
+    def __init__(self, guild: FakeGuild):
+        self.guild = guild
+
+    def get_channel(self, cid: int):
+        return self.guild.channel(cid)
+
+    async def fetch_channel(self, cid: int):
+        return self.guild.channel(cid)
+
+class FakeDownloader:
+    """
+    state.http 대체: replay:// URL → 픽스처 바이트. 프록시 URL의 width/height는 CDN 리사이즈 흉내
+    (put 시점에 미리 만들어 측정 구간 밖). 크기/형식/픽셀 가드는 실제 Downloader 판정(_check_head) 그대로.
+    """
+    def __init__(self, rest: FakeREST, proxy_side: int = 0, min_module: float = 0.0):
+        self.rest = rest
+        self.proxy_side = proxy_side
+        self.min_module = min_module
+        self.blobs: dict[str, bytes] = {}
+
+    def put(self, att: FakeAttachment, data: bytes):
+        self.blobs[att.url] = self.blobs[att.proxy_url] = data
+        small = resized_url(att, self.proxy_side, self.min_module)
+        if small:
+            q = dict(parse_qsl(urlsplit(small).query))
+            img = Image.open(io.BytesIO(data)).resize((int(q["width"]), int(q["height"])), Image.BILINEAR)
+            self.blobs[small] = fixtures.encode(img, "WEBP", quality=80)
+
+    def _get(self, url: str) -> Optional[bytes]:
+        return self.blobs.get(url)
+
+    async def fetch_image(self, url: str, max_bytes: int, max_pixels: int = 0, formats=None) -> bytes:
+        await self.rest.call("cdn_get")
+        data = self._get(url)
+        if data is None:
+            raise FetchRejected("status")
+        if max_bytes and len(data) > max_bytes:
+            raise FetchRejected("too_large", max_bytes)
+        Downloader._check_head(data[:262144], max_pixels, formats, len(data), final=True)
+        return data
+
+    async def close(self):
+        pass
+
+# --- 이벤트 --------------------------------------------------------------------
+
+_BENIGN = [
+    "오늘 듀오 하실 분 구해요", "에란겔 랜딩 어디가 좋아요?", "방금 치킨 먹었다 ㅋㅋ", "스쿼드 한 자리 남았어요",
+    "감도 설정 공유해주실 분", "배그 업데이트 언제 되나요", "핑 너무 튀네요 서버 문제인가", "랭크 같이 돌려요",
+    "총기 추천 좀 해주세요 m416 vs akm", "이벤트 보상은 어디서 확인해요?", "주의: 프로필 링크 클릭하지마세요 피싱입니다",
+]
+
+def _phish_text(rules, rng: random.Random) -> str:
+    kw = rules.keywords
+    pick = lambda g: rng.choice(kw.get(g) or [""])
+    parts = [pick("profile"), pick("visit"), pick("reward")]
+    if rng.random() < 0.5:
+        parts.append(pick("gcoin"))
+    tail = rng.choice(["무료로", "지금", "선착순", "한정 수량"])
+    return f"{parts[0]} {parts[1]} 하시면 {tail} {' '.join(parts[2:])} 드려요"
+
+def synthetic_events(n: int, rules, phish: float, qr: float, seed: int = 0) -> list[dict]:
+    """
+    레이드 비슷한 합성 스트림: 일반 채팅(구 유저 다수) + 신규 계정 피싱(크로스포스트) + QR 스크린샷.
+    이미지는 "_blobs"에 미리 인코딩한 (파일명, 바이트)로 붙임 — 파일 없이 실행, 인코딩 비용은 측정 밖.
+    """
+    rng = random.Random(seed)
+    chans = [1, 2, 3, 4]
+    n_users = max(10, n // 5)
+    ev: list[dict] = []
+    t = 0.0
+    raiders = list(range(900_000, 900_000 + max(1, int(n * phish / 4))))
+    for uid in raiders:
+        ev.append({"t": 0.0, "type": "join", "user": uid, "joined_days": 0, "avatar": "phish"})
+    for i in range(n):
+        t += rng.expovariate(200.0)     # 평균 200 msg/s
+        r = rng.random()
+        if r < phish:
+            uid = rng.choice(raiders)
+            e = {"t": t, "type": "message", "user": uid, "channel": rng.choice(chans),
+                 "content": _phish_text(rules, rng), "joined_days": 0, "avatar": "phish"}
+        elif r < phish + qr:
+            uid = rng.choice(raiders)
+            bg = fixtures.screenshot(1080, 2340, seed=i)
+            e = {"t": t, "type": "message", "user": uid, "channel": rng.choice(chans), "content": "",
+                 "joined_days": 0, "avatar": "phish",
+                 "_blobs": [("qr.png", fixtures.encode(fixtures.paste_qr(bg, f"https://pubg-event.example/{i}", 600)))]}
+        else:
+            uid = rng.randrange(n_users)
+            e = {"t": t, "type": "message", "user": uid, "channel": rng.choice(chans),
+                 "content": rng.choice(_BENIGN), "joined_days": rng.choice([3, 30, 200, 900])}
+            if rng.random() < 0.02:
+                e["_blobs"] = [("photo.jpg", fixtures.encode(fixtures.photo_noise(1280, 960, seed=i), "JPEG", quality=85))]
+        ev.append(e)
+    ev.sort(key=lambda e: e["t"])
+    return ev
+
+def read_events(path: str) -> list[dict]:
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                out.append(json.loads(line))
+    out.sort(key=lambda e: e.get("t", 0.0))
+    return out
+
+# --- 실행 ----------------------------------------------------------------------
+
+class Replay:
+    def __init__(self, cfg: Config, rules, latency_ms: float, miss: float, fixtures_dir: str, seed: int = 0):
+        self.rest = FakeREST(latency_ms, seed)
+        self.guild = FakeGuild(self.rest, miss, seed)
+        self.client = FakeClient(self.guild)
+        chans = [1, 2, 3, 4]
+        self.cfg = dataclasses.replace(
+            cfg, guild_id=_GUILD_ID,
+            channel_qr_monitor_ids=chans, channel_msg_monitor_ids=chans, msg_exempt_log_only_ids=[],
+            log_qr_channel_id=_LOG_QR, log_phish_channel_id=_LOG_PHISH, log_sub_channel_ids=[],
+            snapshot_path="",
+        )
+        self.rules = rules
+        self.state = init_state(self.cfg)
+        self.http = FakeDownloader(self.rest, self.cfg.qr_proxy_side, self.cfg.qr_min_module_px)
+        self.state.http = self.http
+        self.lag = LoopLag(self.cfg.loop_lag_interval_sec)   # 입장 제어의 지연 셰딩을 운영과 같게
+        if self.state.admission is not None:
+            self.state.admission.lag = self.lag
+        self.fixtures_dir = fixtures_dir
+        self._ids = iter(range(10**12, 10**13))
+        self._avatars: dict[str, FakeAsset] = {}
+        self.event_ms: dict[str, list[float]] = {}
+
+    def _file(self, rel: str, *dirs: str) -> bytes:
+        for d in dirs:
+            p = os.path.join(d, rel)
+            if os.path.isfile(p):
+                with open(p, "rb") as f:
+                    return f.read()
+        raise FileNotFoundError(rel)
+
+    def _avatar(self, name: Optional[str], uid: int) -> FakeAsset:
+        key = name or f"u{uid % 64}"     # 일반 유저는 아바타 64종 공유(키 캐시 효과 반영)
+        a = self._avatars.get(key)
+        if a is None:
+            if name == "phish":
+                refs = sorted(f for f in os.listdir(self.cfg.phish_dir) if not f.startswith("."))
+                data = self._file(refs[0], self.cfg.phish_dir)
+            elif name:
+                data = self._file(name, self.fixtures_dir, self.cfg.phish_dir)
+            else:
+                data = fixtures.encode(fixtures.photo_noise(256, 256, seed=uid % 64))
+            a = self._avatars[key] = FakeAsset(self.rest, key, data)
+        return a
+
+    def member(self, e: dict) -> FakeMember:
+        uid = int(e["user"])
+        m = self.guild.members.get(uid)
+        if m is None:
+            joined = datetime.now(UTC) - timedelta(days=float(e.get("joined_days", 365)))
+            m = FakeMember(self.guild, uid, e.get("name") or f"user{uid}", joined, self._avatar(e.get("avatar"), uid))
+            self.guild.members[uid] = m
+        return m
+
+    def message(self, e: dict) -> FakeMessage:
+        atts = []
+        blobs = [(os.path.basename(p), self._file(p, self.fixtures_dir)) for p in e.get("attachments", [])]
+        blobs += e.get("_blobs", [])
+        for name, data in blobs:
+            a = FakeAttachment(next(self._ids), name, data)
+            self.http.put(a, data)
+            atts.append(a)
+        return FakeMessage(next(self._ids), self.member(e), self.guild.channel(int(e.get("channel", 1))), e.get("content", ""), atts)
+
+    def prepare(self, e: dict):
+        return self.member(e) if e.get("type") == "join" else self.message(e)
+
+    async def one(self, e: dict, obj):
+        t0 = time.perf_counter()
+        if e.get("type") == "join":
+            await handle_member_join(self.cfg, self.rules, self.state, obj)
+        else:
+            for r in await run_pipelines(self.client, self.cfg, self.rules, self.state, obj):
+                if isinstance(r, Exception):
+                    logging.getLogger("guard.bench.replay").error("파이프라인 오류", exc_info=r)
+        self.event_ms.setdefault(e.get("type", "message"), []).append((time.perf_counter() - t0) * 1000)
+
+    async def run(self, events: list[dict], speed: float, alloc: bool = False) -> float:
+        """speed=0: 최대 속도(동시 투입), speed=1: 녹화 시각대로, 2=2배속 ..."""
+        load_refs(self.cfg)
+        objs = [self.prepare(e) for e in events]    # 스탠드인 생성/이미지 인코딩은 측정 밖
+        if alloc:
+            tracemalloc.start(1)
+        lag_task = asyncio.create_task(self.lag.run())
+        t_start = time.perf_counter()
+        tasks = []
+        for e, obj in zip(events, objs):
+            if speed > 0:
+                delay = e.get("t", 0.0) / speed - (time.perf_counter() - t_start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self.one(e, obj)))
+            if len(tasks) % 256 == 0:
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        if self.state.enforcer._q is not None:
+            await self.state.enforcer._q.join()
+        if emit_mod._DISPATCHER is not None:
+            await emit_mod._DISPATCHER.flush(30)
+        wall = time.perf_counter() - t_start
+        lag_task.cancel()
+        return wall
+
+# --- 보고 ----------------------------------------------------------------------
+
+def _pct(xs: list[float], q: float) -> float:
+    if not xs: return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+def _row(label: str, xs: list[float]) -> str:
+    return f"{label:44s} {len(xs):>7d} {_pct(xs, .5):>9.2f} {_pct(xs, .99):>9.2f} {max(xs, default=0):>9.2f}"
+
+def report(rp: Replay, n_msgs: int, wall: float):
+    print(f"\n이벤트 {sum(map(len, rp.event_ms.values()))}건 / {wall:.2f}s → 메시지 {n_msgs / wall:,.0f} msg/s")
+    print(f"\n{'단계(ms)':44s} {'n':>7s} {'p50':>9s} {'p99':>9s} {'max':>9s}")
+    for kind, xs in sorted(rp.event_ms.items()):
+        print(_row(f"event[{kind}]", xs))
+    for (name, labels), xs in sorted(metrics.samples().items()):
+        if name.endswith("_seconds"):
+            tag = ",".join(f"{k}={v}" for k, v in labels)
+            print(_row(f"{name[:-8]}{'{' + tag + '}' if tag else ''}", [x * 1000 for x in xs]))
+    print("\nREST 호출:", dict(sorted(rp.rest.calls.items())) or "-")
+    counters = {f"{n}{dict(k) if k else ''}": v for n, d in metrics.snapshot()["counters"].items() for k, v in d.items()}
+    print("카운터:", dict(sorted(counters.items())) or "-")
+
+def _alloc_report(snap: tracemalloc.Snapshot, peak: int, top: int):
+    print(f"\n할당: peak {peak / 1e6:.1f} MB")
+    for st in snap.statistics("lineno")[:top]:
+        f = st.traceback[0]
+        print(f"  {st.size / 1e3:>9.1f} KB {st.count:>7d}개  {f.filename.split('guard' + os.sep)[-1]}:{f.lineno}")
+
+def bench_score(events: list[dict], rules, repeat: int):
+    texts = [e.get("content", "") for e in events if e.get("type", "message") == "message"]
+    score_message("워밍업 프로필 방문", rules)
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for s in texts:
+            score_message(s, rules)
+    dt = time.perf_counter() - t
+    n = len(texts) * repeat
+    print(f"score_message: {n}건 / {dt:.3f}s → {n / dt:,.0f} msg/s ({dt / n * 1e6:.1f} µs/건)")
+
+def main():
+    ap = argparse.ArgumentParser()
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--events", help="이벤트 JSONL 경로")
+    src.add_argument("--synthetic", type=int, help="합성 메시지 수")
+    ap.add_argument("--fixtures", default="", help="첨부/아바타 상대 경로 기준 디렉터리(기본: JSONL 위치)")
+    ap.add_argument("--phish", type=float, default=0.1, help="합성: 피싱 텍스트 비율")
+    ap.add_argument("--qr", type=float, default=0.02, help="합성: QR 스크린샷 비율")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="가짜 REST 평균 지연")
+    ap.add_argument("--miss", type=float, default=0.0, help="get_member 캐시 미스 비율")
+    ap.add_argument("--speed", type=float, default=0.0, help="0=최대 속도, 1=녹화 시각대로")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--score-only", action="store_true", help="score_message 단독 처리량")
+    ap.add_argument("--repeat", type=int, default=5, help="--score-only 반복 횟수")
+    ap.add_argument("--alloc", action="store_true", help="tracemalloc 할당 보고")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--dump", default="", help="합성 이벤트를 JSONL로 저장(이미지 제외)")
+    ap.add_argument("--trace-ms", type=float, default=0.0, help="이보다 느린 이벤트의 스팬 트리 출력(0=끔)")
+    ap.add_argument("--trace-log", default="", help="스팬 트리 파일(기본: 표준 로그)")
+    ap.add_argument("--no-admit", action="store_true", help="입장 제어/셰딩 끔(전량 전체 탐지)")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+    logging.basicConfig(level=(logging.INFO if args.verbose else logging.ERROR))
+    if args.trace_ms:
+        logging.getLogger("guard.trace.slow").setLevel(logging.WARNING)
+
+    cfg = load_config()
+    trace.configure(args.trace_ms, args.trace_log)
+    rules = load_rules(cfg.rules_path)
+    if args.events:
+        events = read_events(args.events)
+        fx = args.fixtures or os.path.dirname(os.path.abspath(args.events))
+    else:
+        events = synthetic_events(args.synthetic, rules, args.phish, args.qr, args.seed)
+        fx = args.fixtures
+    if args.dump:
+        with open(args.dump, "w", encoding="utf-8") as f:
+            for e in events:
+                f.write(json.dumps({k: v for k, v in e.items() if not k.startswith("_")}, ensure_ascii=False) + "\n")
+
+    if args.score_only:
+        bench_score(events, rules, args.repeat)
+        return
+
+    n_msgs = sum(e.get("type", "message") == "message" for e in events)
+    print(f"이벤트 {len(events)}건 (메시지 {n_msgs}) / REST {args.latency_ms:g}ms / miss {args.miss:g} / "
+          f"speed {args.speed:g} / rules v={rules.version}")
+
+    async def go():
+        rp = Replay(cfg, rules, args.latency_ms, args.miss, fx, args.seed)
+        if args.no_admit:
+            rp.state.admission = None
+        metrics.reset()
+        metrics.capture(True)
+        wall = await rp.run(events, args.speed, args.alloc)
+        if args.alloc:
+            snap, (_, peak) = tracemalloc.take_snapshot(), tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        report(rp, n_msgs, wall)
+        if args.alloc:
+            _alloc_report(snap.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ]), peak, args.top)
+        metrics.capture(False)
+        rp.state.conc.qr_pool.shutdown()
+        rp.state.conc.phash_pool.shutdown()
+
+    asyncio.run(go())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# guard/cache.py
+import heapq, itertools
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from time import time as _now
+
+from . import metrics
+
+_MISS = object()
+_EXPIRE_PER_OP = 8     # 삽입 1회당 만료 처리 상한(분할 상환)
+
+class LRUTTLCache:
+    """
+    크기 상한 + TTL 캐시 — 봇 상태 저장소의 공통 구현.
+    - 용량 초과: LRU 축출
+    - 만료: (exp, seq, key) 힙을 삽입 때마다 조금씩 소비(분할 상환) → 별도 gc 루프 불필요
+    - metrics(cache=<name>): cache_hit / cache_miss / cache_evict{reason=lru|expired} / cache_size
+    """
+    def __init__(self, name: str, maxsize: int, ttl_sec: float):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl_sec)
+        self._d: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self.dirty: Optional[set] = None    # 스냅샷(store.py)이 켜면 변경 키 추적
+
+    # --- 조회 -------------------------------------------------------------
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._d.get(key, _MISS)
+        if item is _MISS or item[0] < _now():
+            if item is not _MISS:
+                self._drop(key, "expired")
+            metrics.inc("cache_miss", cache=self.name)
+            return default
+        self._d.move_to_end(key)
+        metrics.inc("cache_hit", cache=self.name)
+        return item[1]
+
+    def __contains__(self, key: Hashable) -> bool:
+        item = self._d.get(key)
+        return item is not None and item[0] >= _now()
+
+    def items(self):
+        now = _now()
+        return [(k, v) for k, (exp, v) in self._d.items() if exp >= now]
+
+    def __len__(self) -> int:
+        return len(self._d)
+
+    # --- 갱신 -------------------------------------------------------------
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = _now()
+        exp = now + (self.ttl if ttl is None else ttl)
+        self._d[key] = (exp, value)
+        self._d.move_to_end(key)
+        heapq.heappush(self._heap, (exp, next(self._seq), key))
+        if self.dirty is not None:
+            self.dirty.add(key)
+        self._expire(now, _EXPIRE_PER_OP)
+        while len(self._d) > self.maxsize:
+            k, _ = self._d.popitem(last=False)
+            if self.dirty is not None:
+                self.dirty.add(k)
+            metrics.inc("cache_evict", cache=self.name, reason="lru")
+        # 덮어쓰기/LRU 축출로 남은 힙 잔여 항목 정리
+        if len(self._heap) > 2 * len(self._d) + 64:
+            self._heap = [(e, next(self._seq), k) for k, (e, _) in self._d.items()]
+            heapq.heapify(self._heap)
+        metrics.set_gauge("cache_size", len(self._d), cache=self.name)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._d.pop(key, _MISS)
+        if item is not _MISS and self.dirty is not None:
+            self.dirty.add(key)
+        return default if item is _MISS else item[1]
+
+    def touch(self, key: Hashable):
+        """값을 제자리 수정했을 때(dict/deque 등) 스냅샷에 반영되도록 표시"""
+        if self.dirty is not None and key in self._d:
+            self.dirty.add(key)
+
+    # --- 스냅샷 -----------------------------------------------------------
+    def take_dirty(self) -> tuple[list[tuple[Hashable, float, Any]], list[Hashable]]:
+        """마지막 체크포인트 이후 변경분: (upserts[(key, exp, value)], deletes[key])"""
+        keys, self.dirty = self.dirty or set(), set()
+        ups, dels = [], []
+        for k in keys:
+            item = self._d.get(k)
+            if item is None:
+                dels.append(k)
+            else:
+                ups.append((k, item[0], item[1]))
+        return ups, dels
+
+    def restore(self, key: Hashable, value: Any, exp: float):
+        """스냅샷 복원 — 기동 후 이미 새로 쓴 키는 유지"""
+        if key in self._d or exp < _now():
+            return
+        self._d[key] = (exp, value)
+        self._d.move_to_end(key, last=False)    # 복원분은 LRU상 가장 오래된 쪽
+        heapq.heappush(self._heap, (exp, next(self._seq), key))
+        while len(self._d) > self.maxsize:
+            self._d.popitem(last=False)
+
+    def clear(self):
+        self._d.clear(); self._heap.clear()
+
+    def gc(self):
+        """남은 만료 항목 전부 정리(일반 경로에서는 삽입 시 분할 처리)"""
+        self._expire(_now(), None)
+        metrics.set_gauge("cache_size", len(self._d), cache=self.name)
+
+    def _drop(self, key: Hashable, reason: str):
+        self._d.pop(key, None)
+        if self.dirty is not None:
+            self.dirty.add(key)
+        metrics.inc("cache_evict", cache=self.name, reason=reason)
+
+    def _expire(self, now: float, budget: Optional[int]):
+        heap = self._heap
+        while heap and heap[0][0] < now and (budget is None or budget > 0):
+            exp, _, key = heapq.heappop(heap)
+            if budget is not None:
+                budget -= 1
+            item = self._d.get(key)
+            if item is not None and item[0] == exp:   # 최신 항목일 때만(덮어쓴 키는 스킵)
+                self._drop(key, "expired")
+
+class TTLSet(LRUTTLCache):
+    """키 존재 여부만 보는 TTL 집합 (중복 방지/쿨다운/플래그)"""
+    def __init__(self, ttl_sec: float, name: str = "ttlset", maxsize: int = 100_000):
+        super().__init__(name, maxsize, ttl_sec)
+
+    def add(self, key: Hashable, ttl: Optional[float] = None):
+        self.set(key, True, ttl)
+
+    def contains(self, key: Hashable) -> bool:
+        return key in self
@@ -35,6 +35,9 @@ class Config:
     ban_on_qr: bool
     ban_on_strict: bool
     ban_on_normal: bool
+    enforce_workers: int    # 제재 스케줄러 동시 실행 수
+    purge_recent_max: int   # QR/STRICT 제재 시 정리할 유저별 최근 메시지 수(0=끔)
+    purge_recent_ttl_sec: int
 
     policy_qr: str          # log|delete|timeout|delete_timeout
     policy_message: str
@@ -45,14 +48,66 @@ class Config:
     phash_threshold: int
     phash_cooldown_h: int
     phash_sem: int
+    phash_timeout_sec: float
+    phash_cache_size: int   # avatar key → pHash 판정 캐시
+    phash_cache_ttl_h: int
 
     # QR
     qr_max_bytes: int
+    qr_max_pixels: int      # 헤더 기준 픽셀 수 상한(디컴프레션 폭탄 차단)
+    http_pool_size: int     # 첨부 다운로드 커넥션 풀
+    qr_proxy_side: int      # CDN 리사이즈본 긴 변(px), 0=항상 원본
+    qr_min_module_px: float # 축소본 음성을 확정으로 볼 원본 QR 최소 모듈 크기(px) — 필요 시 축소본 변을 키움
     qr_sem: int
     qr_exclude_gif: bool
+    qr_pool: str            # thread|process (디코드 실행기)
+    qr_workers: int
+    qr_queue_max: int       # 실행중+대기 디코드 잡 상한
+    qr_timeout_sec: float   # 잡별 디코드 제한시간
+    qr_stage_budget_ms: float   # 디코드 단계당 CPU 예산
+    qr_image_budget_ms: float   # 이미지당 CPU 예산
+    qr_cache_size: int          # 콘텐츠 해시 판정 캐시 크기
+    qr_cache_ttl_sec: int
+    qr_cache_phash: bool        # 알려진 양성과 dHash 일치 시 프리체크 무시·전 단계 재디코드(텍스트는 디코드로만 확정)
+
+    # State caps
+    cache_max_msgs: int     # 메시지/첨부 단위 캐시 상한
+    cache_max_users: int    # 유저 단위 캐시 상한
+    member_ttl_sec: int     # 멤버 조회 캐시
+    member_neg_ttl_sec: int # 나간 유저 네거티브 캐시
+
+    # Snapshot
+    snapshot_path: str          # 상태 캐시 SQLite 파일(빈 값=끔)
+    snapshot_interval_sec: int
+
+    # Log emit
+    emit_queue_max: int     # 채널별 로그 큐 상한
+    emit_overflow: str      # summarize|drop_new|drop_oldest
+
+    # Admission control (레이드 부하)
+    admit_user_rate: float      # 유저당 초당 토큰(0=끔) — 초과 시 QR 스캔 생략
+    admit_user_burst: int
+    admit_channel_rate: float   # 채널당 초당 토큰(0=끔) — 초과 시 QR 확장/pHash 생략
+    admit_channel_burst: int
+    admit_max_inflight: int     # 처리 중 메시지 상한(0=끔) — 초과 시 텍스트만
+    admit_fast_path: bool       # 제재 중 유저는 탐지 없이 삭제만
+    shed_lag_sec: float         # 루프 지연 셰딩 기준(0=끔), 2배면 2단계
+    shed_hold_sec: float        # 셰딩 해제 전 유지 시간
+
+    # Monitoring
+    metrics_host: str
+    metrics_port: int               # Prometheus /metrics 포트(0=끔)
+    loop_lag_interval_sec: float    # 이벤트 루프 지연 샘플 주기
+    loop_lag_unhealthy_sec: float   # /healthz 503 기준
+    trace_slow_ms: float            # 이 이상 걸린 이벤트의 스팬 트리 덤프(0=트레이싱 끔)
+    trace_log_path: str             # 덤프 회전 로그(빈 값=일반 로그)
+    trace_log_max_bytes: int
+    trace_log_backups: int
+    trace_profile_rate: float       # 이벤트 중 cProfile 샘플링 비율(0~1)
 
     # Rules
     rules_path: str
+    reload_poll_sec: int    # rules.json/PHISH_DIR 변경 감시 주기(0=SIGHUP만)
     debug: bool
     # Ban button feature
     enable_ban_button: bool
@@ -79,6 +134,9 @@ def load_config() -> Config:
         ban_on_qr=os.getenv("BAN_ON_QR", "1") in {"1","true","True"},
         ban_on_strict=os.getenv("BAN_ON_STRICT", "1") in {"1","true","True"},
         ban_on_normal=os.getenv("BAN_ON_NORMAL", "0") in {"1","true","True"},
+        enforce_workers=int(os.getenv("ENFORCE_WORKERS", "4")),
+        purge_recent_max=int(os.getenv("PURGE_RECENT_MAX", "20")),
+        purge_recent_ttl_sec=int(os.getenv("PURGE_RECENT_TTL_SEC", "3600")),
 
         policy_qr=os.getenv("POLICY_QR", "delete_timeout").lower(),
         policy_message=os.getenv("POLICY_MESSAGE", "delete_timeout").lower(),
@@ -88,12 +146,59 @@ def load_config() -> Config:
         phash_threshold=int(os.getenv("PHASH_THRESHOLD", "8")),
         phash_cooldown_h=int(os.getenv("PHASH_COOLDOWN_H", "6")),
         phash_sem=int(os.getenv("PHASH_SEM", "3")),
+        phash_timeout_sec=float(os.getenv("PHASH_TIMEOUT_SEC", "5")),
+        phash_cache_size=int(os.getenv("PHASH_CACHE_SIZE", "20000")),
+        phash_cache_ttl_h=int(os.getenv("PHASH_CACHE_TTL_H", "168")),
 
         qr_max_bytes=int(os.getenv("QR_MAX_BYTES", str(5 * 1024 * 1024))),
+        qr_max_pixels=int(os.getenv("QR_MAX_PIXELS", str(40_000_000))),
+        http_pool_size=int(os.getenv("HTTP_POOL_SIZE", "16")),
+        qr_proxy_side=int(os.getenv("QR_PROXY_SIDE", "1280")),
+        qr_min_module_px=float(os.getenv("QR_MIN_MODULE_PX", "4")),
         qr_sem=int(os.getenv("QR_SEM", "2")),
         qr_exclude_gif=os.getenv("QR_EXCLUDE_GIF", "1") in {"1","true","True"},
+        qr_pool=os.getenv("QR_POOL", "thread").lower(),
+        qr_workers=int(os.getenv("QR_WORKERS", "2")),
+        qr_queue_max=int(os.getenv("QR_QUEUE_MAX", "16")),
+        qr_timeout_sec=float(os.getenv("QR_TIMEOUT_SEC", "8")),
+        qr_stage_budget_ms=float(os.getenv("QR_STAGE_BUDGET_MS", "120")),
+        qr_image_budget_ms=float(os.getenv("QR_IMAGE_BUDGET_MS", "500")),
+        qr_cache_size=int(os.getenv("QR_CACHE_SIZE", "4096")),
+        qr_cache_ttl_sec=int(os.getenv("QR_CACHE_TTL_SEC", str(6 * 3600))),
+        qr_cache_phash=os.getenv("QR_CACHE_PHASH", "0") in {"1","true","True"},
+
+        cache_max_msgs=int(os.getenv("CACHE_MAX_MSGS", "200000")),
+        cache_max_users=int(os.getenv("CACHE_MAX_USERS", "100000")),
+        member_ttl_sec=int(os.getenv("MEMBER_TTL_SEC", "60")),
+        member_neg_ttl_sec=int(os.getenv("MEMBER_NEG_TTL_SEC", "300")),
+
+        snapshot_path=os.getenv("SNAPSHOT_PATH", str(HERE / "state.db")),
+        snapshot_interval_sec=int(os.getenv("SNAPSHOT_INTERVAL_SEC", "60")),
+
+        emit_queue_max=int(os.getenv("EMIT_QUEUE_MAX", "200")),
+        emit_overflow=os.getenv("EMIT_OVERFLOW", "summarize").strip().lower(),
+
+        admit_user_rate=float(os.getenv("ADMIT_USER_RATE", "0.5")),
+        admit_user_burst=int(os.getenv("ADMIT_USER_BURST", "5")),
+        admit_channel_rate=float(os.getenv("ADMIT_CHANNEL_RATE", "10")),
+        admit_channel_burst=int(os.getenv("ADMIT_CHANNEL_BURST", "30")),
+        admit_max_inflight=int(os.getenv("ADMIT_MAX_INFLIGHT", "200")),
+        admit_fast_path=os.getenv("ADMIT_FAST_PATH", "1") in {"1","true","True"},
+        shed_lag_sec=float(os.getenv("SHED_LAG_SEC", "0.25")),
+        shed_hold_sec=float(os.getenv("SHED_HOLD_SEC", "10")),
+
+        metrics_host=os.getenv("METRICS_HOST", "127.0.0.1"),
+        metrics_port=int(os.getenv("METRICS_PORT", "0")),
+        loop_lag_interval_sec=float(os.getenv("LOOP_LAG_INTERVAL_SEC", "0.5")),
+        loop_lag_unhealthy_sec=float(os.getenv("LOOP_LAG_UNHEALTHY_SEC", "2")),
+        trace_slow_ms=float(os.getenv("TRACE_SLOW_MS", "0")),
+        trace_log_path=os.getenv("TRACE_LOG_PATH", str(HERE / "trace.log")),
+        trace_log_max_bytes=int(os.getenv("TRACE_LOG_MAX_BYTES", str(10 << 20))),
+        trace_log_backups=int(os.getenv("TRACE_LOG_BACKUPS", "3")),
+        trace_profile_rate=float(os.getenv("TRACE_PROFILE_RATE", "0")),
 
         rules_path=os.getenv("RULES_PATH", str(HERE / "rules.json")),
+        reload_poll_sec=int(os.getenv("RELOAD_POLL_SEC", "5")),
         debug=os.getenv("DEBUG", "0") in {"1","true","True"},
         enable_ban_button=os.getenv("ENABLE_BAN_BUTTON", "0") in {"1","true","True"},
         ban_button_role_ids=_parse_id_list(os.getenv("BAN_BUTTON_ROLE_IDS", "")),
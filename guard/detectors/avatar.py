@@ -1,5 +1,5 @@
 # guard/detectors/avatar.py
-import io, os, logging, asyncio
+import io, os, time, zlib, logging, asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Tuple
 
@@ -9,41 +9,52 @@ import imagehash
 
 from ..config import Config
 from ..state import State
+from .. import metrics, trace
+from ..admission import shed
+from .phash_index import PHashIndex, HashLike, hash_to_int
 
 log = logging.getLogger("guard.detectors.avatar")
 UTC = timezone.utc
 def now_utc(): return datetime.now(UTC)
 
-# 전역 레퍼런스 캐시
-_REF_HASHES: List[Tuple[str, imagehash.ImageHash]] = []
+# 전역 레퍼런스 인덱스
+_REF_INDEX: PHashIndex = PHashIndex()
+_REF_VERSION = 0          # 인덱스 내용 해시 → 캐시된 판정 재계산 기준(스냅샷 복원 후에도 유효)
 _LOADED_DIR: Optional[str] = None
 
-def load_refs(cfg: Config) -> int:
-    """PHISH_DIR에서 참조 이미지(f.png 등) 로드 → pHash 리스트 생성"""
-    global _REF_HASHES, _LOADED_DIR
-    if _LOADED_DIR == cfg.phish_dir and _REF_HASHES:
-        return len(_REF_HASHES)
-
-    _REF_HASHES = []
-    _LOADED_DIR = cfg.phish_dir
-    if not os.path.isdir(cfg.phish_dir):
-        log.info("레퍼런스 폴더 없음: %s", cfg.phish_dir)
-        return 0
-
-    cnt = 0
-    for name in os.listdir(cfg.phish_dir):
+def build_refs(phish_dir: str) -> PHashIndex:
+    """PHISH_DIR의 참조 이미지(f.png 등) → pHash 인덱스 (전역 상태 안 건드림: 백그라운드 재구축용)"""
+    if not os.path.isdir(phish_dir):
+        log.info("레퍼런스 폴더 없음: %s", phish_dir)
+        return PHashIndex()
+    refs: List[Tuple[str, imagehash.ImageHash]] = []
+    for name in sorted(os.listdir(phish_dir)):
         if not name.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
             continue
-        p = os.path.join(cfg.phish_dir, name)
+        p = os.path.join(phish_dir, name)
         try:
             with Image.open(p) as im:
-                h = imagehash.phash(im.convert("RGB").resize((256, 256)))
-            _REF_HASHES.append((name, h))
-            cnt += 1
+                h = _phash_image(im)
+            refs.append((name, h))
         except Exception as e:
             log.warning("레퍼런스 로드 실패: %s (%s)", p, e)
-    log.info("아바타 레퍼런스 해시 %d개 로드", cnt)
-    return cnt
+    return PHashIndex.build(refs)
+
+def swap_refs(index: PHashIndex, phish_dir: str) -> int:
+    """인덱스 교체 — 루프 스레드에서 호출(await 없음 → 조회 중간에 섞이지 않음)"""
+    global _REF_INDEX, _REF_VERSION, _LOADED_DIR
+    _REF_INDEX = index
+    _REF_VERSION = zlib.crc32(index.bits.tobytes(), zlib.crc32("\n".join(index.names).encode()))
+    _LOADED_DIR = phish_dir
+    return len(index)
+
+def load_refs(cfg: Config, force: bool = False) -> int:
+    """PHISH_DIR에서 참조 이미지 로드 → pHash 인덱스 생성 (force면 재구축)"""
+    if not force and _LOADED_DIR == cfg.phish_dir and len(_REF_INDEX):
+        return len(_REF_INDEX)
+    n = swap_refs(build_refs(cfg.phish_dir), cfg.phish_dir)
+    log.info("아바타 레퍼런스 해시 %d개 로드", n)
+    return n
 
 async def _avatar_bytes(asset: discord.Asset) -> Optional[bytes]:
     try:
@@ -53,72 +64,118 @@ async def _avatar_bytes(asset: discord.Asset) -> Optional[bytes]:
         log.warning("아바타 다운로드 실패: %s", e)
         return None
 
-async def _phash_bytes(b: bytes) -> imagehash.ImageHash:
+_HASH_SIDE = 256
+
+def _phash_image(im: Image.Image) -> imagehash.ImageHash:
+    """디코드 단계에서 축소(JPEG draft / 정수배 reduce) 후 256x256 리사이즈 → pHash"""
+    im.draft("RGB", (_HASH_SIDE, _HASH_SIDE))
+    if im.mode not in ("RGB", "L"):
+        im = im.convert("RGB")      # reduce()는 P/1/I;16 등을 지원하지 않음
+    k = min(im.size) // _HASH_SIDE
+    if k >= 2:
+        im = im.reduce(k)
+    return imagehash.phash(im.convert("RGB").resize((_HASH_SIDE, _HASH_SIDE)))
+
+def _phash_job(b: bytes) -> Tuple[int, float]:
+    # state.conc.phash_pool 워커에서 실행
+    t = time.perf_counter()
     with Image.open(io.BytesIO(b)) as im:
-        im = im.convert("RGB").resize((256, 256))
-        return imagehash.phash(im)
-
-def _min_dist(q: imagehash.ImageHash) -> Tuple[int, Optional[str]]:
-    best = 999
-    best_name = None
-    for name, h in _REF_HASHES:
-        d = int(q - h)
-        if d < best:
-            best = d; best_name = name
-            if best == 0: break
-    return best, best_name
+        h = hash_to_int(_phash_image(im))
+    return h, time.perf_counter() - t
+
+async def _phash_bytes(b: bytes, state: State) -> int:
+    """
+    pHash 계산을 실행기로 오프로드. phash_sem이 실행기 in-flight 잡 수를 제한.
+    metrics: phash_queue_wait_seconds(세마포어 대기), phash_compute_seconds(워커 계산)
+    """
+    t = time.perf_counter()
+    async with state.conc.phash_sem:
+        metrics.observe("phash_queue_wait_seconds", time.perf_counter() - t)
+        h, dt = await state.conc.phash_pool.run(_phash_job, b)
+    metrics.observe("phash_compute_seconds", dt)
+    return h
+
+def _min_dist(q: HashLike) -> Tuple[int, Optional[str]]:
+    return _REF_INDEX.nearest(q)
+
+def _cached_verdict(state: State, key: Optional[str]) -> Optional[Tuple[int, Optional[str]]]:
+    """avatar key 캐시 조회: (dist, best_name) 또는 None. 레퍼런스가 바뀌었으면 해시로 재계산(다운로드 없음)"""
+    if not key:
+        return None
+    ent = state.caches.avatar_phash.get(key)
+    if ent is None:
+        return None
+    h, ver, dist, best_name = ent
+    if ver != _REF_VERSION:
+        dist, best_name = _min_dist(h)
+        state.caches.avatar_phash.set(key, (h, _REF_VERSION, dist, best_name))
+    return dist, best_name
+
+async def _avatar_verdict(asset: discord.Asset, state: State, tag: str = "") -> Optional[Tuple[int, Optional[str]]]:
+    """
+    avatar key 캐시 → 미스일 때만 다운로드+pHash.
+    같은 key(기본/공유 스캠 아바타 포함)는 한 번만 해시.
+    """
+    key = getattr(asset, "key", None)
+    hit = _cached_verdict(state, key)
+    if hit is not None:
+        return hit
+
+    with trace.span("avatar_read"):
+        b = await _avatar_bytes(asset)
+    if not b:
+        return None
+    try:
+        with trace.span("phash"):
+            h = await _phash_bytes(b, state)
+    except Exception as e:
+        log.warning("pHash 계산 실패%s: %s", tag, e)
+        return None
+
+    dist, best_name = _min_dist(h)
+    if key:
+        state.caches.avatar_phash.set(key, (h, _REF_VERSION, dist, best_name))
+    return dist, best_name
 
 def _cooldown_ok(state: State, uid: int, ttl_sec: int) -> bool:
-    # TTLSet을 재사용하지 않고 간단한 맵/만료로 구현
-    if not hasattr(state.caches, "phash_cd_map"):
-        state.caches.phash_cd_map = {}  # type: ignore
-        state.caches.phash_cd_exp = {}  # type: ignore
-    now = datetime.now().timestamp()
-    exp = state.caches.phash_cd_exp.get(uid, 0)     # type: ignore
-    if exp > now:
+    if state.caches.phash_cooldown.contains(uid):
         return False
-    state.caches.phash_cd_exp[uid] = now + ttl_sec  # type: ignore
+    state.caches.phash_cooldown.add(uid, ttl=ttl_sec)
     return True
 
 async def phash_on_demand(member: Optional[discord.Member], cfg: Config, state: State) -> bool:
     """
     키워드 히트 시에만 호출되는 온디맨드 검사.
-    - 쿨다운: cfg.phash_cooldown_h
-    - 동시성: state.conc.phash_sem
-    - 캐시: state.caches.last_avatar_key
+    - 캐시: state.caches.avatar_phash (avatar key → pHash/판정) — 히트 시 HTTP/디코딩 0회
+    - 쿨다운: cfg.phash_cooldown_h (캐시 미스로 다운로드가 필요할 때만 적용)
+    - 동시성: state.conc.phash_sem(→ phash_pool 실행기)
     return: 매치여부(True=STRICT 승격)
     """
     if not member or not member.display_avatar:
         return False
-    if not _REF_HASHES:
+    if not len(_REF_INDEX):
         # 필요 시 동적 로드
         load_refs(cfg)
-        if not _REF_HASHES:
+        if not len(_REF_INDEX):
             return False
 
     uid = member.id
-    if not _cooldown_ok(state, uid, cfg.phash_cooldown_h * 3600):
-        return False
-
     key = getattr(member.display_avatar, "key", None)
-    # 동일 key면 최근에 확인했을 가능성 → 그래도 쿨다운 통과했으면 1회 검사 허용
-    state.caches.last_avatar_key[uid] = key
+    state.caches.last_avatar_key.set(uid, key)
 
-    b = await _avatar_bytes(member.display_avatar)
-    if not b:
-        return False
-
-    async with state.conc.phash_sem:
-        try:
-            q = await _phash_bytes(b)
-        except Exception as e:
-            log.warning("pHash 계산 실패: %s", e)
+    verdict = _cached_verdict(state, key)
+    if verdict is None:
+        if not _cooldown_ok(state, uid, cfg.phash_cooldown_h * 3600):
+            return False
+        verdict = await _avatar_verdict(member.display_avatar, state)
+        if verdict is None:
             return False
 
-    dist, best_name = _min_dist(q)
+    dist, best_name = verdict
     matched = dist <= cfg.phash_threshold
     if matched:
         state.caches.suspect_by_avatar.add(uid)
+        state.counters.hour_avatar += 1
         log.info("pHash 매치: uid=%s best=%s d=%s", uid, best_name, dist)
     return matched
 
@@ -136,31 +193,29 @@ async def scan_avatar_event(member: discord.Member, cfg: Config, state: State) -
     key = getattr(member.display_avatar, "key", None)
     base = state.caches.last_avatar_key.get(member.id)
     if base is None:
-        state.caches.last_avatar_key[member.id] = key
+        state.caches.last_avatar_key.set(member.id, key)
         return False
     if key == base:
         return False
-    state.caches.last_avatar_key[member.id] = key
+    # 루프 지연 셰딩 중: 기준 키를 갱신하지 않고 넘김(다음 이벤트에서 다시 변경으로 잡힘)
+    if state.admission is not None and state.admission.shedding():
+        shed("avatar_event", "lag")
+        return False
+    state.caches.last_avatar_key.set(member.id, key)
 
     # 쿨다운 무시(변경 이벤트는 즉시 1회 확인)
-    if not _REF_HASHES:
+    if not len(_REF_INDEX):
         load_refs(cfg)
-        if not _REF_HASHES:
+        if not len(_REF_INDEX):
             return False
 
-    b = await _avatar_bytes(member.display_avatar)
-    if not b:
+    verdict = await _avatar_verdict(member.display_avatar, state, tag="(event)")
+    if verdict is None:
         return False
-    async with state.conc.phash_sem:
-        try:
-            q = await _phash_bytes(b)
-        except Exception as e:
-            log.warning("pHash 계산 실패(event): %s", e)
-            return False
-
-    dist, best_name = _min_dist(q)
+    dist, best_name = verdict
     if dist <= cfg.phash_threshold:
         state.caches.suspect_by_avatar.add(member.id)
+        state.counters.hour_avatar += 1
         log.info("이벤트 pHash 매치: uid=%s best=%s d=%s", member.id, best_name, dist)
         return True
-    return False
\ No newline at end of file
+    return False
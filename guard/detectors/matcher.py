@@ -0,0 +1,84 @@
+# guard/detectors/matcher.py
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+class Match(NamedTuple):
+    group: str
+    term: str
+    start: int      # 스캔한 문자열 기준 시작 인덱스
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.term)
+
+class KeywordMatcher:
+    """
+    Aho-Corasick 다중 패턴 매처.
+    rules.json의 키워드 그룹을 한 번 컴파일 → 본문 1회 선형 스캔으로 모든 (group, term, pos) 보고(겹침 포함).
+    """
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        # 그룹별 용어(원래 순서 유지, 중복 제거) — 점수 계산 시 rules.json 순서를 따름
+        self.groups: Dict[str, List[str]] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        for g, terms in (groups or {}).items():
+            seen = list(dict.fromkeys(t for t in (terms or []) if t))
+            self.groups[g] = seen
+            for t in seen:
+                self._insert(g, t)
+        self._link()
+        firsts = "".join(sorted(self._goto[0].keys()))
+        # 루트 상태에서는 첫 글자 후보까지 C 레벨로 건너뜀
+        self._skip = re.compile("[" + re.escape(firsts) + "]") if firsts else None
+
+    def _insert(self, group: str, term: str):
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({}); self._fail.append(0); self._out.append([])
+            node = nxt
+        self._out[node].append((group, term))
+
+    def _link(self):
+        """BFS로 fail 링크/출력 병합 + fail 전이를 미리 펼친 DFA(_delta) 구성"""
+        goto, fail, out = self._goto, self._fail, self._out
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:                    # 얕은 노드의 fail/delta가 먼저 확정됨
+            node = queue.popleft()
+            row = dict(delta[fail[node]])
+            row.update(goto[node])
+            delta[node] = row
+            for ch, nxt in goto[node].items():
+                fail[nxt] = delta[fail[node]].get(ch, 0) if node else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+                queue.append(nxt)
+        self._delta = delta
+
+    def scan(self, text: str) -> List[Match]:
+        out: List[Match] = []
+        if not text or self._skip is None:
+            return out
+        delta, outs, skip = self._delta, self._out, self._skip
+        node, i, n = 0, 0, len(text)
+        while i < n:
+            if node == 0:
+                m = skip.search(text, i)
+                if not m:
+                    break
+                i = m.start()
+            node = delta[node].get(text[i], 0)
+            if outs[node]:
+                for g, t in outs[node]:
+                    out.append(Match(g, t, i - len(t) + 1))
+            i += 1
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.groups.values())
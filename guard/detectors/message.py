@@ -1,34 +1,68 @@
 # guard/detectors/message.py
-import re
-import unicodedata
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
 
-from ..rules import Rules
+import discord
 
-ZERO_WIDTH = re.compile(r"[\u200B\u200C\u200D\u2060\uFEFF]")
-NONWORD    = re.compile(r"[^0-9A-Za-z가-힣]+")
-SEP_RUNS   = re.compile(r"[ \t\n\r\-\._/\\|·•‧∙・,、，:;]+")
+from ..rules import Rules, NEG_GROUP
+from .matcher import Match
+from .normalize import Normalized
+
+def _compiled(rules: Rules) -> Rules:
+    if rules.matcher is None or rules.normalizer is None:
+        rules.compile()
+    return rules
+
+def normalize_full(text: str, rules: Rules) -> Normalized:
+    """1회 정규화: s(공백 유지), condensed, 오프셋 맵"""
+    return _compiled(rules).normalizer(text or "")
 
 def normalize(text: str, rules: Rules) -> Tuple[str, str]:
     """return (s_norm, condensed)"""
-    homo = rules.homoglyphs or {}
-    s = text or ""
-    s = unicodedata.normalize("NFKC", s)
-    s = s.translate(str.maketrans(homo))
-    s = ZERO_WIDTH.sub("", s)
-    s = s.lower()
-    condensed = NONWORD.sub("", s)
-    return s, condensed
-
-def near_hits(condensed: str, A: List[str], B: List[str], win: int):
+    n = normalize_full(text, rules)
+    return n.s, n.condensed
+
+@dataclass
+class MessageScan:
+    """본문 1회 스캔 결과: 정규화 결과 + 매치 목록(condensed 기준 위치) + 점수"""
+    norm: Normalized
+    matches: List[Match]
+    score: int = 0
+    reasons: List[str] = field(default_factory=list)
+    hits: List[str] = field(default_factory=list)
+    # group -> term -> 시작 위치들(오름차순)
+    pos: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+    # 키워드 term -> condensed 첫 위치 (negation 제외)
+    first: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def s(self) -> str: return self.norm.s
+    @property
+    def condensed(self) -> str: return self.norm.condensed
+
+def _index(matches: List[Match]) -> Tuple[Dict[str, Dict[str, List[int]]], Dict[str, int]]:
+    pos: Dict[str, Dict[str, List[int]]] = {}
+    first: Dict[str, int] = {}
+    for m in sorted(matches, key=lambda m: m.start):
+        pos.setdefault(m.group, {}).setdefault(m.term, []).append(m.start)
+        if m.group != NEG_GROUP and m.term not in first:
+            first[m.term] = m.start
+    return pos, first
+
+def near_hits(pos_a: Dict[str, List[int]], pos_b: Dict[str, List[int]], A: List[str], B: List[str], win: int):
+    """
+    A 용어(첫 등장) 직후 win 글자 안에 B 용어가 온전히 들어오면 히트.
+    pos_*: term -> condensed 시작 위치들 (매치 목록에서 구성)
+    """
     a_hits, b_hits = [], []
     for a in (A or []):
-        i = condensed.find(a)
-        if i == -1:
+        ia = pos_a.get(a)
+        if not ia:
             continue
-        seg = condensed[i + len(a): i + len(a) + win]
+        lo = ia[0] + len(a)
+        hi = lo + win
         for b in (B or []):
-            if b in seg:
+            if any(lo <= j and j + len(b) <= hi for j in pos_b.get(b, ())):
                 a_hits.append(a); b_hits.append(b)
                 break
     if a_hits and b_hits:
@@ -38,72 +72,120 @@ def near_hits(condensed: str, A: List[str], B: List[str], win: int):
         return True, ah, bh
     return False, [], []
 
-def score_message(content: str, rules: Rules):
-    s, condensed = normalize(content, rules)
-    k = rules.keywords or {}
+def scan_message(content: str, rules: Rules) -> MessageScan:
+    rules = _compiled(rules)
+    norm = rules.normalizer(content or "")
+    matches = rules.matcher.scan(norm.condensed)
+    pos, first = _index(matches)
+    sc = MessageScan(norm=norm, matches=matches, pos=pos, first=first)
+    k = rules.kw
     w = (rules.get("weights") or {})
     sens = rules.sensitivity or {}
 
     score, reasons, hits = 0, [], []
 
-    ok, ah, bh = near_hits(condensed, k.get("profile", []), k.get("visit", []), int(sens.get("near_window", 12)))
+    ok, ah, bh = near_hits(sc.pos.get("profile", {}), sc.pos.get("visit", {}),
+                           k.get("profile", []), k.get("visit", []), int(sens.get("near_window", 12)))
     if ok:
         score += int(w.get("profile_visit", 40)); reasons.append("프로필+방문"); hits += ah + bh
 
-    reward_terms = [x for x in (k.get("reward", []) or []) if x in condensed]
+    found = sc.pos.get("reward", {})
+    reward_terms = [x for x in k.get("reward", []) if x in found]
     if reward_terms:
         score += int(w.get("reward", 25)); reasons.append("보상/수령/이벤트"); hits += reward_terms
 
-    gcoin_terms = [x for x in (k.get("gcoin", []) or []) if x in condensed]
+    found = sc.pos.get("gcoin", {})
+    gcoin_terms = [x for x in k.get("gcoin", []) if x in found]
     if gcoin_terms:
         score += int(w.get("gcoin", 25)); reasons.append("G-COIN"); hits += gcoin_terms
 
     # uniq (order-preserve)
-    hits = list(dict.fromkeys(hits))
-    return score, reasons, hits, s
+    sc.score, sc.reasons, sc.hits = score, reasons, list(dict.fromkeys(hits))
+    return sc
+
+def score_message(content: str, rules: Rules):
+    sc = scan_message(content, rules)
+    return sc.score, sc.reasons, sc.hits, sc.s
 
 def has_any_keyword(content: str, rules: Rules) -> bool:
-    score, reasons, hits, _ = score_message(content, rules)
-    return bool(reasons or hits)
+    sc = scan_message(content, rules)
+    return bool(sc.reasons or sc.hits)
 
 def profile_visit_in_reasons(reasons: List[str]) -> bool:
     return "프로필+방문" in (reasons or [])
 
 def nick_flag(display_name: str, rules: Rules) -> bool:
-    _, condensed = normalize(display_name or "", rules)
-    for key in (rules.nick_flags or []):
-        k = (key or "").strip().lower()
-        if not k: continue
-        if k in condensed:
-            return True
-    return False
-
-def negation_guard(content: str, hit_terms: List[str], rules: Rules, window: int = 20) -> bool:
+    condensed = normalize_full(display_name, rules).condensed
+    return any(k in condensed for k in _compiled(rules).nick_flags_norm)
+
+def negation_match(sc: MessageScan, hit_terms: List[str], window: int = 20) -> Optional[Tuple[Tuple[int, int], Match]]:
+    """
+    hit 구간(condensed 첫 위치) ±window 안에 온전히 들어오는 negation 매치 탐색.
+    hit/negation 모두 시작 위치로 정렬 후 한 번 훑음 — O(hits + negations) (+창 안 후보).
+    return ((hit_start, hit_end), negation Match) 또는 None
+    """
+    ivs = sorted({(sc.first[h], sc.first[h] + len(h)) for h in hit_terms if h in sc.first})
+    if not ivs:
+        return None
+    negs = sorted((m for m in sc.matches if m.group == NEG_GROUP and m.term), key=lambda m: m.start)
+    j = 0
+    for a, b in ivs:
+        left, right = a - window, b + window
+        while j < len(negs) and negs[j].start < left:
+            j += 1      # left는 단조 증가 → 포인터도 단조
+        k = j
+        while k < len(negs) and negs[k].start <= right:
+            if negs[k].end <= right:
+                return (a, b), negs[k]
+            k += 1
+    return None
+
+def negation_guard(content: Union[str, MessageScan], hit_terms: List[str], rules: Rules, window: int = 20) -> bool:
     """
     키워드 근처(±window)에 부정/경고 표현이 있으면 True(=면책).
-    간단히: 정규화된 본문 s에서 각 hit 주변 ±window 슬라이스에 negation 토큰 존재 여부.
+    위치는 condensed 기준이라 구분자로 쪼갠 용어("프 로-필")도 같은 위치로 판정.
+    content에 scan_message 결과를 주면 재스캔 없이 같은 매치 목록을 사용.
     """
-    negs = [n for n in (rules.negations or []) if n]
-    if not negs or not hit_terms:
+    if not hit_terms or not _compiled(rules).negations_norm:
         return False
-    s, _ = normalize(content or "", rules)
-    s_len = len(s)
-    # 슬라이스 검사를 위해 hit_terms도 정규화
-    hit_norms = [normalize(h, rules)[0] for h in hit_terms]
-    for h in hit_norms:
-        i = s.find(h)
-        if i == -1: 
+    sc = content if isinstance(content, MessageScan) else scan_message(content or "", rules)
+    return negation_match(sc, hit_terms, window) is not None
+
+def hit_spans(sc: MessageScan, terms: List[str]) -> List[Tuple[int, int]]:
+    """용어들의 첫 매치 → 원문 구간 (겹치면 병합)"""
+    spans = sorted(sc.norm.orig_span(sc.first[t], sc.first[t] + len(t)) for t in terms if t in sc.first)
+    merged: List[Tuple[int, int]] = []
+    for a, b in spans:
+        if b <= a:
+            continue
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(b, merged[-1][1]))
+        else:
+            merged.append((a, b))
+    return merged
+
+def preview_with_spans(sc: MessageScan, terms: List[str], extra: Optional[List[Tuple[int, int]]] = None) -> str:
+    """로그 미리보기: 원문에서 매칭된 구간을 굵게 표시(나머지는 마크다운 이스케이프)"""
+    text = sc.norm.text
+    spans = hit_spans(sc, terms)
+    if extra:
+        spans = sorted(set(spans) | {(a, b) for a, b in extra if b > a})
+    out, cur = [], 0
+    for a, b in spans:
+        if a < cur:
+            a = cur
+        if b <= a:
             continue
-        left = max(0, i - window)
-        right = min(s_len, i + len(h) + window)
-        zone = s[left:right]
-        for n in negs:
-            n_norm = normalize(n, rules)[0]
-            if n_norm and n_norm in zone:
-                return True
-    return False
-
-def text_signature(content: str, rules: Rules) -> str:
-    """반복/크로스포스트 탐지용: 정규화(condensed) 기반 서명 문자열"""
-    _, condensed = normalize(content or "", rules)
+        out.append(discord.utils.escape_markdown(text[cur:a]))
+        out.append("**" + discord.utils.escape_markdown(text[a:b]) + "**")
+        cur = b
+    out.append(discord.utils.escape_markdown(text[cur:]))
+    return "".join(out).strip()
+
+def text_signature(content: Union[str, MessageScan], rules: Rules) -> str:
+    """반복/크로스포스트 탐지용: 정규화(condensed) 기반 서명 문자열 (scan_message 결과 재사용 가능)"""
+    if isinstance(content, MessageScan):
+        condensed = content.condensed
+    else:
+        condensed = normalize_full(content, rules).condensed
     return condensed[:256]  # 너무 길면 잘라서 키로
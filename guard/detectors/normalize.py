@@ -0,0 +1,114 @@
+# guard/detectors/normalize.py
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+ZERO_WIDTH = re.compile(r"[\u200B\u200C\u200D\u2060\uFEFF]")
+NONWORD    = re.compile(r"[^0-9A-Za-z가-힣]+")
+WORD_RUNS  = re.compile(r"[0-9A-Za-z가-힣]+")
+SEP_RUNS   = re.compile(r"[ \t\n\r\-\._/\\|·•‧∙・,、，:;]+")
+
+def _is_starter(ch: str) -> bool:
+    # NFKC 조합이 세그먼트를 넘지 않도록: 결합문자·한글 중/종성 자모는 앞 글자에 붙임
+    if unicodedata.combining(ch):
+        return False
+    return not ("\u1160" <= ch <= "\u11FF")
+
+@dataclass
+class Normalized:
+    """
+    정규화 결과 1회분.
+    - s: NFKC → homoglyph → zero-width 제거 → lower (공백 유지)
+    - condensed: s에서 [0-9A-Za-z가-힣] 외 제거
+    오프셋 맵(condensed→s→원문)은 로그 미리보기 등 필요할 때만 지연 계산.
+    """
+    text: str
+    s: str
+    condensed: str
+    normalizer: Optional["Normalizer"] = field(default=None, repr=False)
+    _c_s: Optional[List[int]] = field(default=None, repr=False)
+    _s_orig: Optional[List[int]] = field(default=None, repr=False)
+    _identity: Optional[bool] = field(default=None, repr=False)
+
+    @property
+    def c_s(self) -> List[int]:
+        """condensed[i] → s 인덱스"""
+        if self._c_s is None:
+            m: List[int] = []
+            for r in WORD_RUNS.finditer(self.s):
+                m.extend(range(r.start(), r.end()))
+            self._c_s = m
+        return self._c_s
+
+    def _orig_map(self) -> Optional[List[int]]:
+        """s[i] → 원문 인덱스 (None = 항등)"""
+        if self._identity is None:
+            len_safe = self.normalizer is None or self.normalizer.len_safe
+            self._identity = (
+                len_safe and len(self.s) == len(self.text)
+                and unicodedata.is_normalized("NFKC", self.text)
+                and not ZERO_WIDTH.search(self.text)
+            )
+            if not self._identity:
+                table = self.normalizer.table if self.normalizer else {}
+                self._s_orig = _segment_map(self.text, table)
+        return None if self._identity else self._s_orig
+
+    def s_to_orig(self, i: int) -> int:
+        m = self._orig_map()
+        if m is None:
+            return i
+        if not m:
+            return 0
+        return m[min(max(i, 0), len(m) - 1)]
+
+    def orig_span(self, c_start: int, c_end: int) -> Tuple[int, int]:
+        """condensed 구간 [c_start, c_end) → 원문 구간 [a, b)"""
+        cs = self.c_s
+        if not cs or c_end <= c_start:
+            return 0, 0
+        a = self.s_to_orig(cs[min(c_start, len(cs) - 1)])
+        b = self.s_to_orig(cs[min(c_end, len(cs)) - 1]) + 1
+        # 마지막 글자가 여러 원문 글자(결합문자 등)에서 왔으면 세그먼트 끝까지
+        while b < len(self.text) and not _is_starter(self.text[b]):
+            b += 1
+        return a, b
+
+    def orig_text(self, c_start: int, c_end: int) -> str:
+        a, b = self.orig_span(c_start, c_end)
+        return self.text[a:b]
+
+def _segment_map(text: str, table: dict) -> List[int]:
+    """
+    세그먼트(기저 글자 + 결합 글자) 단위로 같은 파이프라인을 적용해 출력 글자별 원문 시작 인덱스 기록.
+    NFKC 조합은 세그먼트 안에서만 일어나므로 전체 정규화 결과와 (사실상) 같은 길이를 가짐.
+    """
+    orig: List[int] = []
+    n, i = len(text), 0
+    while i < n:
+        j = i + 1
+        while j < n and not _is_starter(text[j]):
+            j += 1
+        seg = unicodedata.normalize("NFKC", text[i:j]).translate(table)
+        seg = ZERO_WIDTH.sub("", seg).lower()
+        orig.extend([i] * len(seg))
+        i = j
+    return orig
+
+class Normalizer:
+    """rules.homoglyphs로 만든 변환 테이블을 1회 컴파일해 재사용"""
+    def __init__(self, homoglyphs: Optional[Dict[str, str]] = None):
+        homo = {k: v for k, v in (homoglyphs or {}).items() if k}
+        self.table = str.maketrans(homo)
+        # 모든 치환이 1:1이면 translate가 길이를 보존 → 원문 오프셋이 항등일 수 있음
+        self.len_safe = all(len(v) == 1 for v in homo.values())
+
+    def __call__(self, text: str) -> Normalized:
+        text = text or ""
+        s = unicodedata.normalize("NFKC", text).translate(self.table)
+        s = ZERO_WIDTH.sub("", s).lower()
+        return Normalized(text, s, NONWORD.sub("", s), self)
+
+    def condense(self, text: str) -> str:
+        return self(text).condensed
@@ -0,0 +1,65 @@
+# guard/detectors/phash_index.py
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import imagehash
+
+HashLike = Union[int, imagehash.ImageHash]
+
+def hash_to_int(h: HashLike) -> int:
+    """64bit ImageHash(8x8) → int (imagehash의 행 우선 비트 순서 유지)"""
+    if isinstance(h, int):
+        return h
+    bits = np.asarray(h.hash, dtype=bool).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+# numpy<2.0 대비 바이트 단위 popcount 테이블
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount64(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _POP8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+class PHashIndex:
+    """
+    레퍼런스 pHash 인덱스: packed uint64 배열 + 벡터화 XOR/popcount 해밍 검색.
+    10만개 규모까지 선형 스캔으로 충분(벤치: python -m guard.bench.phash_index).
+    """
+    def __init__(self):
+        self.names: List[str] = []
+        self.bits = np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, HashLike]]) -> "PHashIndex":
+        idx = cls()
+        names, vals = [], []
+        for name, h in items:
+            names.append(name); vals.append(hash_to_int(h))
+        idx.names = names
+        idx.bits = np.array(vals, dtype=np.uint64)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def distances(self, q: HashLike) -> np.ndarray:
+        return _popcount64(np.bitwise_xor(self.bits, np.uint64(hash_to_int(q))))
+
+    def topk(self, q: HashLike, k: int = 1, max_dist: Optional[int] = None) -> List[Tuple[int, str]]:
+        """return [(distance, name)] 거리 오름차순 최대 k개"""
+        n = len(self.names)
+        if not n or k <= 0:
+            return []
+        d = self.distances(q)
+        k = min(k, n)
+        sel = np.argpartition(d, k - 1)[:k] if k < n else np.arange(n)
+        sel = sel[np.argsort(d[sel], kind="stable")]
+        out = [(int(d[i]), self.names[i]) for i in sel]
+        if max_dist is not None:
+            out = [x for x in out if x[0] <= max_dist]
+        return out
+
+    def nearest(self, q: HashLike) -> Tuple[int, Optional[str]]:
+        top = self.topk(q, 1)
+        return top[0] if top else (999, None)
@@ -1,19 +1,31 @@
 # guard/detectors/qr.py
-import io, logging
-from typing import List
+import io, math, time, hashlib, asyncio, logging, functools, operator, warnings
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
 import numpy as np
-from PIL import Image, ImageOps
+from PIL import Image, ImageFilter, ImageOps
 import zxingcpp
 import discord
 
 from ..config import Config
+from ..state import State
+from ..executor import PoolBusy
+from .. import metrics
 
 log = logging.getLogger("guard.detectors.qr")
 
+# 형식을 선언하지 않은 업로드(확장자 없음 등) — 선언 대신 다운로드 시 매직 바이트로 판별
+_UNTYPED = {"", "application/octet-stream", "binary/octet-stream", "application/unknown"}
+
 def is_scannable_attachment(att: discord.Attachment, cfg: Config) -> bool:
-    ct = (att.content_type or "").lower()
-    if not ct.startswith("image/"):
+    """
+    다운로드 전 1차 거름: Discord가 잰 size와, 다른 형식으로 명시 선언된 첨부(영상/문서 등)만 제외.
+    image/* 또는 미선언(octet-stream 등)은 통과 → 실제 형식은 Downloader가 바이트로 판정(image_formats).
+    """
+    ct = (att.content_type or "").lower().split(";")[0].strip()
+    if not (ct.startswith("image/") or ct in _UNTYPED):
         return False
     if cfg.qr_exclude_gif and ct == "image/gif":
         return False
@@ -23,57 +35,317 @@ def is_scannable_attachment(att: discord.Attachment, cfg: Config) -> bool:
         return False
     return True
 
+_PROXY_MODULE_PX = 3.0    # 축소본에서 파인더 프리체크/디코드가 안정적인 최소 모듈 크기(px)
+
+def resized_url(att: discord.Attachment, side: int, min_module: float = 0.0) -> Optional[str]:
+    """
+    Discord 미디어 프록시(proxy_url?width=&height=)로 긴 변 side px 축소본 URL.
+    min_module > 0: 원본에서 모듈 min_module px인 QR이 축소 후에도 _PROXY_MODULE_PX 이상 남도록 side를 키움
+    (그래야 축소본의 '파인더 없음' 음성을 확정으로 쓸 수 있음).
+    치수를 모르거나 필요한 변이 원본 이상이면 None(원본 사용).
+    """
+    w, h = getattr(att, "width", None), getattr(att, "height", None)
+    proxy = getattr(att, "proxy_url", None)
+    if side <= 0 or not (w and h and proxy):
+        return None
+    if min_module > 0:
+        side = max(side, math.ceil(max(w, h) * _PROXY_MODULE_PX / min_module))
+    if max(w, h) <= side:
+        return None
+    k = side / max(w, h)
+    u = urlsplit(proxy)
+    q = [(a, b) for a, b in parse_qsl(u.query) if a not in ("width", "height")]
+    q += [("width", str(max(1, round(w * k)))), ("height", str(max(1, round(h * k))))]
+    return urlunsplit(u._replace(query=urlencode(q)))
+
+def image_formats(cfg: Config) -> frozenset:
+    """다운로드 시 매직 바이트로 허용할 형식(image/*로 선언됐어도 바이트가 다르면 거부, 미선언 첨부도 여기서 판정)"""
+    fmts = {"png", "jpeg", "webp", "bmp"}
+    if not cfg.qr_exclude_gif:
+        fmts.add("gif")
+    return frozenset(fmts)
+
 def _is_qr_format(fmt_obj) -> bool:
     name = getattr(fmt_obj, "name", str(fmt_obj))
     s = (name or "").replace(" ", "").lower()
     return s in {"qrcode", "microqrcode", "rmqrcode"} or s.endswith("qrcode")
 
-def _pil_variants(img: Image.Image):
-    img = img.convert("RGB")
+# --- 단계별 디코드 파이프라인 -------------------------------------------------
+# 1) 축소 그레이 1회(저비용) → 2) 파인더 패턴 프리체크 → 3) 가능성 있을 때만 단계 확장
+# try_rotate=True가 90/180/270 회전을 이미 처리하므로 수동 transpose는 하지 않음.
+
+_SMALL_SIDE = 1024        # 1단계 축소 기준(긴 변)
+_UPSCALE_BELOW = 600      # 이보다 작은 이미지만 2x 업스케일 단계 수행
+_FINDER_MIN_HITS = 3      # 모듈 크기가 비슷한 파인더 패턴(1:1:3:1:1) 후보 수
+_FINDER_MIN_SPAN = 14     # 패턴 전체 폭 최소 px(모듈 2px 미만은 노이즈로 간주)
+
+def _qr_formats():
+    fmts = [getattr(zxingcpp.BarcodeFormat, n) for n in ("QRCode", "MicroQRCode", "RMQRCode")
+            if hasattr(zxingcpp.BarcodeFormat, n)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return functools.reduce(operator.or_, fmts)
+
+_QR_FORMATS = _qr_formats()
+_BIN = zxingcpp.Binarizer
+
+@dataclass
+class QrDecode:
+    texts: List[str] = field(default_factory=list)
+    stage: Optional[str] = None        # 히트한 단계명
+    likely: bool = False               # 파인더 패턴 프리체크(또는 1단계 히트)
+    calls: int = 0                     # read_barcodes 호출 수
+    cpu_ms: float = 0.0
+    tried: List[str] = field(default_factory=list)
+    over_budget: bool = False
+    ok: bool = True                    # False = 풀 포화/타임아웃/오류(판정 불가)
+    shed: bool = False                 # 부하 셰딩으로 확장 단계 생략(확정 음성 아님)
+    dhash: Optional[int] = None        # qr_cache_phash 사용 시 64bit dHash(알려진 양성 힌트용)
+
+def _ratio_ok(win: np.ndarray) -> np.ndarray:
+    total = win.sum(axis=-1)
+    unit = total / 7.0
+    var = unit / 2.0
+    return (
+        (total >= _FINDER_MIN_SPAN)
+        & (np.abs(win[..., 0] - unit) < var) & (np.abs(win[..., 1] - unit) < var)
+        & (np.abs(win[..., 2] - 3 * unit) < 3 * var)
+        & (np.abs(win[..., 3] - unit) < var) & (np.abs(win[..., 4] - unit) < var)
+    )
+
+def _runs(line: np.ndarray, thr: float):
+    dark = line < thr
+    edges = np.flatnonzero(dark[1:] != dark[:-1]) + 1
+    bounds = np.concatenate(([0], edges, [len(line)]))
+    return bounds, np.diff(bounds).astype(np.float32)
+
+def _finder_centers(g: np.ndarray, cap: int = 64) -> List[Tuple[int, int, float]]:
+    """
+    전역 임계값 이진화 후 샘플 행에서 1:1:3:1:1 런 탐색 → 같은 중심의 열 방향 재확인.
+    return [(x, y, module_px)] — 극성 무관(반전 QR 포함), 90° 회전에도 비율 유지.
+    """
+    h, w = g.shape[:2]
+    out: List[Tuple[int, int, float]] = []
+    if h < 21 or w < 21:
+        return out
+    thr = float(g.mean())
+    for y in range(0, h, max(1, h // 256)):
+        bounds, runs = _runs(g[y], thr)
+        if len(runs) < 5:
+            continue
+        ok = _ratio_ok(np.lib.stride_tricks.sliding_window_view(runs, 5))
+        for i in np.flatnonzero(ok)[:8]:
+            x = int((bounds[i + 2] + bounds[i + 3]) // 2)
+            uh = float(runs[i: i + 5].sum()) / 7.0
+            cb, cr = _runs(g[:, x], thr)
+            j = int(np.searchsorted(cb, y, side="right")) - 1   # y를 포함하는 런
+            if j < 2 or j + 3 > len(cr):
+                continue
+            win = cr[j - 2: j + 3]
+            uv = float(win.sum()) / 7.0
+            if bool(_ratio_ok(win)) and abs(uh - uv) < 0.3 * max(uh, uv):
+                out.append((x, y, (uh + uv) / 2.0))
+                if len(out) >= cap:
+                    return out
+    return out
+
+def _finder_likely(g: np.ndarray, min_hits: int = _FINDER_MIN_HITS) -> bool:
+    """서로 떨어진 파인더 후보가 모듈 크기가 비슷하게 min_hits개 이상 → QR 가능성 있음"""
+    centers: List[Tuple[int, int, float]] = []
+    for x, y, u in _finder_centers(g):
+        # 같은 파인더의 인접 행 중복 병합
+        if any(abs(x - cx) < 3.5 * cu and abs(y - cy) < 3.5 * cu for cx, cy, cu in centers):
+            continue
+        centers.append((x, y, u))
+    for x, y, u in centers:
+        near = sum(
+            1 for cx, cy, cu in centers
+            if abs(u - cu) < 0.3 * max(u, cu) and max(abs(x - cx), abs(y - cy)) <= 180 * u
+        )
+        if near >= min_hits:  # 자기 자신 포함
+            return True
+    return False
+
+def _stages(g: Image.Image, small: Image.Image):
+    """확장 단계: (이름, 이미지, 바이너라이저들) — 1단계 이후에만 생성"""
+    yield "gray_alt", small, (_BIN.GlobalHistogram, _BIN.FixedThreshold)
+    if small.size != g.size:
+        yield "gray_full", g, (_BIN.LocalAverage,)
+    yield "invert", ImageOps.invert(small), (_BIN.LocalAverage, _BIN.GlobalHistogram)
+    yield "autocontrast", ImageOps.autocontrast(small, cutoff=2), (_BIN.LocalAverage, _BIN.GlobalHistogram)
+    if max(g.size) < _UPSCALE_BELOW:
+        yield "upscale", g.resize((g.width * 2, g.height * 2), Image.NEAREST), (_BIN.LocalAverage,)
+
+def _read(arr: np.ndarray, binarizer, try_invert: bool = False) -> List[str]:
+    out = []
+    for r in zxingcpp.read_barcodes(
+        arr, formats=_QR_FORMATS, try_rotate=True, try_downscale=True,
+        try_invert=try_invert, binarizer=binarizer,
+    ) or []:
+        if _is_qr_format(getattr(r, "format", "")) and getattr(r, "text", ""):
+            out.append(r.text)
+    return out
+
+def _dhash(g: Image.Image) -> int:
+    a = np.asarray(g.resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (a[:, 1:] > a[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def decode_pipeline(img: Image.Image, stage_ms: float = 120.0, image_ms: float = 500.0,
+                    want_dhash: bool = False, escalate: bool = True, force: bool = False) -> QrDecode:
+    """
+    단계별 조기 종료 디코드. 예산은 스레드 CPU 시간 기준.
+    - stage_ms: 단계당 예산(초과 시 해당 단계의 남은 바이너라이저 생략)
+    - image_ms: 이미지 전체 예산(초과 시 중단, over_budget=True)
+    - want_dhash: 축소 그레이의 dHash를 res.dhash로 반환(판정에는 쓰지 않음)
+    - escalate=False: 1단계만(부하 셰딩) — 파인더 패턴이 보여도 확장하지 않고 shed=True
+    - force: 프리체크 결과와 무관하게 확장(알려진 양성과 dHash가 일치한 재확인용)
+    """
+    t0 = time.thread_time()
+    res = QrDecode()
+
+    def spent_ms(since: float) -> float:
+        return (time.thread_time() - since) * 1000.0
+
     g = img.convert("L")
-    variants = [
-        img,
-        ImageOps.invert(img),
-        g,
-        ImageOps.invert(g),
-        ImageOps.autocontrast(g, cutoff=2),
-        g.resize((max(1, g.width*2), max(1, g.height*2)), Image.NEAREST),
-    ]
-    for im in variants:
-        yield im
-        yield im.transpose(Image.ROTATE_90)
-        yield im.transpose(Image.ROTATE_180)
-        yield im.transpose(Image.ROTATE_270)
-
-def _zxing_decode_pil(img: Image.Image) -> List[str]:
-    texts = set()
-    binarizers = [
-        zxingcpp.Binarizer.LocalAverage,
-        zxingcpp.Binarizer.GlobalHistogram,
-        zxingcpp.Binarizer.FixedThreshold,
-    ]
-    for im in _pil_variants(img):
-        arr = np.ascontiguousarray(np.array(im))
+    k = max(1, -(-max(g.size) // _SMALL_SIDE))
+    small = g.reduce(k) if k > 1 else g
+
+    if want_dhash:
+        res.dhash = _dhash(small)
+
+    # 1) 저비용 1회
+    res.tried.append("gray_small")
+    res.calls += 1
+    texts = _read(np.asarray(small), _BIN.LocalAverage, try_invert=True)
+    if texts:
+        res.texts, res.stage, res.likely = list(dict.fromkeys(texts)), "gray_small", True
+        res.cpu_ms = spent_ms(t0)
+        return res
+
+    # 2) 프리체크 — 파인더 패턴이 안 보이면 확장하지 않음(작은 QR 대비 원본 해상도에서 행 샘플링)
+    res.likely = force or _finder_likely(np.asarray(g))
+    if not res.likely and max(g.size) < _UPSCALE_BELOW:
+        # 작은 이미지의 강한 노이즈는 1:1:3:1:1 런을 끊음 → 블러 후 한 번 더(업스케일 단계 대상만이라 저비용)
+        res.likely = _finder_likely(np.asarray(g.filter(ImageFilter.BoxBlur(1))))
+    if not res.likely:
+        res.cpu_ms = spent_ms(t0)
+        return res
+    if not escalate:
+        res.shed = True
+        res.cpu_ms = spent_ms(t0)
+        return res
+
+    # 3) 확장
+    for name, im, binarizers in _stages(g, small):
+        if spent_ms(t0) >= image_ms:
+            res.over_budget = True
+            break
+        res.tried.append(name)
+        arr = np.ascontiguousarray(np.asarray(im))
+        ts = time.thread_time()
         for b in binarizers:
-            results = zxingcpp.read_barcodes(
-                arr, try_rotate=True, try_downscale=True, binarizer=b,
-            )
-            for r in results or []:
-                if _is_qr_format(getattr(r, "format", "")) and getattr(r, "text", ""):
-                    texts.add(r.text)
+            res.calls += 1
+            texts = _read(arr, b)
             if texts:
+                res.texts, res.stage = list(dict.fromkeys(texts)), name
+                res.cpu_ms = spent_ms(t0)
+                return res
+            if spent_ms(ts) >= stage_ms:
                 break
-        if texts:
-            break
-    return list(texts)
+    res.cpu_ms = spent_ms(t0)
+    return res
 
-async def detect_qr_bytes(b: bytes) -> List[str]:
+def _decode_job(b: bytes, stage_ms: float, image_ms: float, want_dhash: bool = False,
+                max_pixels: int = 0, escalate: bool = True, force: bool = False) -> QrDecode:
+    # 풀 워커에서 실행(프로세스 풀 대비 모듈 최상위 함수로 유지)
+    # BytesIO(bytes)는 버퍼를 복사하지 않고 공유
+    with Image.open(io.BytesIO(b)) as img:
+        if max_pixels and img.width * img.height > max_pixels:
+            return QrDecode(ok=False)    # 헤더 스니핑을 우회한 폭탄(치수 헤더가 늦게 오는 JPEG 등)
+        return decode_pipeline(img, stage_ms, image_ms, want_dhash, escalate, force)
+
+def _record(res: QrDecode):
+    for name in res.tried:
+        metrics.inc("qr_stage_try", stage=name)
+    if res.stage:
+        metrics.inc("qr_stage_hit", stage=res.stage)
+    metrics.inc("qr_precheck", likely=res.likely)
+    metrics.inc("qr_read_calls", res.calls)
+    if res.over_budget:
+        metrics.inc("qr_over_budget")
+    if res.shed:
+        metrics.inc("qr_shed_escalate")
+    metrics.observe("qr_decode_cpu_seconds", res.cpu_ms / 1000.0)
+
+def stage_hit_rates() -> dict[str, tuple[int, int, float]]:
+    """단계별 (시도, 히트, 히트율) — 사다리 튜닝용"""
+    out = {}
+    hits = {dict(k).get("stage"): v for k, v in metrics.counters("qr_stage_hit").items()}
+    for k, tries in metrics.counters("qr_stage_try").items():
+        name = dict(k).get("stage")
+        h = int(hits.get(name, 0))
+        out[name] = (int(tries), h, (h / tries) if tries else 0.0)
+    return out
+
+def content_digest(b: bytes) -> bytes:
+    return hashlib.blake2b(b, digest_size=16).digest()
+
+async def _pool_decode(b: bytes, cfg: Config, state: State, escalate: bool, force: bool = False) -> QrDecode:
     try:
-        img = Image.open(io.BytesIO(b))
-        return _zxing_decode_pil(img)
+        res = await state.conc.qr_pool.run(
+            _decode_job, b, cfg.qr_stage_budget_ms, cfg.qr_image_budget_ms, cfg.qr_cache_phash,
+            cfg.qr_max_pixels, escalate, force,
+        )
+    except PoolBusy as e:
+        log.warning("QR 디코드 대기열 초과, 스킵: %s", e)
+        return QrDecode(ok=False)
+    except asyncio.TimeoutError:
+        log.warning("QR 디코드 시간 초과(%ss), 스킵", state.conc.qr_pool.timeout)
+        return QrDecode(ok=False)
     except Exception as e:
         log.warning("QR 디코딩 실패: %s", e)
-        return []
+        return QrDecode(ok=False)
+    _record(res)
+    if res.stage:
+        log.debug("QR 히트: stage=%s calls=%d cpu=%.1fms", res.stage, res.calls, res.cpu_ms)
+    return res
+
+async def decode_qr_bytes(b: bytes, cfg: Config, state: State, escalate: bool = True) -> QrDecode:
+    """
+    1) 콘텐츠 다이제스트 판정 캐시(state.caches.qr_verdict) — 같은 이미지 재업로드는 zxing 생략
+    2) 디코드는 state.conc.qr_pool에서 실행(이벤트 루프 블로킹 방지).
+    동시 디코드 수는 호출측의 state.conc.qr_sem으로 제한.
+    """
+    key = content_digest(b)
+    cached = state.caches.qr_verdict.get(key)
+    if cached is not None:
+        # (텍스트 튜플, likely) — 파인더는 보였는데 못 읽은 음성은 likely=True 그대로(축소본이면 원본 폴백 유지)
+        texts, likely = cached
+        return QrDecode(texts=list(texts), stage="cache", likely=likely)
+
+    res = await _pool_decode(b, cfg, state, escalate)
+    if not res.ok:
+        return res
+    # 재인코딩 사본: dHash가 알려진 양성과 일치해도 텍스트는 반드시 디코드로 확인
+    # (같은 템플릿의 다른 QR도 dHash가 겹칠 수 있음 — 힌트는 프리체크 생략 + 전 단계 확장에만 사용)
+    if (not res.texts and not res.likely and escalate and res.dhash is not None
+            and state.caches.qr_phash.get(res.dhash) is not None):
+        metrics.inc("qr_phash_hint")
+        forced = await _pool_decode(b, cfg, state, escalate, force=True)
+        if forced.ok:
+            metrics.inc("qr_phash_hint_confirmed", ok=bool(forced.texts))
+            res = forced
+
+    # 예산 초과/셰딩으로 끊긴 음성은 확정 판정이 아니므로 캐시하지 않음
+    if res.texts or not (res.over_budget or res.shed):
+        state.caches.qr_verdict.set(key, (tuple(res.texts), bool(res.texts) or res.likely))
+    if res.texts and res.dhash is not None:
+        state.caches.qr_phash.set(res.dhash, tuple(res.texts))
+    return res
+
+async def detect_qr_bytes(b: bytes, cfg: Config, state: State) -> List[str]:
+    return (await decode_qr_bytes(b, cfg, state)).texts
 
 def obfuscate(text: str) -> str:
     return (text or "").replace("http", "hxxp").replace(".", "[.]")
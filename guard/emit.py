@@ -1,11 +1,14 @@
 # guard/emit.py
-import logging
+import asyncio, logging, time
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from typing import Iterable, Optional
 
 import discord
 from .schemas import EventKind, LogPayload
 from .config import Config
+from . import metrics, trace
 
 log = logging.getLogger("guard.emit")
 UTC = timezone.utc
@@ -124,11 +127,9 @@ class _BanView(discord.ui.View):
         st = getattr(client, "_guard_state", None)
         if st:
             key = (guild.id, target_user_id, interaction.message.id)
-            exp = st.caches.ban_action_exp.get(key, 0)
-            now = now_utc().timestamp()
-            if exp and exp > now:
+            if st.caches.ban_action.contains(key):
                 return await interaction.followup.send("이미 처리 중이거나 완료됨", ephemeral=True)
-            st.caches.ban_action_exp[key] = now + 300
+            st.caches.ban_action.add(key)
 
         # Ban 시도 (유저가 나갔어도 ID ban 가능)
         try:
@@ -165,7 +166,151 @@ class _BanView(discord.ui.View):
         # 성공 시 별도 완료 메시지 전송하지 않음(임베드 라벨로 피드백)
         return
 
+# --- 디스패처 -----------------------------------------------------------------
+# 핸들러는 큐에 넣기만 하고, 채널별 워커가 전송(메인/서브 채널은 워커가 달라 병렬).
+# 버스트 시 연속된 임베드(버튼 없는 것)는 메시지 1건에 최대 10개, QR 텍스트는 2000자까지 합쳐 보냄.
+
+_MAX_EMBEDS = 10
+_MAX_EMBED_CHARS = 6000     # 메시지 1건의 임베드 합계 한도
+_MAX_TEXT = 2000
+
+@dataclass
+class _Item:
+    kind: EventKind
+    text: Optional[str] = None
+    embed: Optional[discord.Embed] = None
+    button: bool = False        # Ban 버튼은 임베드 1개와 짝(버튼이 첫 임베드의 ID를 읽음) → 단독 전송
+    t0: float = field(default_factory=time.perf_counter)
+
+    def size(self) -> int:
+        return len(self.text) if self.text is not None else len(self.embed)
+
+def _fits(batch: list[_Item], it: _Item) -> bool:
+    head = batch[0]
+    if head.button or it.button or (head.text is None) != (it.text is None):
+        return False
+    if it.text is not None:
+        return sum(b.size() + 2 for b in batch) + it.size() <= _MAX_TEXT
+    return len(batch) < _MAX_EMBEDS and sum(b.size() for b in batch) + it.size() <= _MAX_EMBED_CHARS
+
+class LogDispatcher:
+    """
+    채널별 큐 + 워커. 큐가 가득 차면 overflow 정책:
+    - summarize: 새 항목을 버리고, 큐가 비면 "[로그 N건 생략]" 요약 1건 전송(기본)
+    - drop_new / drop_oldest: 버리기만(metrics emit_dropped)
+    """
+    def __init__(self, client: discord.Client, maxsize: int = 200, overflow: str = "summarize"):
+        self.client = client
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._channels: dict[int, discord.abc.Messageable] = {}
+        self._dropped: dict[int, Counter] = {}
+
+    def put(self, cid: int, item: _Item):
+        q = self._queues.get(cid)
+        if q is None:
+            q = self._queues[cid] = asyncio.Queue(self.maxsize)
+            self._workers[cid] = asyncio.create_task(self._run(cid, q), name=f"emit:{cid}")
+        if q.full():
+            if self.overflow == "drop_oldest":
+                self._drop(cid, q.get_nowait())
+                q.task_done()
+            else:
+                self._drop(cid, item)
+                return
+        q.put_nowait(item)
+        metrics.set_gauge("emit_queue_depth", q.qsize(), channel=cid)
+
+    def _drop(self, cid: int, item: _Item):
+        self._dropped.setdefault(cid, Counter())[item.kind] += 1
+        metrics.inc("emit_dropped", kind=item.kind, policy=self.overflow)
+
+    async def _channel(self, cid: int):
+        ch = self._channels.get(cid) or self.client.get_channel(cid)
+        if ch is None:
+            try:
+                ch = await self.client.fetch_channel(cid)
+            except Exception as e:
+                log.warning("로그 채널 조회 실패(%s): %s", cid, e)
+                return None
+        self._channels[cid] = ch
+        return ch
+
+    async def _run(self, cid: int, q: asyncio.Queue):
+        carry: Optional[_Item] = None
+        while True:
+            batch = [carry if carry is not None else await q.get()]
+            carry = None
+            while not q.empty():
+                it = q.get_nowait()
+                if _fits(batch, it):
+                    batch.append(it)
+                else:
+                    carry = it
+                    break
+            try:
+                await self._send(cid, batch)
+                if carry is None and q.empty() and self._dropped.get(cid):
+                    await self._summarize(cid)
+            except Exception as e:
+                log.warning("%s 로그 전송 실패(%s): %s", batch[0].kind, cid, e)
+            finally:
+                for _ in batch:
+                    q.task_done()
+            metrics.set_gauge("emit_queue_depth", q.qsize(), channel=cid)
+
+    async def _send(self, cid: int, batch: list[_Item]):
+        ch = await self._channel(cid)
+        if ch is None:
+            return
+        head = batch[0]
+        with metrics.timer("rest_seconds", op="send"):
+            if head.text is not None:
+                await ch.send("\n\n".join(b.text for b in batch), allowed_mentions=ALLOW_NONE)
+            elif head.button:
+                await ch.send(embed=head.embed, allowed_mentions=ALLOW_NONE, view=_BanView(timeout=None))
+            else:
+                await ch.send(embeds=[b.embed for b in batch], allowed_mentions=ALLOW_NONE)
+        now = time.perf_counter()
+        metrics.observe("emit_batch_size", len(batch), buckets=(1, 2, 3, 5, 10))
+        for b in batch:
+            metrics.inc("emit_sent", kind=b.kind)
+            metrics.observe("emit_latency_seconds", now - b.t0)
+
+    async def _summarize(self, cid: int):
+        dropped = self._dropped.pop(cid)
+        if self.overflow != "summarize":
+            return
+        detail = ", ".join(f"{k} {n}" for k, n in dropped.items())
+        ch = await self._channel(cid)
+        if ch is None:
+            return
+        try:
+            await ch.send(f"[로그 {sum(dropped.values())}건 생략: {detail}] (큐 포화)", allowed_mentions=ALLOW_NONE)
+        except Exception as e:
+            log.warning("로그 생략 요약 전송 실패(%s): %s", cid, e)
+
+    async def flush(self, timeout: float = 5.0):
+        """남은 로그 전송 후 워커 종료(종료 시)"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues.values())), timeout)
+        except asyncio.TimeoutError:
+            log.warning("로그 큐 비우기 시간 초과(%ss)", timeout)
+        for t in self._workers.values():
+            t.cancel()
+
+_DISPATCHER: Optional[LogDispatcher] = None
+
+def dispatcher(client: discord.Client, cfg: Config) -> LogDispatcher:
+    global _DISPATCHER
+    if _DISPATCHER is None or _DISPATCHER.client is not client:
+        _DISPATCHER = LogDispatcher(client, cfg.emit_queue_max, cfg.emit_overflow)
+    return _DISPATCHER
+
 async def emit(client: discord.Client, cfg: Config, kind: EventKind, payload: LogPayload):
+    """큐에 넣고 즉시 반환(전송은 채널별 워커)"""
     # 대상 채널 결합
     mains = [cfg.log_qr_channel_id] if kind == "QR" else [cfg.log_phish_channel_id]
     targets: list[int] = []
@@ -173,26 +318,21 @@ async def emit(client: discord.Client, cfg: Config, kind: EventKind, payload: Lo
         if cid: targets.append(cid)
     if not targets: return
 
-    if kind == "QR":
-        text = _build_qr_text(payload)
+    # 임베드 구성 + 큐 적재만(전송은 워커) — 트레이스에서는 이벤트 처리 중 로그 비용
+    with trace.span("emit", kind=kind, targets=len(targets)):
+        if kind == "QR":
+            item = _Item(kind, text=_build_qr_text(payload))
+        else:
+            # 색상 결정: 버튼이 있는 MESSAGE는 빨강, 그 외는 기본(무지정)
+            lower_effect = (payload.policy_effect or "").lower()
+            show_button = (
+                kind == "MESSAGE"
+                and cfg.enable_ban_button
+                and ("timeout" in lower_effect)
+            )
+            color = (RED if show_button else None)
+            emb = _build_avatar_embed(payload, color=color) if kind == "AVATAR" else _build_message_embed(payload, color=color)
+            item = _Item(kind, embed=emb, button=show_button)
+        d = dispatcher(client, cfg)
         for cid in targets:
-            ch = client.get_channel(cid) or await client.fetch_channel(cid)
-            try: await ch.send(text, allowed_mentions=ALLOW_NONE)
-            except Exception as e: log.warning("QR 로그 전송 실패(%s): %s", cid, e)
-        return
-
-    # 색상 결정: 버튼이 있는 MESSAGE는 빨강, 그 외는 기본(무지정)
-    lower_effect = (payload.policy_effect or "").lower()
-    show_button = (
-        kind == "MESSAGE"
-        and cfg.enable_ban_button
-        and ("timeout" in lower_effect)
-    )
-    color = (RED if show_button else None)
-    emb = _build_avatar_embed(payload, color=color) if kind == "AVATAR" else _build_message_embed(payload, color=color)
-    for cid in targets:
-        ch = client.get_channel(cid) or await client.fetch_channel(cid)
-        try:
-            view = _BanView(timeout=None) if show_button else None
-            await ch.send(embed=emb, allowed_mentions=ALLOW_NONE, view=view)
-        except Exception as e: log.warning("%s 로그 전송 실패(%s): %s", kind, cid, e)
+            d.put(cid, item)
@@ -0,0 +1,300 @@
+# guard/enforce.py
+import asyncio, itertools, logging, time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import discord
+
+from .schemas import EventKind, Tier
+from .config import Config
+from .cache import LRUTTLCache
+from .resolver import MemberResolver
+from . import metrics, trace
+
+log = logging.getLogger("guard.enforce")
+UTC = timezone.utc
+def now_utc() -> datetime: return datetime.now(UTC)
+
+_BULK_MAX = 100     # delete_messages 1회 상한
+
+def priority(kind: EventKind, tier: Tier) -> int:
+    """작을수록 먼저: QR/STRICT(밴 후보) → NORMAL → 그 외(아바타 등)"""
+    if kind == "QR" or tier == "STRICT":
+        return 0
+    if tier == "NORMAL":
+        return 1
+    return 2
+
+@dataclass(order=True)
+class _Job:
+    prio: int
+    seq: int
+    kind: EventKind = field(compare=False)
+    msg: discord.Message = field(compare=False)
+    tier: Tier = field(compare=False)
+    fut: asyncio.Future = field(compare=False)
+    t0: float = field(compare=False, default_factory=time.perf_counter)
+    span: Optional[trace.Span] = field(compare=False, default=None)     # 제출 시점 스팬(워커에서 이어 붙임)
+
+class Enforcer:
+    """
+    제재 스케줄러.
+    - 우선순위 큐 + 워커 N개: 레이드 중에도 QR/STRICT 밴이 먼저 나감
+    - 삭제와 밴은 동시 실행, 타임아웃은 밴이 없을 때만
+    - 유저 단위 중복 제거: 같은 유저의 밴/타임아웃은 진행중·완료 결과를 재사용(메시지 15건 → 밴 1회)
+    - 삭제는 채널별로 모아 delete_messages 일괄 호출(진행 중인 호출 동안 쌓인 것을 다음 배치로)
+    - QR/STRICT인데 밴이 아닌 경우 유저의 최근 메시지(크로스포스트 사본)도 채널별 병렬 일괄 삭제
+      (밴 성공 시에는 Discord가 최근 1일 메시지를 지우므로 생략)
+    """
+    def __init__(self, cfg: Config, members: MemberResolver, counters=None,
+                 recent: Optional[LRUTTLCache] = None, workers: int = 4):
+        self.cfg = cfg
+        self.members = members
+        self.counters = counters
+        self.recent = recent        # uid -> deque[(channel_id, message_id)] (handlers.context가 기록)
+        self.n_workers = max(1, workers)
+        self._q: Optional[asyncio.PriorityQueue] = None
+        self._workers: list[asyncio.Task] = []
+        self._seq = itertools.count()
+        # (guild_id, uid) -> {"ban": Task[bool], "timeout": Task[bool]} — 진행중/완료 제재 재사용
+        self._users = LRUTTLCache("enforced_users", 10_000, 600)
+        self._del_pending: dict[int, list[tuple[discord.Message, asyncio.Future]]] = {}
+        self._del_tasks: dict[int, asyncio.Task] = {}
+
+    async def submit(self, kind: EventKind, msg: discord.Message, tier: Tier) -> str:
+        """큐에 넣고 집행 결과 문자열을 기다림"""
+        if self._q is None:
+            self._q = asyncio.PriorityQueue()
+            self._workers = [asyncio.create_task(self._work(), name=f"enforce:{i}") for i in range(self.n_workers)]
+        fut = asyncio.get_running_loop().create_future()
+        self._q.put_nowait(_Job(priority(kind, tier), next(self._seq), kind, msg, tier, fut, span=trace.current()))
+        metrics.set_gauge("enforce_queue_depth", self._q.qsize())
+        return await asyncio.shield(fut)
+
+    async def _work(self):
+        while True:
+            job = await self._q.get()
+            metrics.observe("enforce_queue_seconds", time.perf_counter() - job.t0, prio=job.prio)
+            try:
+                with trace.within(job.span), trace.span("enforce_run", prio=job.prio,
+                                                         queued_ms=round((time.perf_counter() - job.t0) * 1000, 1)):
+                    effect = await self._run(job)
+                if not job.fut.done():
+                    job.fut.set_result(effect)
+            except Exception as e:
+                log.warning("제재 실행 오류: %s", e)
+                if not job.fut.done():
+                    job.fut.set_result("None")
+            finally:
+                self._q.task_done()
+
+    def enforced(self, guild_id: int, uid: int) -> Optional[EventKind]:
+        """밴/타임아웃이 진행 중이거나 성공한 유저 → 그 제재를 낸 탐지 종류(admission 빠른 경로 판정)"""
+        rec = self._users.get((guild_id, uid))
+        if not rec:
+            return None
+        for action in ("ban", "timeout"):
+            t = rec.get(action)
+            if t is not None and (not t.done() or (not t.cancelled() and t.exception() is None and t.result())):
+                return rec.get("kind", "MESSAGE")
+        return None
+
+    def _action(self, kind: EventKind) -> str:
+        return {
+            "QR": self.cfg.policy_qr,
+            "MESSAGE": self.cfg.policy_message,
+            "AVATAR": self.cfg.policy_avatar,
+        }[kind]
+
+    async def delete_only(self, msg: discord.Message, kind: EventKind) -> str:
+        """
+        탐지 생략 경로: 유저를 제재한 탐지 종류(kind)의 정책이 삭제를 포함할 때만
+        채널별 일괄 삭제 배치에 합류. 반환은 submit과 같은 결과 문자열.
+        """
+        if self._action(kind) not in ("delete", "delete_timeout"):
+            metrics.inc("enforce_fast_delete", ok="policy")
+            return "None"
+        ok = await self._delete(msg)
+        metrics.inc("enforce_fast_delete", ok=ok)
+        if ok and self.counters is not None:
+            self.counters.hour_enforce += 1
+        return "Delete" if ok else "None"
+
+    # --- 집행 ---------------------------------------------------------------
+    async def _run(self, job: _Job) -> str:
+        cfg, kind, msg, tier = self.cfg, job.kind, job.msg, job.tier
+        action = self._action(kind)
+        do_delete = action in ("delete", "delete_timeout")
+        do_ban = (
+            (kind == "MESSAGE" and tier == "STRICT" and cfg.ban_on_strict)
+            or (kind == "QR" and cfg.ban_on_qr)
+            or (kind == "MESSAGE" and tier == "NORMAL" and cfg.ban_on_normal)
+        )
+        do_timeout = action in ("timeout", "delete_timeout")
+
+        gid = getattr(getattr(msg, "guild", None), "id", 0)
+        key = (gid, getattr(msg.author, "id", 0))
+        rec = self._users.get(key)
+        if rec is None:
+            rec = {}
+            self._users.set(key, rec)
+
+        # 2) 삭제 ∥ 3) 밴 동시
+        del_task = asyncio.ensure_future(self._delete(msg)) if do_delete else None
+        effect_ban = False
+        if do_ban or "ban" in rec:
+            t = rec.get("ban")
+            if t is None:
+                t = rec["ban"] = asyncio.ensure_future(self._ban(msg, kind, tier))
+                rec["kind"] = kind
+            else:
+                metrics.inc("enforce_dedup", action="ban")
+            effect_ban = await asyncio.shield(t)
+            if not effect_ban and do_ban and t.done():
+                rec.pop("ban", None)      # 실패한 밴은 다음 이벤트에서 재시도
+        if effect_ban:
+            self._observe(job, "ban")
+        effect_delete = bool(await del_task) if del_task is not None else False
+        if effect_delete:
+            self._observe(job, "delete")
+
+        # 4) Timeout — 이미 Ban이면 스킵
+        effect_timeout = False
+        if (not effect_ban) and do_timeout:
+            t = rec.get("timeout")
+            if t is None:
+                t = rec["timeout"] = asyncio.ensure_future(self._timeout(msg))
+                rec.setdefault("kind", kind)
+            else:
+                metrics.inc("enforce_dedup", action="timeout")
+            effect_timeout = await asyncio.shield(t)
+            if not effect_timeout and t.done():
+                rec.pop("timeout", None)
+            if effect_timeout:
+                self._observe(job, "timeout")
+
+        # 4-1) 크로스포스트 사본 정리
+        if (kind == "QR" or tier == "STRICT") and not effect_ban and (effect_delete or effect_timeout):
+            await self._purge_recent(msg)
+
+        # 5) 카운터
+        if (effect_delete or effect_timeout or effect_ban) and self.counters is not None:
+            self.counters.hour_enforce += 1
+
+        # 6) 결과 문자열
+        if effect_ban and effect_delete: return "Ban + Delete"
+        if effect_ban: return "Ban"
+        if effect_timeout and effect_delete: return f"Timeout ({cfg.timeout_hours}h) + Delete"
+        if effect_timeout: return f"Timeout ({cfg.timeout_hours}h)"
+        if effect_delete: return "Delete"
+        return "None"
+
+    @staticmethod
+    def _observe(job: _Job, action: str):
+        metrics.observe("enforce_latency_seconds", time.perf_counter() - job.t0, action=action, kind=job.kind)
+
+    async def _ban(self, msg: discord.Message, kind: EventKind, tier: Tier) -> bool:
+        try:
+            member = await self.members.author(msg)
+            if not member:
+                log.warning("밴 스킵: 멤버 조회 실패 uid=%s", getattr(msg.author, "id", "?"))
+                return False
+            with metrics.timer("rest_seconds", op="ban"), trace.span("ban"):
+                await member.ban(reason=f"Automated ban by rules ({kind}{'/' + str(tier) if tier else ''})")
+            return True
+        except Exception as e:
+            log.warning("밴 실패: %s", e)
+            return False
+
+    async def _timeout(self, msg: discord.Message) -> bool:
+        try:
+            member = await self.members.author(msg)
+            if not member:
+                log.warning("타임아웃 스킵: 멤버 조회 실패 uid=%s mid=%s",
+                            getattr(msg.author, "id", "?"), getattr(msg, "id", "?"))
+                return False
+            until = now_utc() + timedelta(hours=self.cfg.timeout_hours)
+            with metrics.timer("rest_seconds", op="timeout"), trace.span("timeout"):
+                await member.edit(timed_out_until=until)
+            return True
+        except Exception as e:
+            log.warning("타임아웃 실패: %s", e)
+            return False
+
+    async def _purge_recent(self, msg: discord.Message) -> int:
+        ring = self.recent.pop(msg.author.id) if self.recent is not None else None
+        guild = getattr(msg, "guild", None)
+        if not ring or guild is None:
+            return 0
+        by_ch: dict[int, set[int]] = {}
+        for cid, mid in ring:
+            if mid != msg.id:
+                by_ch.setdefault(cid, set()).add(mid)
+
+        async def purge(cid: int, mids: set[int]) -> int:
+            ch = guild.get_channel_or_thread(cid)
+            if ch is None or not hasattr(ch, "delete_messages"):
+                return 0
+            objs = [discord.Object(id=m) for m in sorted(mids)]
+            n = 0
+            for i in range(0, len(objs), _BULK_MAX):
+                try:
+                    with metrics.timer("rest_seconds", op="bulk_delete"):
+                        await ch.delete_messages(objs[i:i + _BULK_MAX])
+                    n += len(objs[i:i + _BULK_MAX])
+                except Exception as e:
+                    log.debug("최근 메시지 정리 실패(%s): %s", cid, e)
+            return n
+
+        with trace.span("purge_recent", channels=len(by_ch)):
+            n = sum(await asyncio.gather(*(purge(c, m) for c, m in by_ch.items())))
+        if n:
+            metrics.inc("enforce_purged", n)
+            log.info("최근 메시지 정리: uid=%s %d건/%d채널", msg.author.id, n, len(by_ch))
+        return n
+
+    # --- 채널별 일괄 삭제 ----------------------------------------------------
+    async def _delete(self, msg: discord.Message) -> bool:
+        ch = msg.channel
+        cid = getattr(ch, "id", 0)
+        fut = asyncio.get_running_loop().create_future()
+        self._del_pending.setdefault(cid, []).append((msg, fut))
+        if cid not in self._del_tasks:
+            self._del_tasks[cid] = asyncio.create_task(self._flush_deletes(ch, cid))
+        with trace.span("delete"):
+            return await fut
+
+    async def _flush_deletes(self, ch, cid: int):
+        try:
+            while self._del_pending.get(cid):
+                pend = self._del_pending.pop(cid)
+                for i in range(0, len(pend), _BULK_MAX):
+                    chunk = pend[i:i + _BULK_MAX]
+                    for (_, fut), ok in zip(chunk, await self._delete_batch(ch, [m for m, _ in chunk])):
+                        if not fut.done():
+                            fut.set_result(ok)
+        finally:
+            self._del_tasks.pop(cid, None)
+
+    async def _delete_batch(self, ch, msgs: list[discord.Message]) -> list[bool]:
+        if len(msgs) > 1 and hasattr(ch, "delete_messages"):
+            try:
+                with metrics.timer("rest_seconds", op="bulk_delete"):
+                    await ch.delete_messages(msgs)
+                metrics.inc("enforce_bulk_delete")
+                metrics.inc("enforce_bulk_deleted", len(msgs))
+                return [True] * len(msgs)
+            except Exception as e:
+                # 14일 초과/이미 삭제된 메시지 등 → 개별 삭제로 폴백
+                log.debug("일괄 삭제 실패, 개별 삭제: %s", e)
+        out = []
+        for m in msgs:
+            try:
+                with metrics.timer("rest_seconds", op="delete"):
+                    await m.delete()
+                out.append(True)
+            except Exception as e:
+                log.warning("메시지 삭제 실패: %s", e)
+                out.append(False)
+        return out
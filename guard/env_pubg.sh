@@ -14,6 +14,8 @@ export MSG_EXEMPT_LOG_ONLY_IDS="590767390908743680"
 export LOG_QR_CHANNEL_ID="1095142986939109436"     # QR 메인
 export LOG_PHISH_CHANNEL_ID="1414799160837931028"  # 메시지/아바타 메인
 export LOG_SUB_CHANNEL_IDS="1416449915311231237"   # 서브(선택): 메인 로그와 동일 알림을 서브 채널에도 동시 전송
+export EMIT_QUEUE_MAX="200"             # 로그 채널별 큐 상한
+export EMIT_OVERFLOW="summarize"        # 큐 포화 시: summarize(생략 건수 요약) | drop_new | drop_oldest
 
 # --- 윈도/정책/스위치 ---
 export WINDOW_DAYS="50"                 # 텍스트 정밀 감시: 조인 ≤ N일
@@ -28,17 +30,66 @@ export POLICY_AVATAR="log"
 export BAN_ON_QR="1"                    # ✅ QR 검출 → Ban
 export BAN_ON_STRICT="1"                # ✅ STRICT → Ban
 export BAN_ON_NORMAL="0"                # 필요 시 켜기
+export ENFORCE_WORKERS="4"              # 제재 동시 실행 수(우선순위: QR/STRICT → NORMAL → 기타)
+export PURGE_RECENT_MAX="20"            # QR/STRICT 제재(밴 제외) 시 유저 최근 메시지 일괄 삭제 수(0=끔)
+export PURGE_RECENT_TTL_SEC="3600"       # 최근 메시지 기록 보관 시간
 
 # --- pHash / QR ---
 export PHASH_THRESHOLD="8"              # 6~8 추천
 export PHASH_COOLDOWN_H="6"             # 온디맨드 검사 쿨다운
 export PHASH_SEM="3"                    # 동시성
+export PHASH_TIMEOUT_SEC="5"            # 아바타 1장 해시 제한시간
+export PHASH_CACHE_SIZE="20000"         # avatar key → pHash 판정 캐시
+export PHASH_CACHE_TTL_H="168"
 export QR_MAX_BYTES="5242880"           # 5MB
+export QR_MAX_PIXELS="40000000"         # 헤더상 픽셀 수 상한(디컴프레션 폭탄 차단)
+export HTTP_POOL_SIZE="16"              # 첨부 다운로드 커넥션 풀
+export QR_PROXY_SIDE="1280"             # CDN 축소본 긴 변(px) 먼저 스캔, 불확실할 때만 원본(0=항상 원본)
+export QR_MIN_MODULE_PX="4"             # 이 모듈 크기(px) 이상의 QR은 축소본에서도 놓치지 않도록 축소본 변 하한 조정
 export QR_SEM="2"
 export QR_EXCLUDE_GIF="1"
+export QR_POOL="thread"                 # thread | process (디코드 실행기)
+export QR_WORKERS="2"
+export QR_QUEUE_MAX="16"                # 실행중+대기 디코드 상한(초과 시 스킵)
+export QR_TIMEOUT_SEC="8"               # 이미지 1장 디코드 제한시간
+export QR_STAGE_BUDGET_MS="120"         # 디코드 단계당 CPU 예산
+export QR_IMAGE_BUDGET_MS="500"         # 이미지당 CPU 예산(초과 시 확장 중단)
+export QR_CACHE_SIZE="4096"             # 동일 이미지 재업로드 판정 캐시
+export QR_CACHE_TTL_SEC="21600"
+export QR_CACHE_PHASH="0"               # 1이면 알려진 양성과 dHash가 같은 재인코딩 사본은 전 단계 재디코드(힌트만, 판정은 디코드)
+
+# --- 상태 캐시 상한(LRU 축출 + 자동 만료) ---
+export CACHE_MAX_MSGS="200000"          # 메시지/첨부 단위
+export CACHE_MAX_USERS="100000"         # 유저 단위
+export MEMBER_TTL_SEC="60"              # 멤버 조회 캐시(REST fetch_member 절감)
+export MEMBER_NEG_TTL_SEC="300"         # 나간 유저 네거티브 캐시
+# export SNAPSHOT_PATH="/var/lib/pubg-guard/state.db"  # 상태 캐시 스냅샷(SQLite WAL) — 미지정 시 guard/state.db, 빈 값이면 끔
+export SNAPSHOT_INTERVAL_SEC="60"        # 변경분 체크포인트 주기
+
+# --- 입장 제어(레이드 부하) ---
+export ADMIT_USER_RATE="0.5"            # 유저당 초당 메시지 토큰(0=끔) — 초과분은 QR 스캔 생략
+export ADMIT_USER_BURST="5"
+export ADMIT_CHANNEL_RATE="10"          # 채널당 초당 토큰(0=끔) — 초과분은 QR 확장/pHash 생략
+export ADMIT_CHANNEL_BURST="30"
+export ADMIT_MAX_INFLIGHT="200"         # 처리 중 메시지 상한(초과 시 텍스트 검사만)
+export ADMIT_FAST_PATH="1"              # 밴/타임아웃 중인 유저 메시지는 탐지 없이 삭제
+export SHED_LAG_SEC="0.25"              # 루프 지연 ≥ 이 값: QR 확장·pHash 중단, 2배: 첨부 1장만 스캔(0=끔)
+export SHED_HOLD_SEC="10"               # 셰딩 해제 전 유지 시간
+
+# --- 모니터링 ---
+export METRICS_HOST="127.0.0.1"
+export METRICS_PORT="9108"              # Prometheus /metrics, /healthz (0=끔)
+export LOOP_LAG_INTERVAL_SEC="0.5"      # 이벤트 루프 지연 샘플 주기
+export LOOP_LAG_UNHEALTHY_SEC="2"       # 지연이 이 이상이면 /healthz 503
+export TRACE_SLOW_MS="2000"             # 이보다 느린 이벤트의 스팬 트리를 덤프(0=트레이싱 끔)
+# export TRACE_LOG_PATH="/var/log/pubg-guard/trace.log"  # 미지정 시 guard/trace.log, 빈 값이면 일반 로그
+export TRACE_LOG_MAX_BYTES="10485760"   # 회전 크기
+export TRACE_LOG_BACKUPS="3"
+export TRACE_PROFILE_RATE="0"           # 0~1: 이벤트 중 cProfile 샘플링(느린 경우 상위 함수 덤프 포함)
 
 # --- 기타 ---
 export DEBUG="0"
+export RELOAD_POLL_SEC="5"              # rules.json/레퍼런스 폴더 변경 감시(0=SIGHUP만: systemctl kill -s HUP)
 export ENABLE_BAN_BUTTON="1"
 # 선택: 버튼 클릭 허용 롤(없으면 ban_members 권한 필요)
 export BAN_BUTTON_ROLE_IDS=""
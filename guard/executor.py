@@ -0,0 +1,64 @@
+# guard/executor.py
+import asyncio, logging
+import concurrent.futures as cf
+from typing import Any, Callable, Optional
+
+log = logging.getLogger("guard.executor")
+
+class PoolBusy(Exception):
+    """대기열 한도 초과 — 호출측은 스캔 스킵으로 처리"""
+
+class OffloadPool:
+    """
+    이벤트 루프 밖에서 CPU 작업 실행 (스레드/프로세스 풀).
+    - max_pending: 실행중+대기중 잡 상한(초과 시 PoolBusy)
+    - timeout: 잡별 대기 한도(초과 시 asyncio.TimeoutError, 미시작 잡은 취소)
+    타임아웃된 잡이 실제로 끝날 때까지는 pending에 남아 백프레셔로 작용.
+    """
+    def __init__(self, name: str, kind: str = "thread", workers: int = 2,
+                 max_pending: int = 16, timeout: Optional[float] = None):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.timeout = timeout if (timeout and timeout > 0) else None
+        self.pending = 0
+        self._pool: Optional[cf.Executor] = None
+
+    def _ensure(self) -> cf.Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = cf.ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = cf.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"guard-{self.name}")
+        return self._pool
+
+    def _done(self, _fut):
+        self.pending -= 1
+
+    def _on_done(self, loop: asyncio.AbstractEventLoop):
+        def cb(f):
+            try:
+                loop.call_soon_threadsafe(self._done, f)
+            except RuntimeError:
+                pass  # 루프 종료 후 완료
+        return cb
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            raise PoolBusy(f"{self.name}: pending={self.pending}")
+        cfut = self._ensure().submit(fn, *args)
+        self.pending += 1
+        # 완료 콜백은 워커 스레드에서 불릴 수 있으므로 루프로 넘겨서 카운트
+        cfut.add_done_callback(self._on_done(asyncio.get_running_loop()))
+        afut = asyncio.wrap_future(cfut)
+        try:
+            return await asyncio.wait_for(afut, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            cfut.cancel()  # 아직 시작 전이면 취소됨, 실행중이면 결과만 버림
+            raise
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
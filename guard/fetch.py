@@ -0,0 +1,150 @@
+# guard/fetch.py
+import logging, struct, time
+from typing import FrozenSet, Optional, Tuple
+
+import aiohttp
+
+from . import metrics
+
+log = logging.getLogger("guard.fetch")
+
+_SNIFF_MAX = 256 * 1024      # 이 안에서 크기 헤더를 못 찾으면 치수 검사 없이 계속(디코더 측 픽셀 가드가 백업)
+_CHUNK = 64 * 1024
+_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+class FetchRejected(Exception):
+    """크기/형식/픽셀 수 가드로 중단된 다운로드 (reason: too_large|bad_magic|format|pixels)"""
+    def __init__(self, reason: str, n: int = 0):
+        super().__init__(reason)
+        self.reason = reason
+        self.bytes = n
+
+def _jpeg_size(b: bytes) -> Optional[Tuple[int, int]]:
+    i, n = 2, len(b)
+    while i + 9 <= n:
+        if b[i] != 0xFF:
+            raise ValueError("jpeg marker")
+        m = b[i + 1]
+        if m == 0xFF:
+            i += 1; continue
+        if m == 0xD8 or m == 0x01 or 0xD0 <= m <= 0xD7:
+            i += 2; continue
+        seg = struct.unpack(">H", b[i + 2:i + 4])[0]
+        if m in _SOF:
+            h, w = struct.unpack(">HH", b[i + 5:i + 9])
+            return w, h
+        i += 2 + seg
+    return None
+
+def sniff(head: bytes) -> Optional[Tuple[str, Optional[Tuple[int, int]]]]:
+    """
+    앞부분 바이트로 (형식, (w, h)) 판별. 치수 헤더가 아직 안 왔으면 (형식, None).
+    알 수 없는 형식이면 None.
+    """
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png", (struct.unpack(">II", head[16:24]) if len(head) >= 24 else None)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif", (struct.unpack("<HH", head[6:10]) if len(head) >= 10 else None)
+    if head[:2] == b"\xff\xd8":
+        try:
+            return "jpeg", _jpeg_size(head)
+        except (ValueError, struct.error):
+            return None
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        if len(head) < 30:
+            return "webp", None
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", head[26:30])
+            return "webp", (w & 0x3FFF, h & 0x3FFF)
+        if chunk == b"VP8L":
+            v = int.from_bytes(head[21:25], "little")
+            return "webp", ((v & 0x3FFF) + 1, ((v >> 14) & 0x3FFF) + 1)
+        if chunk == b"VP8X":
+            return "webp", (1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little"))
+        return None
+    if head[:2] == b"BM":
+        if len(head) < 26:
+            return "bmp", None
+        w, h = struct.unpack("<ii", head[18:26])
+        return "bmp", (abs(w), abs(h))
+    return None
+
+class Downloader:
+    """
+    첨부 다운로드 공용 경로 — 세션/커넥터 1개를 재사용(keep-alive)하며 스트리밍으로 받음.
+    - 선언된 size/content_type 대신 실제 바이트로 판단: 매직 바이트 스니핑 + 헤더의 치수로 픽셀 폭탄 조기 차단
+    - max_bytes 초과 시 즉시 중단
+    - 청크는 마지막에 한 번만 합쳐 bytes로 반환 → io.BytesIO(bytes)는 버퍼를 복사 없이 공유
+    """
+    def __init__(self, pool_size: int = 16, timeout_sec: float = 15):
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout_sec)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _sess(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=self.timeout,
+            )
+        return self._session
+
+    async def fetch_image(self, url: str, max_bytes: int, max_pixels: int = 0,
+                          formats: Optional[FrozenSet[str]] = None) -> bytes:
+        """이미지 다운로드. 가드에 걸리면 FetchRejected, 네트워크 오류는 aiohttp 예외 그대로."""
+        chunks: list[bytes] = []
+        n = 0
+        head = b""
+        checked = False
+        t0 = time.perf_counter()
+        try:
+            async with self._sess().get(url) as resp:
+                resp.raise_for_status()
+                if resp.content_length and resp.content_length > max_bytes:
+                    raise FetchRejected("too_large")
+                async for chunk in resp.content.iter_chunked(_CHUNK):
+                    n += len(chunk)
+                    if n > max_bytes:
+                        raise FetchRejected("too_large", n)
+                    chunks.append(chunk)
+                    if not checked:
+                        head += chunk
+                        checked = self._check_head(head, max_pixels, formats, n)
+                        if checked:
+                            head = b""
+            if not checked:
+                self._check_head(head, max_pixels, formats, n, final=True)
+        except FetchRejected as e:
+            e.bytes = e.bytes or n
+            metrics.inc("fetch_rejected", reason=e.reason)
+            metrics.inc("fetch_bytes", e.bytes)
+            metrics.observe("fetch_seconds", time.perf_counter() - t0, outcome="rejected")
+            raise
+        except Exception:
+            metrics.observe("fetch_seconds", time.perf_counter() - t0, outcome="error")
+            raise
+        metrics.inc("fetch_bytes", n)
+        metrics.observe("fetch_seconds", time.perf_counter() - t0, outcome="ok")
+        return b"".join(chunks)
+
+    @staticmethod
+    def _check_head(head: bytes, max_pixels: int, formats, n: int, final: bool = False) -> bool:
+        """True = 판정 완료(통과), False = 바이트 더 필요. 차단이면 FetchRejected."""
+        if len(head) < 32 and not final:
+            return False
+        sn = sniff(head)
+        if sn is None:
+            raise FetchRejected("bad_magic", n)
+        fmt, dims = sn
+        if formats is not None and fmt not in formats:
+            raise FetchRejected("format", n)
+        if dims is None:
+            return final or len(head) >= _SNIFF_MAX
+        if max_pixels and dims[0] * dims[1] > max_pixels:
+            raise FetchRejected("pixels", n)
+        return True
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
@@ -0,0 +1,86 @@
+# guard/handlers/context.py
+import asyncio, hashlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+import discord
+
+from ..schemas import EventKind, Tier
+from ..config import Config
+from ..state import State
+from ..policy import apply_policy
+from ..admission import Admit, FULL
+from .. import trace
+
+UTC = timezone.utc
+def now_utc() -> datetime: return datetime.now(UTC)
+
+def msg_fingerprint(msg: discord.Message) -> str:
+    content = (msg.content or "").strip()
+    att_ids = ",".join(str(a.id) for a in (msg.attachments or []))
+    h = hashlib.sha1((content + "|" + att_ids).encode("utf-8", "ignore")).hexdigest()
+    return f"{msg.id}:{h}"
+
+@dataclass
+class MessageContext:
+    """
+    메시지 1건을 QR/텍스트 파이프라인이 동시에 처리할 때 공유하는 상태.
+    - 멤버 조회·조인 윈도 판정·지문은 1회만 계산
+    - 제재(apply_policy)는 메시지당 최대 1회 — 먼저 도달한 파이프라인이 집행
+    """
+    msg: discord.Message
+    state: State
+    window_days: int
+    fp: str = ""
+    recent_max: int = 0
+    enforced_by: Optional[EventKind] = None
+    effect: Optional[str] = None
+    adm: Admit = FULL               # 입장 제어 결과(부하 시 축소된 처리 범위)
+    _member: Optional[asyncio.Future] = field(default=None, repr=False)
+    _window: Optional[bool] = field(default=None, repr=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @classmethod
+    def of(cls, msg: discord.Message, cfg: Config, state: State, adm: Admit = FULL) -> "MessageContext":
+        return cls(msg, state, cfg.window_days, msg_fingerprint(msg), cfg.purge_recent_max, adm=adm)
+
+    async def member(self) -> Optional[discord.Member]:
+        # 채널 필터를 통과한 파이프라인이 처음 요청할 때만 조회, 나머지는 같은 결과 공유
+        if self._member is None:
+            self._member = asyncio.ensure_future(self.state.members.author(self.msg))
+        return await asyncio.shield(self._member)
+
+    async def in_window(self) -> bool:
+        if self._window is None:
+            m = await self.member()
+            ok = bool(m and getattr(m, "joined_at", None)) and (now_utc() - m.joined_at) <= timedelta(days=self.window_days)
+            if self._window is None:
+                self._window = ok
+                if ok:
+                    self._remember()
+        return self._window
+
+    def _remember(self):
+        # 조인 윈도 내 유저의 최근 메시지 (channel_id, message_id) 링 버퍼 — QR/STRICT 제재 시 일괄 정리용
+        if self.recent_max <= 0:
+            return
+        recent = self.state.caches.recent_msgs
+        uid = self.msg.author.id
+        ring = recent.get(uid)
+        if ring is None:
+            ring = deque(maxlen=self.recent_max)
+            recent.set(uid, ring)
+        ring.append((getattr(self.msg.channel, "id", 0), self.msg.id))
+        recent.touch(uid)
+
+    async def enforce(self, kind: EventKind, tier: Tier, cfg: Config) -> str:
+        async with self._lock:
+            if self.enforced_by:
+                return f"Skip (already {self.enforced_by}: {self.effect})"
+            with trace.span("enforce", kind=kind, tier=tier) as sp:
+                self.effect = await apply_policy(kind, self.msg, tier, cfg, self.state)
+                sp.set(effect=self.effect)
+            self.enforced_by = kind
+            return self.effect
@@ -14,9 +14,10 @@ UTC = timezone.utc
 def now_utc(): return datetime.now(UTC)
 
 async def handle_member_join(cfg: Config, rules: Rules, state: State, m: discord.Member):
-    # 베이스라인 key 저장 + 이벤트 스캔 1회
+    # 베이스라인 key 저장 + 이벤트 스캔 1회 (재입장이면 네거티브 캐시 해제)
+    state.members.forget(m.guild.id, m.id)
     try:
-        state.caches.last_avatar_key[m.id] = getattr(m.display_avatar, "key", None)
+        state.caches.last_avatar_key.set(m.id, getattr(m.display_avatar, "key", None))
     except Exception:
         pass
     try:
@@ -40,7 +41,8 @@ async def handle_user_update(cfg: Config, rules: Rules, state: State, client: di
         # 여러 길드 중 하나만 — 주요 길드
         g = client.get_guild(int(cfg.guild_id))
         if not g: return
-        m = g.get_member(after.id) or await g.fetch_member(after.id)
+        m = await state.members.resolve(g, after.id)
+        if not m: return
         await scan_avatar_event(m, cfg, state)
     except Exception:
         pass
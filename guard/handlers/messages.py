@@ -1,6 +1,6 @@
 # guard/handlers/messages.py
-import asyncio, hashlib, logging
-from datetime import datetime, timezone, timedelta
+import asyncio, logging
+from datetime import datetime, timezone
 from typing import Optional
 
 import discord
@@ -10,16 +10,21 @@ from ..config import Config
 from ..rules import Rules
 from ..state import State, norm_hash
 from ..emit import emit
-from ..policy import apply_policy
+from .context import MessageContext
+from .. import metrics, trace
+from ..admission import shed
 from ..detectors.message import (
-    score_message, has_any_keyword, profile_visit_in_reasons,
-    nick_flag, negation_guard, text_signature, normalize,
+    scan_message, has_any_keyword, profile_visit_in_reasons,
+    nick_flag, negation_match, preview_with_spans, text_signature, normalize,
 )
 
 log = logging.getLogger("guard.handlers.messages")
 UTC = timezone.utc
 def now_utc() -> datetime: return datetime.now(UTC)
 
+# 키워드 스캔은 µs~ms 단위
+_SCORE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+
 # --- helpers ---------------------------------------------------------------
 
 def _channel_in_list(msg: discord.Message, ids: list[int]) -> bool:
@@ -40,80 +45,52 @@ def _log_only_channel(msg: discord.Message, cfg: Config) -> bool:
     parent_id = getattr(getattr(ch, "parent", None), "id", None)
     return parent_id in ids
 
-def _joined_within_days(m: Optional[discord.Member], days: int) -> bool:
-    if not m or not getattr(m, "joined_at", None):
-        return False
-    return (now_utc() - m.joined_at) <= timedelta(days=days)
-
-def _msg_fingerprint(msg: discord.Message) -> str:
-    content = (msg.content or "").strip()
-    att_ids = ",".join(str(a.id) for a in (msg.attachments or []))
-    h = hashlib.sha1((content + "|" + att_ids).encode("utf-8", "ignore")).hexdigest()
-    return f"{msg.id}:{h}"
-
-async def _resolve_member(msg: discord.Message) -> Optional[discord.Member]:
-    if isinstance(msg.author, discord.Member):
-        return msg.author
-    if msg.guild:
-        try:
-            m = msg.guild.get_member(msg.author.id)
-            if m: return m
-            return await msg.guild.fetch_member(msg.author.id)
-        except Exception:
-            return None
-    return None
-
-# 반복/크로스포스트 트래커 (state.caches에 동적 필드로 저장)
+# 반복/크로스포스트 트래커 (state.caches.repeat: 첫 등장부터 고정 윈도)
 def _bump_repeat(state: State, uid: int, sig: str, ch_id: int, window_sec: int) -> tuple[int, int]:
     """
     return (count, distinct_channels)
     """
-    if not hasattr(state.caches, "repeat_map"):
-        state.caches.repeat_map = {}  # type: ignore[attr-defined]
-    if not hasattr(state.caches, "repeat_exp"):
-        state.caches.repeat_exp = {}  # type: ignore[attr-defined]
-
-    now = datetime.now().timestamp()
     key = (uid, sig)
-    exp_at = state.caches.repeat_exp.get(key, 0)  # type: ignore[attr-defined]
-    if exp_at < now:
+    rec = state.caches.repeat.get(key)
+    if rec is None:
         # reset window
-        state.caches.repeat_map[key] = {"count": 0, "chs": set()}  # type: ignore[attr-defined]
-        state.caches.repeat_exp[key] = now + window_sec             # type: ignore[attr-defined]
-
-    rec = state.caches.repeat_map[key]                                # type: ignore[attr-defined]
-    rec["count"] = int(rec.get("count", 0)) + 1
-    chs: set[int] = rec.get("chs", set())
-    chs.add(ch_id)
-    rec["chs"] = chs
-    state.caches.repeat_map[key] = rec                                # type: ignore[attr-defined]
-    return rec["count"], len(chs)
+        rec = {"count": 0, "chs": set()}
+        state.caches.repeat.set(key, rec, ttl=window_sec)
+    rec["count"] += 1
+    rec["chs"].add(ch_id)
+    state.caches.repeat.touch(key)
+    return rec["count"], len(rec["chs"])
 
 # --- public entry ----------------------------------------------------------
 
 async def handle_message(
-    client: discord.Client, cfg: Config, rules: Rules, state: State, msg: discord.Message
+    client: discord.Client, cfg: Config, rules: Rules, state: State, msg: discord.Message,
+    ctx: Optional[MessageContext] = None,
 ):
     # 0) 기본 가드
     if not getattr(msg, "guild", None): return
     if msg.author.bot or msg.webhook_id is not None: return
     if not _channel_in_list(msg, cfg.channel_msg_monitor_ids): return
 
+    ctx = ctx or MessageContext.of(msg, cfg, state)
+
     # TTL 중복 방지
-    fp = _msg_fingerprint(msg)
-    if state.caches.msg_ttl.contains(fp): return
-    state.caches.msg_ttl.add(fp)
+    if state.caches.msg_ttl.contains(ctx.fp): return
+    state.caches.msg_ttl.add(ctx.fp)
 
-    # 멤버 확보
-    member = await _resolve_member(msg)
+    # 멤버 확보 (QR 파이프라인과 공유)
+    member = await ctx.member()
 
     # 1) 조인 ≤ WINDOW_DAYS (텍스트 정밀은 유저 신입만)
-    if not _joined_within_days(member, cfg.window_days):
+    if not await ctx.in_window():
         # 지정 채널이지만 구 유저면 로그만(원한다면 완전 패스도 가능)
         return
 
     # 2) 키워드 프리필터(1개라도 히트? 없으면 종료)
-    score, reasons, hits, s_norm = score_message(msg.content or "", rules)
+    with metrics.timer("score_seconds", buckets=_SCORE_BUCKETS), trace.span("score") as sp:
+        sc = scan_message(msg.content or "", rules)
+        sp.set(score=sc.score)
+    score, reasons, hits = sc.score, sc.reasons, sc.hits
     if not (reasons or hits):
         return
 
@@ -121,8 +98,10 @@ async def handle_message(
     #  - 포럼(쓰레드)에는 면책 기본 적용
     is_thread = isinstance(msg.channel, discord.Thread)
     if is_thread or _log_only_channel(msg, cfg):
-        if negation_guard(msg.content or "", hits or reasons, rules, window=20):
-            # 로그만
+        neg = negation_match(sc, hits or reasons, window=20) if rules.negations_norm else None
+        if neg:
+            # 로그만 (미리보기에 매칭 원문 구간 + 부정어 구간 표시)
+            neg_span = sc.norm.orig_span(neg[1].start, neg[1].end)
             payload = LogPayload(
                 guild_id=msg.guild.id,
                 user_id=msg.author.id,
@@ -134,10 +113,11 @@ async def handle_message(
                 score=score,
                 score_threshold=int(rules.sensitivity.get("msg_threshold_normal", 60)),
                 reasons=reasons, hits=hits,
-                preview=(msg.content or "").strip(),
+                preview=preview_with_spans(sc, hits, extra=[neg_span]),
                 jump_url=getattr(msg, "jump_url", None),
                 policy_effect="Log (negation-guard)",
             )
+            state.counters.hour_message += 1
             await emit(client, cfg, "MESSAGE", payload)
             return
 
@@ -157,13 +137,15 @@ async def handle_message(
     if not tier:
         repeat_min_score = int((rules.sensitivity or {}).get("repeat_min_score", 60))
         if score >= repeat_min_score:
-            sig = text_signature(msg.content or "", rules)
+            sig = text_signature(sc, rules)
             cnt, chs = _bump_repeat(state, msg.author.id, sig, getattr(msg.channel, "id", 0), int(rules.repeat_window_sec))
             if cnt >= 2 or chs >= 2:
                 tier = "STRICT"; strict_due_to = f"repeat({cnt})/cross({chs})"
 
-    # 3-d) 아바타 pHash 온디맨드 (키워드 히트 & 닉 미적용일 때만)
-    if not tier:
+    # 3-d) 아바타 pHash 온디맨드 (키워드 히트 & 닉 미적용일 때만, 부하 셰딩 시 생략)
+    if not tier and not ctx.adm.phash:
+        shed("phash", ctx.adm.reason)
+    elif not tier:
         try:
             from ..detectors.avatar import phash_on_demand  # lazy import
         except Exception:
@@ -197,15 +179,16 @@ async def handle_message(
             score=score,
             score_threshold=int(rules.sensitivity.get("msg_threshold_normal", 60)),
             reasons=reasons, hits=hits,
-            preview=(msg.content or "").strip(),
+            preview=preview_with_spans(sc, hits),
             jump_url=getattr(msg, "jump_url", None),
             policy_effect="Log",
         )
+        state.counters.hour_message += 1
         await emit(client, cfg, "MESSAGE", payload)
         return
 
     # 5) 제재 실행 → 로그
-    effect = await apply_policy("MESSAGE", msg, tier, cfg, state)
+    effect = await ctx.enforce("MESSAGE", tier, cfg)
     payload = LogPayload(
         guild_id=msg.guild.id,
         user_id=msg.author.id,
@@ -218,8 +201,38 @@ async def handle_message(
         score_threshold=int(rules.sensitivity.get("msg_threshold_normal", 60)),
         reasons=(reasons + ([strict_due_to] if strict_due_to else [])),
         hits=hits,
-        preview=(msg.content or "").strip(),
+        preview=preview_with_spans(sc, hits),
         jump_url=getattr(msg, "jump_url", None),
         policy_effect=effect,
     )
+    state.counters.hour_message += 1
+    await emit(client, cfg, "MESSAGE", payload)
+
+async def handle_enforced_message(
+    client: discord.Client, cfg: Config, state: State, msg: discord.Message, kind: EventKind,
+):
+    """
+    입장 제어 빠른 경로: 밴/타임아웃이 진행 중이거나 끝난 유저의 메시지 — 탐지는 생략.
+    그 유저를 제재한 탐지 종류(kind)의 정책대로 삭제(정책에 삭제가 없으면 로그만)하고 같은 로그 채널에 남김.
+    """
+    effect = await state.enforcer.delete_only(msg, kind)
+    if effect == "None":
+        effect = "Log"
+    payload = LogPayload(
+        guild_id=msg.guild.id,
+        user_id=msg.author.id,
+        mention=msg.author.mention,
+        channel_mention=getattr(msg.channel, "mention", None),
+        created_at_utc=msg.created_at or now_utc(),
+        policy_effect=f"{effect} (already enforced: {kind})",
+    )
+    if kind == "QR":
+        payload.qr_text_obfuscated = "- (제재 중 유저, 스캔 생략)"
+        await emit(client, cfg, "QR", payload)
+        return
+    payload.avatar_url_256 = str(getattr(msg.author.display_avatar.with_size(256), "url", ""))
+    payload.reasons = ["already-enforced"]
+    payload.preview = msg.content or ""
+    payload.jump_url = getattr(msg, "jump_url", None)
+    state.counters.hour_message += 1
     await emit(client, cfg, "MESSAGE", payload)
@@ -1,6 +1,7 @@
 # guard/handlers/on_message_qr.py
-import logging
-from datetime import datetime, timezone, timedelta
+import asyncio, logging
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
 
 import discord
 
@@ -9,8 +10,13 @@ from ..rules import Rules
 from ..state import State
 from ..schemas import LogPayload
 from ..emit import emit
-from ..policy import apply_policy
-from ..detectors.qr import is_scannable_attachment, detect_qr_bytes, obfuscate
+from .context import MessageContext
+from .. import metrics, trace
+from ..admission import Admit, FULL, shed
+from ..detectors.qr import (
+    QrDecode, is_scannable_attachment, image_formats, resized_url, decode_qr_bytes, obfuscate,
+)
+from ..fetch import FetchRejected
 
 log = logging.getLogger("guard.handlers.on_message_qr")
 UTC = timezone.utc
@@ -23,61 +29,128 @@ def _channel_in_list(msg: discord.Message, ids: list[int]) -> bool:
     parent_id = getattr(getattr(ch, "parent", None), "id", None)
     return parent_id in ids
 
+_BYTE_BUCKETS = (16e3, 64e3, 256e3, 512e3, 1e6, 2e6, 5e6, 10e6)
+
+def _observe_bytes(n: int, res: Optional[QrDecode], why: str):
+    if res is None:
+        verdict = "rejected" if why not in ("error", "empty") else "error"
+    else:
+        verdict = "qr" if res.texts else ("clean" if res.ok else "skipped")
+    metrics.observe("qr_bytes_per_verdict", n, buckets=_BYTE_BUCKETS, verdict=verdict)
+
+async def _fetch_decode(url: str, cfg: Config, state: State,
+                        escalate: bool = True) -> Tuple[Optional[QrDecode], int, str]:
+    """return (디코드 결과 | None, 받은 바이트, 사유)"""
+    with trace.span("fetch", proxy="?" in url) as sp:
+        try:
+            data = await state.http.fetch_image(url, cfg.qr_max_bytes, cfg.qr_max_pixels, image_formats(cfg))
+        except FetchRejected as e:
+            sp.set(rejected=e.reason)
+            return None, e.bytes, e.reason
+        except Exception as e:
+            log.debug("첨부 다운로드 실패: %s", e)
+            return None, 0, "error"
+        sp.set(bytes=len(data or b""))
+    if not data:
+        return None, 0, "empty"
+    with trace.span("decode") as sp:
+        res = await decode_qr_bytes(data, cfg, state, escalate)
+        sp.set(stage=res.stage, calls=res.calls, cpu_ms=round(res.cpu_ms, 1), ok=res.ok)
+    return res, len(data), ""
+
+async def _scan_one(att: discord.Attachment, cfg: Config, state: State, adm: Admit = FULL) -> List[str]:
+    # 다운로드+디코드 모두 qr_sem 범위 안에서
+    async with state.conc.qr_sem:
+        total = 0
+        # 1) CDN 리사이즈본 먼저 — 확정 음성(파인더 패턴 없음)이거나 히트면 원본 생략
+        #    (축소비는 resized_url이 QR_MIN_MODULE_PX 모듈이 프리체크에 남도록 제한)
+        small = resized_url(att, cfg.qr_proxy_side, cfg.qr_min_module_px)
+        if small:
+            res, n, why = await _fetch_decode(small, cfg, state, adm.qr_escalate)
+            total += n
+            conclusive = res is not None and (res.texts or (res.ok and not res.likely))
+            metrics.inc("qr_proxy", outcome=("hit" if res and res.texts else "clean" if conclusive else "fallback"))
+            if conclusive:
+                _observe_bytes(total, res, why)
+                return res.texts
+            # 셰딩 중: 리사이즈본이 받아졌으면 원본 폴백 생략(실패 시에만 원본)
+            if res is not None and not adm.qr_escalate:
+                shed("qr_fallback", adm.reason)
+                _observe_bytes(total, res, why)
+                return []
+        # 2) 원본
+        res, n, why = await _fetch_decode(att.url, cfg, state, adm.qr_escalate)
+        total += n
+    _observe_bytes(total, res, why)
+    if res is None:
+        log.debug("첨부 스킵(%s): %s", why, att.id)
+        return []
+    return res.texts
+
+async def scan_attachments(atts, cfg: Config, state: State, adm: Admit = FULL) -> List[str]:
+    """
+    첨부들을 동시에 받아 디코드(전역 qr_sem 한도 내) → 처음 QR이 나온 결과 반환.
+    첫 히트 시 남은 다운로드/디코드 태스크는 취소(이미 워커에서 도는 디코드는 스테이지 예산 안에서 종료).
+    adm.qr_max_atts > 0이면 앞쪽 첨부만 스캔(나머지는 att_ttl에 넣지 않음 — 편집 시 재시도 가능).
+    """
+    todo = [att for att in atts or []
+            if is_scannable_attachment(att, cfg) and not state.caches.att_ttl.contains(att.id)]
+    if adm.qr_max_atts and len(todo) > adm.qr_max_atts:
+        shed("qr_attachments", adm.reason)
+        todo = todo[:adm.qr_max_atts]
+    for att in todo:
+        state.caches.att_ttl.add(att.id)
+    if not todo:
+        return []
+    if len(todo) == 1:
+        return await _scan_one(todo[0], cfg, state, adm)
+
+    tasks = [asyncio.create_task(_scan_one(a, cfg, state, adm)) for a in todo]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                texts = await fut
+            except Exception as e:
+                log.debug("첨부 스캔 실패: %s", e)
+                continue
+            if texts:
+                metrics.inc("qr_first_hit_cancel", sum(not t.done() for t in tasks))
+                return texts
+        return []
+    finally:
+        for t in tasks:
+            t.cancel()
+
 async def handle_message_qr(
-    client: discord.Client, cfg: Config, rules: Rules, state: State, msg: discord.Message
+    client: discord.Client, cfg: Config, rules: Rules, state: State, msg: discord.Message,
+    ctx: Optional[MessageContext] = None,
 ):
     if not getattr(msg, "guild", None): return
     if not msg.attachments: return
     if not _channel_in_list(msg, cfg.channel_qr_monitor_ids): return
+    ctx = ctx or MessageContext.of(msg, cfg, state)
 
     # 50일 윈도우 가드: 조인일자 체크 후 스캔 여부 결정
-    member = msg.author if isinstance(msg.author, discord.Member) else None
-    if (not member) and msg.guild:
-        try:
-            member = msg.guild.get_member(msg.author.id) or await msg.guild.fetch_member(msg.author.id)
-        except Exception:
-            member = None
-
-    do_scan = False
-    try:
-        if member and getattr(member, "joined_at", None):
-            do_scan = (now_utc() - member.joined_at) <= timedelta(days=cfg.window_days)
-    except Exception:
-        do_scan = False
-
-    if not do_scan:
+    if not await ctx.in_window():
         return  # 50일 초과 유저는 QR 스캔 자체를 스킵
+    if not ctx.adm.qr:
+        shed("qr", ctx.adm.reason)
+        return
 
-    for att in msg.attachments:
-        if not is_scannable_attachment(att, cfg):
-            continue
-        if state.caches.att_ttl.contains(att.id):
-            continue
-        state.caches.att_ttl.add(att.id)
-
-        try:
-            async with state.conc.qr_sem:
-                data = await att.read()
-        except Exception:
-            continue
-        if not data:
-            continue
-
-        texts = await detect_qr_bytes(data)
-        if not texts:
-            continue
+    texts = await scan_attachments(msg.attachments, cfg, state, ctx.adm)
+    if not texts:
+        return
 
-        # 50일 이내 유저만 여기 도달하므로 제재 적용
-        effect = await apply_policy("QR", msg, tier=None, cfg=cfg, state=state)
+    # 50일 이내 유저만 여기 도달하므로 제재 적용
+    effect = await ctx.enforce("QR", None, cfg)
 
-        payload = LogPayload(
-            guild_id=msg.guild.id,
-            user_id=msg.author.id,
-            mention=msg.author.mention,
-            channel_mention=getattr(msg.channel, "mention", None),
-            created_at_utc=msg.created_at or now_utc(),
-            qr_text_obfuscated=obfuscate(texts[0]),
-            policy_effect=effect,
-        )
-        await emit(client, cfg, "QR", payload)
-        return  # 한 번만 로그/제재
+    payload = LogPayload(
+        guild_id=msg.guild.id,
+        user_id=msg.author.id,
+        mention=msg.author.mention,
+        channel_mention=getattr(msg.channel, "mention", None),
+        created_at_utc=msg.created_at or now_utc(),
+        qr_text_obfuscated=obfuscate(texts[0]),
+        policy_effect=effect,
+    )
+    await emit(client, cfg, "QR", payload)
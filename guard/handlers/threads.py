@@ -11,8 +11,11 @@ from ..rules import Rules
 from ..state import State
 from ..emit import emit
 from ..policy import apply_policy
-from ..detectors.message import score_message, profile_visit_in_reasons, negation_guard
-from ..detectors.qr import is_scannable_attachment, detect_qr_bytes, obfuscate
+from ..detectors.message import (
+    scan_message, profile_visit_in_reasons, negation_match, preview_with_spans,
+)
+from ..detectors.qr import obfuscate
+from .on_message_qr import scan_attachments
 
 log = logging.getLogger("guard.handlers.threads")
 UTC = timezone.utc
@@ -33,18 +36,6 @@ def _joined_within_days(m: Optional[discord.Member], days: int) -> bool:
         return False
     return (now_utc() - m.joined_at) <= timedelta(days=days)
 
-async def _resolve_owner(thread: discord.Thread) -> Optional[discord.Member]:
-    g = getattr(thread, "guild", None)
-    if not g: return None
-    oid = getattr(thread, "owner_id", None)
-    if not oid: return None
-    m = g.get_member(oid)
-    if m: return m
-    try:
-        return await g.fetch_member(oid)
-    except Exception:
-        return None
-
 async def handle_thread_create(
     client: discord.Client, cfg: Config, rules: Rules, state: State, thread: discord.Thread
 ):
@@ -54,7 +45,7 @@ async def handle_thread_create(
         pass
 
     # 1) 제목 평가 (면책 가드 포함, 조인≤window)
-    owner = await _resolve_owner(thread)
+    owner = await state.members.owner(thread)
     if not owner:
         return
     if not _joined_within_days(owner, cfg.window_days):
@@ -62,16 +53,19 @@ async def handle_thread_create(
         pass
     else:
         title = (thread.name or "").strip()
-        score, reasons, hits, _ = score_message(title, rules)
+        sc = scan_message(title, rules)
+        score, reasons, hits = sc.score, sc.reasons, sc.hits
         if (reasons or hits):
             # 면책(부정·경고 근접) → 로그만
-            if negation_guard(title, hits or reasons, rules, window=20):
+            neg = negation_match(sc, hits or reasons, window=20) if rules.negations_norm else None
+            if neg:
+                neg_span = sc.norm.orig_span(neg[1].start, neg[1].end)
                 payload = LogPayload(
                     guild_id=thread.guild.id, user_id=owner.id, mention=owner.mention,
                     channel_mention=getattr(thread.parent, "mention", None),
                     created_at_utc=now_utc(), avatar_url_256=str(getattr(owner.display_avatar.with_size(256), "url", "")),
                     tier=None, score=score, score_threshold=int(rules.sensitivity.get("msg_threshold_normal", 60)),
-                    reasons=reasons, hits=hits, preview=f"[제목] {title}", jump_url=None,
+                    reasons=reasons, hits=hits, preview=f"[제목] {preview_with_spans(sc, hits, extra=[neg_span])}", jump_url=None,
                     policy_effect="Log (negation-guard)"
                 )
                 await emit(client, cfg, "MESSAGE", payload)
@@ -104,7 +98,7 @@ async def handle_thread_create(
                             created_at_utc=now_utc(), avatar_url_256=str(getattr(owner.display_avatar.with_size(256), "url", "")),
                             tier=tier, score=score, score_threshold=int(rules.sensitivity.get("msg_threshold_normal", 60)),
                             reasons=reasons + ([strict_due] if strict_due else []), hits=hits,
-                            preview=f"[제목] {title}", jump_url=None, policy_effect=effect
+                            preview=f"[제목] {preview_with_spans(sc, hits)}", jump_url=None, policy_effect=effect
                         )
                         await emit(client, cfg, "MESSAGE", payload)
 
@@ -127,11 +121,8 @@ async def handle_thread_create(
     if not _channel_in_list(thread, cfg.channel_qr_monitor_ids):
         return
 
-    # 50일 윈도우 가드: 스타터 메시지 작성자 조인일자 체크
-    starter_owner = await _resolve_owner(thread)
-    if not starter_owner:
-        return
-    if not _joined_within_days(starter_owner, cfg.window_days):
+    # 50일 윈도우 가드: 스타터 메시지 작성자(=스레드 소유자, 위에서 1회 조회) 조인일자 체크
+    if not _joined_within_days(owner, cfg.window_days):
         return  # 50일 초과 유저는 QR 스캔 자체를 스킵
 
     # 스타터 또는 첫 메시지 확보
@@ -147,26 +138,17 @@ async def handle_thread_create(
     if not starter:
         return
 
-    for att in starter.attachments or []:
-        if not is_scannable_attachment(att, cfg):
-            continue
-        try:
-            data = await att.read()
-        except Exception:
-            continue
-        texts = await detect_qr_bytes(data)
-        if not texts:
-            continue
-
-        # 50일 이내 유저만 여기 도달하므로 제재 적용
-        effect = await apply_policy("QR", starter, tier=None, cfg=cfg, state=state)
-        payload = LogPayload(
-            guild_id=thread.guild.id, user_id=starter.author.id, mention=starter.author.mention,
-            channel_mention=getattr(thread.parent, "mention", None),
-            created_at_utc=starter.created_at or now_utc(),
-            qr_text_obfuscated=obfuscate(texts[0]),
-            policy_effect=effect,
-        )
-        await emit(client, cfg, "QR", payload)
-        # 한 개라도 발견하면 종료(중복 로그 방지)
+    texts = await scan_attachments(starter.attachments, cfg, state)
+    if not texts:
         return
+
+    # 50일 이내 유저만 여기 도달하므로 제재 적용
+    effect = await apply_policy("QR", starter, tier=None, cfg=cfg, state=state)
+    payload = LogPayload(
+        guild_id=thread.guild.id, user_id=starter.author.id, mention=starter.author.mention,
+        channel_mention=getattr(thread.parent, "mention", None),
+        created_at_utc=starter.created_at or now_utc(),
+        qr_text_obfuscated=obfuscate(texts[0]),
+        policy_effect=effect,
+    )
+    await emit(client, cfg, "QR", payload)
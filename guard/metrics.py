@@ -0,0 +1,155 @@
+# guard/metrics.py
+import bisect, logging, re, time
+from typing import Callable, Dict, List, Tuple
+
+# 프로세스 전역 레지스트리 (이벤트 루프 스레드에서만 갱신)
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets=_DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """버킷 상한 기준 근사 분위수"""
+        if not self.count: return 0.0
+        need = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= need:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+_hists: Dict[str, Dict[LabelKey, Histogram]] = {}
+# 벤치/리플레이용 원시 샘플 수집(capture(True)일 때만) — 버킷 근사 대신 정확한 분위수
+_raw: Dict[Tuple[str, LabelKey], list] | None = None
+# 스크레이프 직전에 호출되는 게이지 수집기(큐 깊이 등 — 값이 이미 객체에 있는 것)
+_collectors: List[Callable[[], None]] = []
+
+def _key(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def inc(name: str, n: float = 1, **labels):
+    d = _counters.setdefault(name, {})
+    k = _key(labels)
+    d[k] = d.get(k, 0) + n
+
+def set_gauge(name: str, v: float, **labels):
+    _gauges.setdefault(name, {})[_key(labels)] = v
+
+def observe(name: str, v: float, buckets=_DEFAULT_BUCKETS, **labels):
+    d = _hists.setdefault(name, {})
+    k = _key(labels)
+    h = d.get(k)
+    if h is None:
+        h = d[k] = Histogram(buckets)
+    h.observe(v)
+    if _raw is not None:
+        _raw.setdefault((name, k), []).append(v)
+
+class timer:
+    """with metrics.timer("rest_seconds", op="ban"): ... — 예외여도 관측"""
+    __slots__ = ("name", "labels", "buckets", "t0")
+
+    def __init__(self, name: str, buckets=_DEFAULT_BUCKETS, **labels):
+        self.name, self.buckets, self.labels = name, buckets, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, self.buckets, **self.labels)
+        return False
+
+def counter(name: str, **labels) -> float:
+    return _counters.get(name, {}).get(_key(labels), 0)
+
+def counters(name: str) -> Dict[LabelKey, float]:
+    return dict(_counters.get(name, {}))
+
+def hist(name: str, **labels) -> Histogram | None:
+    return _hists.get(name, {}).get(_key(labels))
+
+def capture(on: bool = True):
+    global _raw
+    _raw = {} if on else None
+
+def samples() -> Dict[Tuple[str, LabelKey], list]:
+    """capture 중 수집된 (이름, 라벨) -> 원시 관측값 목록"""
+    return dict(_raw or {})
+
+def snapshot() -> dict:
+    return {
+        "counters": {n: dict(d) for n, d in _counters.items()},
+        "gauges": {n: dict(d) for n, d in _gauges.items()},
+        "hists": {n: {k: (h.count, h.sum) for k, h in d.items()} for n, d in _hists.items()},
+    }
+
+def register(fn: Callable[[], None]):
+    _collectors.append(fn)
+
+# --- Prometheus 텍스트 포맷 -------------------------------------------------------
+
+_BAD = re.compile(r"[^a-zA-Z0-9_:]")
+
+def _pname(s: str) -> str:
+    s = _BAD.sub("_", s)
+    return s if not s[:1].isdigit() else "_" + s
+
+def _plabels(k: LabelKey, extra: str = "") -> str:
+    parts = ['%s="%s"' % (_pname(a), v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for a, v in k]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _pnum(v: float) -> str:
+    if v == float("inf"): return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+def render(prefix: str = "guard_") -> str:
+    """전체 레지스트리 → Prometheus text exposition(0.0.4)"""
+    for fn in list(_collectors):
+        try:
+            fn()
+        except Exception as e:
+            logging.getLogger("guard.metrics").debug("수집기 실패: %s", e)
+    out: List[str] = []
+    for name, d in sorted(_counters.items()):
+        n = _pname(prefix + name)
+        n = n if n.endswith("_total") else n + "_total"
+        out.append(f"# TYPE {n} counter")
+        out.extend(f"{n}{_plabels(k)} {_pnum(v)}" for k, v in sorted(d.items()))
+    for name, d in sorted(_gauges.items()):
+        n = _pname(prefix + name)
+        out.append(f"# TYPE {n} gauge")
+        out.extend(f"{n}{_plabels(k)} {_pnum(v)}" for k, v in sorted(d.items()))
+    for name, d in sorted(_hists.items()):
+        n = _pname(prefix + name)
+        out.append(f"# TYPE {n} histogram")
+        for k, h in sorted(d.items()):
+            acc = 0
+            for ub, c in zip(h.buckets + (float("inf"),), h.counts):
+                acc += c
+                le = 'le="%s"' % _pnum(ub)
+                out.append(f"{n}_bucket{_plabels(k, le)} {acc}")
+            out.append(f"{n}_sum{_plabels(k)} {_pnum(h.sum)}")
+            out.append(f"{n}_count{_plabels(k)} {h.count}")
+    return "\n".join(out) + "\n"
+
+def reset():
+    _counters.clear(); _gauges.clear(); _hists.clear()
+    if _raw is not None:
+        _raw.clear()
@@ -0,0 +1,132 @@
+# guard/monitor.py
+import asyncio, dataclasses, logging, time
+from typing import Optional
+
+from aiohttp import web
+
+from .config import Config
+from .state import State
+from . import metrics
+from . import emit as emit_mod
+
+log = logging.getLogger("guard.monitor")
+
+# 루프 지연은 ms~초 단위 — 기본 버킷보다 촘촘한 하단
+_LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class LoopLag:
+    """
+    이벤트 루프 지연 측정: interval마다 sleep 후 실제 깨어난 시각과의 차이.
+    레이드 중 CPU 작업이 루프를 막거나 콜백이 밀리면 값이 커짐(loop_lag_seconds).
+    """
+    def __init__(self, interval_sec: float = 0.5):
+        self.interval = max(0.05, interval_sec)
+        self.last = 0.0
+        self.max_window = 0.0       # 마지막 스크레이프 이후 최대값
+
+    async def run(self):
+        while True:
+            t = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - t - self.interval)
+            self.last = lag
+            self.max_window = max(self.max_window, lag)
+            metrics.observe("loop_lag_seconds", lag, buckets=_LAG_BUCKETS)
+
+    def collect(self):
+        metrics.set_gauge("loop_lag_last_seconds", self.last)
+        metrics.set_gauge("loop_lag_max_seconds", self.max_window)
+        self.max_window = 0.0
+
+class HourlyCounters:
+    """
+    state.Counters(hour_*) 정시 롤오버: 직전 1시간 값을 게이지(hour_last{kind})로 남기고 0으로 리셋.
+    진행 중인 시간 값은 hour_current{kind}.
+    """
+    def __init__(self, state: State):
+        self.state = state
+
+    def _fields(self) -> list[str]:
+        return [f.name for f in dataclasses.fields(self.state.counters) if f.name.startswith("hour_")]
+
+    def collect(self):
+        for name in self._fields():
+            metrics.set_gauge("hour_current", getattr(self.state.counters, name), kind=name[5:])
+
+    def rollover(self) -> dict:
+        c = self.state.counters
+        last = {name[5:]: getattr(c, name) for name in self._fields()}
+        for name in self._fields():
+            setattr(c, name, 0)
+        for kind, v in last.items():
+            metrics.set_gauge("hour_last", v, kind=kind)
+        log.info("시간 집계: %s", ", ".join(f"{k}={v}" for k, v in last.items()))
+        return last
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(3600 - time.time() % 3600)
+            self.rollover()
+
+def _queue_collector(state: State):
+    def collect():
+        enf = state.enforcer
+        if enf is not None and enf._q is not None:
+            metrics.set_gauge("enforce_queue_depth", enf._q.qsize())
+        d = emit_mod._DISPATCHER
+        if d is not None:
+            for cid, q in d._queues.items():
+                metrics.set_gauge("emit_queue_depth", q.qsize(), channel=cid)
+        for pool in (state.conc.qr_pool, state.conc.phash_pool):
+            metrics.set_gauge("pool_pending", pool.pending, pool=pool.name)
+            metrics.set_gauge("pool_capacity", pool.max_pending, pool=pool.name)
+        for c in state.caches.all():
+            metrics.set_gauge("cache_size", len(c), cache=c.name)
+        metrics.set_gauge("member_cache_size", len(state.members.cache))
+    return collect
+
+class MetricsServer:
+    """
+    GET /metrics — Prometheus text(0.0.4), GET /healthz — 루프 지연 기준 200/503.
+    기본 127.0.0.1 바인드(외부 노출은 리버스 프록시/노드 익스포터 쪽에서).
+    """
+    def __init__(self, cfg: Config, state: State):
+        self.cfg = cfg
+        self.lag = LoopLag(cfg.loop_lag_interval_sec)
+        self.hourly = HourlyCounters(state)
+        self._runner: Optional[web.AppRunner] = None
+        metrics.register(self.lag.collect)
+        metrics.register(self.hourly.collect)
+        metrics.register(_queue_collector(state))
+
+    async def _metrics(self, _req: web.Request) -> web.Response:
+        with metrics.timer("metrics_render_seconds"):
+            body = metrics.render()
+        return web.Response(text=body, content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _health(self, _req: web.Request) -> web.Response:
+        ok = self.lag.last < self.cfg.loop_lag_unhealthy_sec
+        return web.Response(status=200 if ok else 503, text=f"lag={self.lag.last:.3f}s\n")
+
+    async def start(self) -> list[asyncio.Task]:
+        """루프 지연/시간 집계 태스크 시작 + (포트 지정 시) HTTP 서버 기동"""
+        tasks = [asyncio.create_task(self.lag.run(), name="loop_lag"),
+                 asyncio.create_task(self.hourly.run(), name="hourly_counters")]
+        if self.cfg.metrics_port:
+            app = web.Application()
+            app.router.add_get("/metrics", self._metrics)
+            app.router.add_get("/healthz", self._health)
+            self._runner = web.AppRunner(app, access_log=None)
+            await self._runner.setup()
+            try:
+                await web.TCPSite(self._runner, self.cfg.metrics_host, self.cfg.metrics_port).start()
+                log.info("메트릭 엔드포인트: http://%s:%d/metrics", self.cfg.metrics_host, self.cfg.metrics_port)
+            except OSError as e:
+                log.warning("메트릭 서버 기동 실패(%s:%d): %s", self.cfg.metrics_host, self.cfg.metrics_port, e)
+        return tasks
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
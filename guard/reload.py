@@ -0,0 +1,99 @@
+# guard/reload.py
+import asyncio, logging, os, signal, time
+from typing import Optional
+
+from .config import Config
+from .rules import Rules, load_rules
+from .detectors.avatar import build_refs, swap_refs
+from . import metrics
+
+log = logging.getLogger("guard.reload")
+
+def _file_sig(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def _dir_sig(path: str) -> Optional[tuple]:
+    try:
+        return tuple(sorted((e.name, e.stat().st_mtime_ns, e.stat().st_size) for e in os.scandir(path) if e.is_file()))
+    except OSError:
+        return None
+
+class LiveRules:
+    """
+    현재 Rules 참조 1개. 이벤트 핸들러는 시작 시점에 .rules를 한 번 읽어 끝까지 사용
+    → 교체 중에도 처리 중인 메시지는 이전 버전으로 마무리.
+    """
+    def __init__(self, rules: Rules):
+        self.rules = rules
+
+class Reloader:
+    """
+    rules.json / PHISH_DIR 변경 감지(mtime 폴링) 또는 SIGHUP → 백그라운드 재컴파일 후 원자적 교체.
+    실패하면 기존 버전 유지.
+    """
+    def __init__(self, cfg: Config, live: LiveRules):
+        self.cfg = cfg
+        self.live = live
+        self._ev = asyncio.Event()
+        self._rules_sig = _file_sig(cfg.rules_path)
+        self._refs_sig = _dir_sig(cfg.phish_dir)
+
+    def trigger(self):
+        """SIGHUP 등 외부 요청 → 다음 루프에서 둘 다 재로드"""
+        self._ev.set()
+
+    def install_signal(self):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self.trigger)
+        except (NotImplementedError, AttributeError, RuntimeError):
+            pass    # Windows 등: 파일 감시만 사용
+
+    async def reload_rules(self) -> bool:
+        old = self.live.rules
+        try:
+            new = await asyncio.to_thread(load_rules, self.cfg.rules_path)
+        except (Exception, SystemExit) as e:
+            log.error("rules 리로드 실패(기존 v=%s 유지): %s", old.version, e)
+            metrics.inc("reload", target="rules", ok=False)
+            return False
+        self.live.rules = new
+        metrics.inc("reload", target="rules", ok=True)
+        log.info("rules 교체: v=%s → v=%s (compile %.1fms, 키워드 %d개)",
+                 old.version, new.version, new.compile_ms, len(new.matcher or ()))
+        return True
+
+    async def reload_refs(self) -> bool:
+        t0 = time.perf_counter()
+        try:
+            index = await asyncio.to_thread(build_refs, self.cfg.phish_dir)
+        except Exception as e:
+            log.error("아바타 레퍼런스 리로드 실패(기존 유지): %s", e)
+            metrics.inc("reload", target="refs", ok=False)
+            return False
+        n = swap_refs(index, self.cfg.phish_dir)
+        metrics.inc("reload", target="refs", ok=True)
+        log.info("아바타 레퍼런스 교체: %d개 (%.0fms)", n, (time.perf_counter() - t0) * 1000)
+        return True
+
+    async def run(self):
+        poll = self.cfg.reload_poll_sec
+        while True:
+            forced = False
+            try:
+                await asyncio.wait_for(self._ev.wait(), poll if poll > 0 else None)
+                forced = True
+            except asyncio.TimeoutError:
+                pass
+            self._ev.clear()
+
+            rs, ds = _file_sig(self.cfg.rules_path), _dir_sig(self.cfg.phish_dir)
+            if forced or (rs is not None and rs != self._rules_sig):
+                self._rules_sig = rs
+                await self.reload_rules()
+            if forced or ds != self._refs_sig:
+                self._refs_sig = ds
+                await self.reload_refs()
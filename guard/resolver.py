@@ -0,0 +1,71 @@
+# guard/resolver.py
+import asyncio, logging
+from typing import Optional
+
+import discord
+
+from .cache import LRUTTLCache
+from . import metrics, trace
+
+log = logging.getLogger("guard.resolver")
+
+_ABSENT = object()   # 네거티브 캐시(길드에 없음) 표식
+
+class MemberResolver:
+    """
+    길드 멤버 조회 공용 경로.
+    1) 게이트웨이 캐시(guild.get_member) → 2) 단기 TTL 캐시(Member: joined_at/roles/avatar key 포함)
+    → 3) REST fetch_member — 같은 ID 동시 조회는 하나의 REST 호출을 공유(single-flight).
+    나간 유저(NotFound)는 neg_ttl 동안 네거티브 캐시.
+    """
+    def __init__(self, ttl_sec: float = 60, neg_ttl_sec: float = 300, maxsize: int = 20_000):
+        self.neg_ttl = neg_ttl_sec
+        self.cache = LRUTTLCache("member", maxsize, ttl_sec)
+        self._inflight: dict[tuple[int, int], asyncio.Future] = {}
+
+    def forget(self, guild_id: int, uid: int):
+        self.cache.pop((guild_id, uid))
+
+    async def resolve(self, guild: Optional[discord.Guild], uid: int, hint=None) -> Optional[discord.Member]:
+        if isinstance(hint, discord.Member):
+            return hint
+        if guild is None or not uid:
+            return None
+        m = guild.get_member(uid)
+        if m:
+            return m
+        key = (guild.id, uid)
+        hit = self.cache.get(key)
+        if hit is _ABSENT:
+            return None
+        if hit is not None:
+            return hit
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            metrics.inc("member_fetch_coalesced")
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        result: Optional[discord.Member] = None
+        try:
+            metrics.inc("member_fetch")
+            with metrics.timer("rest_seconds", op="fetch_member"), trace.span("fetch_member", uid=uid):
+                result = await guild.fetch_member(uid)
+            self.cache.set(key, result)
+        except discord.NotFound:
+            self.cache.set(key, _ABSENT, ttl=self.neg_ttl)
+        except Exception as e:
+            log.debug("fetch_member 실패 uid=%s: %s", uid, e)
+        finally:
+            self._inflight.pop(key, None)
+            if not fut.done():
+                fut.set_result(result)
+        return result
+
+    async def author(self, msg: discord.Message) -> Optional[discord.Member]:
+        return await self.resolve(getattr(msg, "guild", None), msg.author.id, hint=msg.author)
+
+    async def owner(self, thread: discord.Thread) -> Optional[discord.Member]:
+        return await self.resolve(getattr(thread, "guild", None), getattr(thread, "owner_id", None) or 0)
@@ -1,10 +1,43 @@
 # guard/rules.py
-import json, os
+import hashlib, json, os, time
 from typing import Any
 
+from .detectors.matcher import KeywordMatcher
+from .detectors.normalize import Normalizer
+
+NEG_GROUP = "_neg"   # 매처 내부 그룹명: negations
+
 class Rules:
     def __init__(self, data: dict[str, Any]):
         self.data = data or {}
+        # compile() 결과
+        self.normalizer: Normalizer | None = None
+        self.kw: dict[str, list[str]] = {}        # 그룹 -> 정규화(condensed) 키워드
+        self.negations_norm: list[str] = []
+        self.nick_flags_norm: list[str] = []
+        self.matcher: KeywordMatcher | None = None
+        self.version = ""           # rules.json 내용 해시(핫 리로드 로그용)
+        self.compile_ms = 0.0
+
+    def compile(self) -> "Rules":
+        """
+        로드 시 1회: homoglyph 변환 테이블, 정규화된 키워드/부정어/닉 플래그,
+        keywords 그룹 + negations를 묶은 Aho-Corasick 오토마톤.
+        키워드도 본문과 같은 정규화를 거치므로 "g-coin"/"g coin"은 "gcoin"으로 매칭됨.
+        """
+        t0 = time.perf_counter()
+        self.normalizer = Normalizer(self.homoglyphs)
+        cond = self.normalizer.condense
+
+        def norm_list(xs) -> list[str]:
+            return list(dict.fromkeys(c for c in (cond((x or "").strip()) for x in (xs or [])) if c))
+
+        self.kw = {g: norm_list(terms) for g, terms in self.keywords.items()}
+        self.negations_norm = norm_list(self.negations)
+        self.nick_flags_norm = norm_list(self.nick_flags)
+        self.matcher = KeywordMatcher({**self.kw, NEG_GROUP: self.negations_norm})
+        self.compile_ms = (time.perf_counter() - t0) * 1000
+        return self
 
     def get(self, key: str, default=None):
         return self.data.get(key, default)
@@ -27,6 +60,8 @@ class Rules:
 def load_rules(path: str) -> Rules:
     if not os.path.exists(path):
         raise SystemExit(f"rules.json 필요: {path} 없음")
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return Rules(data)
+    with open(path, "rb") as f:
+        raw = f.read()
+    rules = Rules(json.loads(raw.decode("utf-8"))).compile()
+    rules.version = hashlib.sha1(raw).hexdigest()[:10]
+    return rules
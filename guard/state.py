@@ -2,36 +2,47 @@
 import asyncio, hashlib
 from dataclasses import dataclass, field
 from typing import Optional
-from time import time as _now
 
-class TTLSet:
-    def __init__(self, ttl_sec: int):
-        self.ttl = ttl_sec
-        self.store: dict[object, float] = {}
-    def add(self, key: object):
-        self.store[key] = _now() + self.ttl
-    def contains(self, key: object) -> bool:
-        exp = self.store.get(key)
-        if not exp: return False
-        if exp < _now():
-            self.store.pop(key, None)
-            return False
-        return True
-    def gc(self):
-        now = _now()
-        for k, exp in list(self.store.items()):
-            if exp < now: self.store.pop(k, None)
+from .config import Config
+from .executor import OffloadPool
+from .cache import LRUTTLCache, TTLSet
+from .resolver import MemberResolver
+from .fetch import Downloader
+from .enforce import Enforcer
+from .admission import Admission
+
+_DAY = 86400
 
 @dataclass
 class Caches:
-    msg_ttl: TTLSet = field(default_factory=lambda: TTLSet(20*60))
-    att_ttl: TTLSet = field(default_factory=lambda: TTLSet(20*60))
-    recent_text_hash: TTLSet = field(default_factory=lambda: TTLSet(10*60))  # 반복/크로스포스트
-    last_avatar_key: dict[int, Optional[str]] = field(default_factory=dict)
-    suspect_by_avatar: set[int] = field(default_factory=set)
-    first_msg_seen: set[int] = field(default_factory=set)
-    # Ban button idempotency: (guild_id, user_id, log_msg_id) -> exp_ts
-    ban_action_exp: dict[tuple[int,int,int], float] = field(default_factory=dict)
+    """
+    모든 봇 상태는 크기 상한 + 자동 만료 캐시(cache.LRUTTLCache/TTLSet)로만 보관.
+    용량은 init_state에서 cfg.cache_max_msgs / cfg.cache_max_users로 지정.
+    """
+    msg_ttl: TTLSet = field(default_factory=lambda: TTLSet(20*60, "msg_ttl"))
+    att_ttl: TTLSet = field(default_factory=lambda: TTLSet(20*60, "att_ttl"))
+    recent_text_hash: TTLSet = field(default_factory=lambda: TTLSet(10*60, "recent_text_hash"))  # 반복/크로스포스트
+    # 아바타 key 베이스라인: uid -> key (변경 이벤트 판정)
+    last_avatar_key: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("last_avatar_key", 100_000, 50*_DAY))
+    suspect_by_avatar: TTLSet = field(default_factory=lambda: TTLSet(50*_DAY, "suspect_by_avatar"))
+    first_msg_seen: TTLSet = field(default_factory=lambda: TTLSet(50*_DAY, "first_msg_seen"))
+    # Ban button idempotency: (guild_id, user_id, log_msg_id)
+    ban_action: TTLSet = field(default_factory=lambda: TTLSet(300, "ban_action"))
+    # 온디맨드 pHash 쿨다운: uid
+    phash_cooldown: TTLSet = field(default_factory=lambda: TTLSet(6*3600, "phash_cooldown"))
+    # 반복/크로스포스트 윈도: (uid, sig) -> {"count": int, "chs": set[int]}
+    repeat: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("repeat", 100_000, 600))
+    # QR 판정 캐시: 콘텐츠 다이제스트 -> 디코드 텍스트 튜플(빈 튜플 = QR 없음)
+    qr_verdict: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("qr_verdict", 4096, 6*3600))
+    # (선택) QR 양성 이미지의 dHash -> 텍스트 튜플 (재인코딩 사본용)
+    qr_phash: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("qr_phash", 512, 6*3600))
+    # 아바타 pHash 캐시: avatar key -> (hash_int, ref_version, dist, best_name)
+    avatar_phash: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("avatar_phash", 20000, 7*24*3600))
+    # 조인 윈도 내 유저의 최근 메시지: uid -> deque[(channel_id, message_id)] (제재 시 일괄 정리)
+    recent_msgs: LRUTTLCache = field(default_factory=lambda: LRUTTLCache("recent_msgs", 100_000, 3600))
+
+    def all(self) -> list[LRUTTLCache]:
+        return [v for v in vars(self).values() if isinstance(v, LRUTTLCache)]
 
 @dataclass
 class Counters:
@@ -43,22 +54,56 @@ class Counters:
 class Concurrency:
     qr_sem: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(2))
     phash_sem: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(3))
+    qr_pool: OffloadPool = field(default_factory=lambda: OffloadPool("qr"))
+    phash_pool: OffloadPool = field(default_factory=lambda: OffloadPool("phash", workers=3))
 
 @dataclass
 class State:
     caches: Caches
     counters: Counters
     conc: Concurrency
+    members: MemberResolver = field(default_factory=MemberResolver)
+    http: Downloader = field(default_factory=Downloader)
+    enforcer: Optional[Enforcer] = None
+    admission: Optional[Admission] = None
 
-def init_state(qr_sem_size: int, phash_sem_size: int) -> State:
-    return State(
-        caches=Caches(),
+def init_state(cfg: Config) -> State:
+    st = State(
+        caches=Caches(
+            msg_ttl=TTLSet(20*60, "msg_ttl", cfg.cache_max_msgs),
+            att_ttl=TTLSet(20*60, "att_ttl", cfg.cache_max_msgs),
+            recent_text_hash=TTLSet(10*60, "recent_text_hash", cfg.cache_max_msgs),
+            last_avatar_key=LRUTTLCache("last_avatar_key", cfg.cache_max_users, cfg.window_days * _DAY),
+            suspect_by_avatar=TTLSet(cfg.window_days * _DAY, "suspect_by_avatar", cfg.cache_max_users),
+            first_msg_seen=TTLSet(cfg.window_days * _DAY, "first_msg_seen", cfg.cache_max_users),
+            ban_action=TTLSet(300, "ban_action", 10_000),
+            phash_cooldown=TTLSet(cfg.phash_cooldown_h * 3600, "phash_cooldown", cfg.cache_max_users),
+            repeat=LRUTTLCache("repeat", cfg.cache_max_msgs, 600),
+            qr_verdict=LRUTTLCache("qr_verdict", cfg.qr_cache_size, cfg.qr_cache_ttl_sec),
+            qr_phash=LRUTTLCache("qr_phash", min(512, cfg.qr_cache_size), cfg.qr_cache_ttl_sec),
+            avatar_phash=LRUTTLCache("avatar_phash", cfg.phash_cache_size, cfg.phash_cache_ttl_h * 3600),
+            recent_msgs=LRUTTLCache("recent_msgs", cfg.cache_max_users, cfg.purge_recent_ttl_sec),
+        ),
         counters=Counters(),
+        members=MemberResolver(cfg.member_ttl_sec, cfg.member_neg_ttl_sec, cfg.cache_max_users),
+        http=Downloader(cfg.http_pool_size),
         conc=Concurrency(
-            qr_sem=asyncio.Semaphore(qr_sem_size),
-            phash_sem=asyncio.Semaphore(phash_sem_size),
+            qr_sem=asyncio.Semaphore(cfg.qr_sem),
+            phash_sem=asyncio.Semaphore(cfg.phash_sem),
+            qr_pool=OffloadPool(
+                "qr", kind=cfg.qr_pool, workers=cfg.qr_workers,
+                max_pending=cfg.qr_queue_max, timeout=cfg.qr_timeout_sec,
+            ),
+            # phash_sem이 in-flight를 제한하므로 워커 수 = 세마포어 크기
+            phash_pool=OffloadPool(
+                "phash", workers=cfg.phash_sem,
+                max_pending=cfg.phash_sem * 2, timeout=cfg.phash_timeout_sec,
+            ),
         ),
     )
+    st.enforcer = Enforcer(cfg, st.members, st.counters, st.caches.recent_msgs, cfg.enforce_workers)
+    st.admission = Admission(cfg, st.enforcer)
+    return st
 
 def norm_hash(text: str) -> str:
     return hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()
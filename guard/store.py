@@ -0,0 +1,202 @@
+# guard/store.py
+import asyncio, json, logging, sqlite3, threading, time
+from collections import deque
+from typing import Any, Optional
+
+from .cache import LRUTTLCache
+from . import metrics
+
+log = logging.getLogger("guard.store")
+
+# 재시작 후 의미 없는(또는 복원하면 위험한) 캐시는 제외
+_SKIP = {"ban_action"}
+_TABLE = "kv_json"      # 구 pickle 테이블(kv)은 읽지 않고 삭제
+
+# --- 직렬화 -------------------------------------------------------------------
+# pickle은 로드 시 임의 코드 실행 가능 → 캐시에 실제로 들어가는 타입만 태그 JSON으로.
+# 스칼라(None/bool/int/float/str)는 그대로, 컨테이너는 {"<태그>": ...} 1키 객체.
+
+def _enc(x: Any) -> Any:
+    if x is None or isinstance(x, (bool, int, float, str)):
+        return x
+    if isinstance(x, tuple):
+        return {"t": [_enc(i) for i in x]}
+    if isinstance(x, list):
+        return {"l": [_enc(i) for i in x]}
+    if isinstance(x, (bytes, bytearray)):
+        return {"b": bytes(x).hex()}
+    if isinstance(x, (set, frozenset)):
+        return {"s": [_enc(i) for i in x]}
+    if isinstance(x, deque):
+        return {"q": [_enc(i) for i in x], "n": x.maxlen}
+    if isinstance(x, dict):
+        return {"d": [[_enc(k), _enc(v)] for k, v in x.items()]}
+    raise TypeError(f"스냅샷 미지원 타입: {type(x).__name__}")
+
+def _dec(x: Any) -> Any:
+    if not isinstance(x, dict):
+        if isinstance(x, list):
+            raise ValueError("태그 없는 배열")
+        return x
+    if "t" in x: return tuple(_dec(i) for i in x["t"])
+    if "l" in x: return [_dec(i) for i in x["l"]]
+    if "b" in x: return bytes.fromhex(x["b"])
+    if "s" in x: return {_dec(i) for i in x["s"]}
+    if "q" in x: return deque((_dec(i) for i in x["q"]), maxlen=x.get("n"))
+    if "d" in x: return {_dec(k): _dec(v) for k, v in x["d"]}
+    raise ValueError(f"알 수 없는 태그: {sorted(x)}")
+
+def dumps(x: Any) -> str:
+    # 키는 DELETE 매칭에 쓰이므로 같은 값 → 같은 문자열(튜플/스칼라 키는 순서 고정)
+    return json.dumps(_enc(x), ensure_ascii=False, separators=(",", ":"))
+
+def loads(s: str) -> Any:
+    return _dec(json.loads(s))
+
+class Snapshot:
+    """
+    state.caches 영속화 — SQLite(WAL) 1파일.
+    - 체크포인트: 마지막 이후 변경된 키만 upsert/delete (LRUTTLCache.dirty)
+    - 로드: 기동 후 백그라운드에서 복원(봇은 바로 이벤트 처리, 복원 전 이벤트는 캐시 미스일 뿐)
+    - 만료 시각은 절대 시각(epoch)으로 저장 → 재시작 사이의 경과 시간도 TTL에 반영
+    - 키/값은 태그 JSON 텍스트(dumps/loads) — 파일을 쓸 수 있어도 복원 시 코드 실행 불가
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("DROP TABLE IF EXISTS kv")
+            db.execute(
+                f"CREATE TABLE IF NOT EXISTS {_TABLE} ("
+                " cache TEXT NOT NULL, k TEXT NOT NULL, exp REAL NOT NULL, v TEXT NOT NULL,"
+                " PRIMARY KEY (cache, k)) WITHOUT ROWID"
+            )
+            self._db = db
+        return self._db
+
+    @staticmethod
+    def _targets(caches) -> dict[str, LRUTTLCache]:
+        return {c.name: c for c in caches.all() if c.name not in _SKIP}
+
+    # --- 로드 -------------------------------------------------------------
+    def _read(self, names: list[str]) -> list[tuple[str, str, float, str]]:
+        with self._lock:
+            db = self._conn()
+            now = time.time()
+            db.execute(f"DELETE FROM {_TABLE} WHERE exp < ?", (now,))
+            db.commit()
+            q = f"SELECT cache, k, exp, v FROM {_TABLE} WHERE cache IN (%s) ORDER BY exp" % ",".join("?" * len(names))
+            return db.execute(q, names).fetchall()
+
+    async def load(self, caches) -> int:
+        t0 = time.perf_counter()
+        targets = self._targets(caches)
+        rows = await asyncio.to_thread(self._read, list(targets))
+        n = 0
+        for i, (name, k, exp, v) in enumerate(rows):
+            try:
+                targets[name].restore(loads(k), loads(v), exp)
+                n += 1
+            except Exception as e:
+                log.debug("스냅샷 항목 복원 실패(%s): %s", name, e)
+            if i % 5000 == 4999:
+                await asyncio.sleep(0)      # 대량 복원 중에도 이벤트 루프 양보
+        dt = time.perf_counter() - t0
+        metrics.set_gauge("snapshot_load_seconds", dt)
+        metrics.set_gauge("snapshot_loaded_rows", n)
+        log.info("스냅샷 로드: %d건 / %.0fms (%s)", n, dt * 1000, self.path)
+        return n
+
+    # --- 체크포인트 ---------------------------------------------------------
+    def _write(self, ups: list, dels: list):
+        with self._lock:
+            db = self._conn()
+            with db:
+                if dels:
+                    db.executemany(f"DELETE FROM {_TABLE} WHERE cache=? AND k=?", dels)
+                if ups:
+                    db.executemany(f"INSERT OR REPLACE INTO {_TABLE} (cache, k, exp, v) VALUES (?, ?, ?, ?)", ups)
+
+    def _collect(self, caches) -> tuple[list, list, list]:
+        """return (upserts, deletes, taken[(cache, 키들)]) — taken은 쓰기 실패 시 dirty 복구용"""
+        ups, dels, taken = [], [], []
+        for name, c in self._targets(caches).items():
+            if c.dirty is None:
+                continue
+            u, d = c.take_dirty()
+            if u or d:
+                taken.append((c, [k for k, _, _ in u] + d))
+            for k, exp, v in u:
+                try:
+                    ups.append((name, dumps(k), exp, dumps(v)))
+                except Exception as e:
+                    log.debug("스냅샷 직렬화 실패(%s): %s", name, e)
+            for k in d:
+                try:
+                    dels.append((name, dumps(k)))
+                except TypeError:
+                    pass
+        return ups, dels, taken
+
+    @staticmethod
+    def _untake(taken: list):
+        # 쓰기 실패 → 가져간 키를 dirty로 되돌려 다음 체크포인트에서 재시도(그 사이 바뀐 키와 합쳐짐)
+        for c, keys in taken:
+            if c.dirty is not None:
+                c.dirty.update(keys)
+        metrics.inc("snapshot_write_failed")
+
+    async def checkpoint(self, caches) -> int:
+        # 직렬화는 루프에서(캐시 일관성), 디스크 쓰기는 스레드에서
+        t0 = time.perf_counter()
+        ups, dels, taken = self._collect(caches)
+        if ups or dels:
+            try:
+                await asyncio.to_thread(self._write, ups, dels)
+            except BaseException:
+                self._untake(taken)
+                raise
+        metrics.observe("snapshot_checkpoint_seconds", time.perf_counter() - t0)
+        metrics.inc("snapshot_rows_written", len(ups) + len(dels))
+        return len(ups) + len(dels)
+
+    def checkpoint_sync(self, caches) -> int:
+        """종료 시 마지막 체크포인트(루프 없이)"""
+        ups, dels, taken = self._collect(caches)
+        if ups or dels:
+            try:
+                self._write(ups, dels)
+            except BaseException:
+                self._untake(taken)
+                raise
+        return len(ups) + len(dels)
+
+    async def run(self, caches, interval_sec: float):
+        """로드 후 주기 체크포인트 루프 (app.on_ready에서 1회 시작)"""
+        for c in self._targets(caches).values():
+            if c.dirty is None:
+                c.dirty = set()             # 복원 중 새로 쓴 키도 다음 체크포인트에 포함
+        try:
+            await self.load(caches)
+        except Exception as e:
+            log.warning("스냅샷 로드 실패(빈 캐시로 시작): %s", e)
+        while True:
+            await asyncio.sleep(interval_sec)
+            try:
+                n = await self.checkpoint(caches)
+                if n:
+                    log.debug("스냅샷 체크포인트: %d건", n)
+            except Exception as e:
+                log.warning("스냅샷 체크포인트 실패: %s", e)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
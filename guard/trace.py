@@ -0,0 +1,173 @@
+# guard/trace.py
+import contextvars, cProfile, io, logging, os, pstats, random, time
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from . import metrics
+
+log = logging.getLogger("guard.trace")
+
+# 느린 이벤트 덤프 전용 로거(회전 파일) — configure()에서 핸들러 장착, 상위 로거로 전파하지 않음
+_dump = logging.getLogger("guard.trace.slow")
+_dump.propagate = False
+
+_MAX_SPANS = 256            # 트레이스당 스팬 상한(레이드 중 메모리 보호)
+
+class _Cfg:
+    slow_ms: float = 0.0    # 0 = 끔
+    profile_rate: float = 0.0
+
+_CFG = _Cfg()
+_CUR: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("guard_span", default=None)
+_PROFILING = False          # cProfile은 스레드 전역 → 동시에 1개만
+
+class Span:
+    __slots__ = ("trace", "name", "parent", "t0", "t1", "attrs", "_token")
+
+    def __init__(self, trace: Optional["Trace"], name: str, parent: Optional["Span"], attrs: dict):
+        self.trace, self.name, self.parent, self.attrs = trace, name, parent, attrs
+        self.t0 = time.perf_counter()
+        self.t1 = 0.0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _CUR.set(self)
+        return self
+
+    def __exit__(self, et, ev, tb):
+        self.t1 = time.perf_counter()
+        if et is not None and et is not GeneratorExit:
+            self.attrs["error"] = et.__name__
+        _CUR.reset(self._token)
+        return False
+
+class _Noop:
+    """트레이스 밖(또는 꺼짐) — 속성 설정/진입 모두 무시"""
+    __slots__ = ()
+    def set(self, **attrs): pass
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _Noop()
+
+class Trace(Span):
+    """
+    이벤트 1건(on_message/on_thread_create 등)의 루트 스팬.
+    종료 시 slow_ms 이상이면 스팬 트리(+샘플링된 cProfile)를 회전 로그로 덤프.
+    """
+    __slots__ = ("tid", "spans", "prof")
+
+    def __init__(self, name: str, attrs: dict):
+        super().__init__(None, name, None, attrs)
+        self.trace = self
+        self.tid = os.urandom(6).hex()
+        self.spans: list[Span] = []
+        self.prof: Optional[cProfile.Profile] = None
+
+    def __enter__(self):
+        global _PROFILING
+        if _CFG.profile_rate > 0 and not _PROFILING and random.random() < _CFG.profile_rate:
+            # 루프 스레드 전체를 프로파일(이 이벤트 동안 함께 돈 다른 이벤트 포함)
+            _PROFILING = True
+            self.prof = cProfile.Profile()
+            self.prof.enable()
+        return super().__enter__()
+
+    def __exit__(self, et, ev, tb):
+        global _PROFILING
+        super().__exit__(et, ev, tb)
+        if self.prof is not None:
+            self.prof.disable()
+            _PROFILING = False
+        ms = (self.t1 - self.t0) * 1000
+        if ms >= _CFG.slow_ms:
+            metrics.inc("trace_slow", kind=self.name)
+            try:
+                _dump.warning(self.render())
+            except Exception as e:
+                log.debug("트레이스 덤프 실패: %s", e)
+        return False
+
+    def render(self) -> str:
+        ms = (self.t1 - self.t0) * 1000
+        head = f"trace {self.tid} {self.name} {ms:.1f}ms {_fmt_attrs(self.attrs)}".rstrip()
+        kids: dict[int, list[Span]] = {}
+        for s in self.spans:
+            kids.setdefault(id(s.parent), []).append(s)
+        lines = [head]
+
+        def walk(parent: Span, depth: int):
+            for s in sorted(kids.get(id(parent), ()), key=lambda s: s.t0):
+                dur = f"{(s.t1 - s.t0) * 1000:8.1f}" if s.t1 else "   (open)"
+                lines.append(f"  +{(s.t0 - self.t0) * 1000:8.1f} {dur}ms {'  ' * depth}{s.name} {_fmt_attrs(s.attrs)}".rstrip())
+                walk(s, depth + 1)
+
+        walk(self, 0)
+        if len(self.spans) >= _MAX_SPANS:
+            lines.append(f"  ... 스팬 {_MAX_SPANS}개 초과분 생략")
+        if self.prof is not None:
+            buf = io.StringIO()
+            pstats.Stats(self.prof, stream=buf).sort_stats("cumulative").print_stats(25)
+            lines.append(buf.getvalue().rstrip())
+        return "\n".join(lines)
+
+def _fmt_attrs(attrs: dict) -> str:
+    return " ".join(f"{k}={v}" for k, v in attrs.items())
+
+# --- API ----------------------------------------------------------------------
+
+def configure(slow_ms: float, log_path: str = "", max_bytes: int = 10 << 20, backups: int = 3,
+              profile_rate: float = 0.0):
+    _CFG.slow_ms = max(0.0, slow_ms)
+    _CFG.profile_rate = max(0.0, min(1.0, profile_rate))
+    for h in list(_dump.handlers):
+        _dump.removeHandler(h)
+        h.close()
+    _dump.propagate = not log_path      # 파일 미지정 → 일반 로그로
+    if _CFG.slow_ms and log_path:
+        h = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        h.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _dump.addHandler(h)
+
+def start(name: str, **attrs):
+    """이벤트 루트(꺼져 있으면 no-op). 사용: with trace.start("on_message", mid=...):"""
+    if not _CFG.slow_ms:
+        return _NOOP
+    return Trace(name, attrs)
+
+def span(name: str, **attrs):
+    """현재 트레이스 안이면 자식 스팬, 아니면 no-op (비활성 시 ContextVar 조회 1회)"""
+    parent = _CUR.get()
+    if parent is None:
+        return _NOOP
+    tr = parent.trace
+    if len(tr.spans) >= _MAX_SPANS:
+        return _NOOP
+    s = Span(tr, name, parent, attrs)
+    tr.spans.append(s)
+    return s
+
+def current() -> Optional[Span]:
+    return _CUR.get()
+
+class within:
+    """
+    다른 태스크(큐 워커 등)에서 제출 시점의 스팬 아래로 이어 붙이기.
+    parent=None이면 트레이스 밖으로 — 워커가 생성 시점에 물려받은 스팬에 붙지 않게.
+    """
+    __slots__ = ("parent", "_token")
+
+    def __init__(self, parent: Optional[Span]):
+        self.parent = parent
+        self._token = None
+
+    def __enter__(self):
+        self._token = _CUR.set(self.parent)
+        return self
+
+    def __exit__(self, *exc):
+        _CUR.reset(self._token)
+        return False
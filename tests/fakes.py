@@ -0,0 +1,71 @@
+# tests/fakes.py — 디스코드 객체 최소 대체(제재/조회/로그 전송 경로 테스트용)
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+class Channel:
+    def __init__(self, cid: int):
+        self.id = cid
+        self.bulk: list[list[int]] = []     # delete_messages 호출별 메시지 ID
+        self.single: list[int] = []         # Message.delete 호출
+        self.sent: list[dict] = []          # send 호출별 kwargs(content 포함)
+        self.send_delay = 0.0
+
+    async def send(self, content=None, **kw):
+        await asyncio.sleep(self.send_delay)
+        self.sent.append({"content": content, **kw})
+
+    async def delete_messages(self, msgs):
+        await asyncio.sleep(0)
+        self.bulk.append(sorted(m.id for m in msgs))
+
+class Member:
+    def __init__(self, uid: int, ban_fails: bool = False):
+        self.id = uid
+        self.ban_fails = ban_fails
+        self.bans = 0
+        self.timeouts = 0
+
+    async def ban(self, reason: str = ""):
+        self.bans += 1
+        await asyncio.sleep(0.01)
+        if self.ban_fails:
+            raise discord.Forbidden(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+
+    async def edit(self, **kw):
+        self.timeouts += 1
+
+class Guild:
+    def __init__(self, gid: int = 1):
+        self.id = gid
+        self.members: dict[int, Member] = {}
+        self.channels: dict[int, Channel] = {}
+        self.fetches = 0
+
+    def channel(self, cid: int) -> Channel:
+        return self.channels.setdefault(cid, Channel(cid))
+
+    def get_member(self, uid: int):
+        return None             # 게이트웨이 캐시 미스 → 항상 REST 경로
+
+    def get_channel_or_thread(self, cid: int):
+        return self.channels.get(cid)
+
+    async def fetch_member(self, uid: int):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        m = self.members.get(uid)
+        if m is None:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Member")
+        return m
+
+class Message:
+    def __init__(self, mid: int, guild: Guild, channel: Channel, uid: int):
+        self.id = mid
+        self.guild = guild
+        self.channel = channel
+        self.author = SimpleNamespace(id=uid)
+
+    async def delete(self):
+        self.channel.single.append(self.id)
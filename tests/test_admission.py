@@ -0,0 +1,30 @@
+# tests/test_admission.py
+import dataclasses
+from types import SimpleNamespace
+
+from guard.config import load_config
+from guard.admission import Admission
+
+def _msg(uid: int, cid: int = 2):
+    return SimpleNamespace(author=SimpleNamespace(id=uid), channel=SimpleNamespace(id=cid), guild=SimpleNamespace(id=3))
+
+def test_over_rate_user_keeps_cheap_qr_pass():
+    cfg = dataclasses.replace(load_config(), admit_user_rate=0.5, admit_user_burst=5,
+                              admit_channel_rate=0, admit_max_inflight=0, shed_lag_sec=0)
+    adm = Admission(cfg)
+    got = [adm.admit(_msg(1)) for _ in range(10)]
+    assert all(a.qr for a in got)
+    assert all(a.qr_escalate for a in got[:5])
+    assert not any(a.qr_escalate for a in got[5:])
+    assert got[-1].reason == "user_rate"
+
+def test_channel_buckets_are_bounded():
+    cfg = dataclasses.replace(load_config(), admit_user_rate=0, admit_channel_rate=1.0, admit_channel_burst=2,
+                              admit_max_inflight=0, shed_lag_sec=0)
+    adm = Admission(cfg)
+    for cid in range(adm._channels.maxsize + 500):
+        adm.admit(_msg(1, cid))
+    assert len(adm._channels) == adm._channels.maxsize
+    # 최근 채널 버킷은 유지 → 같은 채널 도배는 계속 제한
+    got = [adm.admit(_msg(1, cid)).qr_escalate for _ in range(3)]
+    assert got == [True, False, False]
@@ -0,0 +1,47 @@
+# tests/test_avatar.py
+import asyncio, os
+
+from guard.config import load_config
+from guard.state import init_state
+from guard.detectors import avatar
+
+class _Asset:
+    """discord.Asset 대체: with_format/with_size 체인 + read()"""
+    def __init__(self, key: str, data: bytes):
+        self.key, self._data = key, data
+    def with_format(self, _fmt): return self
+    def with_size(self, _size): return self
+    async def read(self): return self._data
+
+def test_avatar_verdict_real_image():
+    cfg = load_config()
+    state = init_state(cfg)
+    try:
+        assert avatar.load_refs(cfg) > 0
+        ref = sorted(f for f in os.listdir(cfg.phish_dir) if not f.startswith("."))[0]
+        with open(os.path.join(cfg.phish_dir, ref), "rb") as f:
+            data = f.read()
+        verdict = asyncio.run(avatar._avatar_verdict(_Asset("k1", data), state))
+        assert verdict is not None
+        dist, best = verdict
+        assert dist <= cfg.phash_threshold
+        # 같은 key 재조회는 캐시 히트(다운로드/해시 없음)
+        assert asyncio.run(avatar._avatar_verdict(_Asset("k1", b""), state)) == verdict
+    finally:
+        state.conc.qr_pool.shutdown()
+        state.conc.phash_pool.shutdown()
+
+def test_large_palette_reference_is_indexed(tmp_path):
+    # 짧은 변 ≥ 512px인 팔레트/1비트 PNG도 레퍼런스로 로드되어야 함(reduce 전 모드 정규화)
+    from PIL import Image
+    from guard.bench import fixtures
+
+    base = fixtures.photo_noise(640, 600, seed=3).convert("RGB")
+    base.quantize(64).save(tmp_path / "pal.png")
+    base.convert("1").save(tmp_path / "bw.png")
+    index = avatar.build_refs(str(tmp_path))
+    assert sorted(index.names) == ["bw.png", "pal.png"]
+    with Image.open(tmp_path / "pal.png") as im:
+        assert im.mode == "P"
+        h = avatar.hash_to_int(avatar._phash_image(im))
+    assert index.nearest(h)[0] == 0
@@ -0,0 +1,122 @@
+# tests/test_emit.py
+import asyncio
+
+import discord
+
+from guard import emit as emit_mod
+from guard.emit import LogDispatcher, _Item, _MAX_EMBED_CHARS, _MAX_EMBEDS, _MAX_TEXT
+from tests.fakes import Channel
+
+CID = 100
+
+def _dispatcher(**kw):
+    d = LogDispatcher(client=None, **kw)
+    ch = d._channels[CID] = Channel(CID)
+    return d, ch
+
+def _emb(i: int, chars: int = 0) -> _Item:
+    return _Item("MESSAGE", embed=discord.Embed(title=f"e{i}", description="x" * chars or None))
+
+def _text(i: int, chars: int = 10) -> _Item:
+    return _Item("QR", text=f"{i:04d}" + "q" * (chars - 4))
+
+def _titles(sent: dict) -> list[str]:
+    return [e.title for e in sent.get("embeds") or [sent["embed"]]]
+
+def _run(items, **kw):
+    # 워커가 돌기 전에 전부 적재 → 큐에 쌓인 상태에서 배치 구성
+    async def main():
+        d, ch = _dispatcher(**kw)
+        for it in items:
+            d.put(CID, it)
+        await d.flush(timeout=2.0)
+        return ch.sent
+    return asyncio.run(main())
+
+def test_embed_batch_count_boundary():
+    sent = _run([_emb(i) for i in range(23)])
+    assert [len(s["embeds"]) for s in sent] == [_MAX_EMBEDS, _MAX_EMBEDS, 3]
+    assert sum((_titles(s) for s in sent), []) == [f"e{i}" for i in range(23)]
+
+def test_embed_batch_char_boundary():
+    # 임베드 1개 = 제목 2 + 설명 → 정확히 한도의 1/3: 3개까지 합치고 4번째는 다음 메시지
+    items = [_emb(i, _MAX_EMBED_CHARS // 3 - 2) for i in range(7)]
+    assert len(items[0].embed) * 3 == _MAX_EMBED_CHARS
+    sent = _run(items)
+    assert [len(s["embeds"]) for s in sent] == [3, 3, 1]
+
+def test_text_batch_boundary():
+    sent = _run([_text(i, 600) for i in range(7)])
+    assert [s["content"].count("\n\n") + 1 for s in sent] == [3, 3, 1]
+    assert all(len(s["content"]) <= _MAX_TEXT for s in sent)
+    # 정확히 한도까지는 합침
+    sent = _run([_text(0, 999), _text(1, 999), _text(2, 10)])
+    assert [len(s["content"]) for s in sent] == [_MAX_TEXT, 10]
+
+def test_button_and_kind_changes_split_batches():
+    btn = _Item("MESSAGE", embed=discord.Embed(title="b"), button=True)
+    sent = _run([_emb(0), _emb(1), btn, _emb(2), _text(3), _emb(4)])
+    shape = [("text" if s["content"] else "view" if s.get("view") else "embeds", len(_titles(s)) if not s["content"] else 1)
+             for s in sent]
+    assert shape == [("embeds", 2), ("view", 1), ("embeds", 1), ("text", 1), ("embeds", 1)]
+
+def test_overflow_summarize():
+    sent = _run([_text(i) for i in range(3)] + [_emb(i) for i in range(4)], maxsize=3)
+    assert [s["content"][:4] for s in sent[:-1]] == ["0000"]
+    assert sent[0]["content"].count("\n\n") == 2
+    assert sent[-1]["content"] == "[로그 4건 생략: MESSAGE 4] (큐 포화)"
+
+def test_overflow_drop_new():
+    sent = _run([_text(i) for i in range(6)], maxsize=3, overflow="drop_new")
+    assert len(sent) == 1
+    assert [ln[:4] for ln in sent[0]["content"].split("\n\n")] == ["0000", "0001", "0002"]
+
+def test_overflow_drop_oldest():
+    sent = _run([_text(i) for i in range(6)], maxsize=3, overflow="drop_oldest")
+    assert len(sent) == 1
+    assert [ln[:4] for ln in sent[0]["content"].split("\n\n")] == ["0003", "0004", "0005"]
+
+def test_flush_sends_pending_before_cancel():
+    async def main():
+        d, ch = _dispatcher()
+        ch.send_delay = 0.02
+        btn = lambda i: _Item("MESSAGE", embed=discord.Embed(title=f"b{i}"), button=True)
+        for i in range(5):
+            d.put(CID, btn(i))
+        await asyncio.sleep(0)                  # 워커가 첫 전송 중일 때 종료 시작
+        await d.flush(timeout=2.0)
+        await asyncio.sleep(0)
+        return ch, d
+    ch, d = asyncio.run(main())
+    assert [s["embed"].title for s in ch.sent] == [f"b{i}" for i in range(5)]
+    assert all(t.done() for t in d._workers.values())
+
+def test_flush_timeout_cancels_workers():
+    async def main():
+        d, ch = _dispatcher()
+        ch.send_delay = 1.0
+        d.put(CID, _text(0))
+        await d.flush(timeout=0.05)
+        await asyncio.sleep(0)
+        return ch, d
+    ch, d = asyncio.run(main())
+    assert ch.sent == []
+    assert all(t.cancelled() for t in d._workers.values())
+
+def test_bot_close_flushes_dispatcher():
+    from guard.app import _GuardBot
+
+    async def main():
+        bot = _GuardBot(command_prefix="!", intents=discord.Intents.none())
+        d = emit_mod._DISPATCHER = LogDispatcher(bot)
+        ch = d._channels[CID] = Channel(CID)
+        ch.send_delay = 0.01
+        for i in range(3):
+            d.put(CID, _text(i))
+        await bot.close()
+        return ch
+    try:
+        ch = asyncio.run(main())
+    finally:
+        emit_mod._DISPATCHER = None
+    assert [ln[:4] for ln in ch.sent[0]["content"].split("\n\n")] == ["0000", "0001", "0002"]
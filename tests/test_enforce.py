@@ -0,0 +1,69 @@
+# tests/test_enforce.py
+import asyncio, dataclasses
+from collections import deque
+
+from guard.cache import LRUTTLCache
+from guard.config import load_config
+from guard.enforce import Enforcer
+from guard.resolver import MemberResolver
+from tests.fakes import Guild, Member, Message
+
+def _enforcer(**over):
+    cfg = dataclasses.replace(load_config(), policy_qr="delete_timeout", policy_message="delete_timeout",
+                              ban_on_qr=True, ban_on_strict=True, ban_on_normal=False, **over)
+    return Enforcer(cfg, MemberResolver(), recent=LRUTTLCache("recent_msgs", 100, 3600), workers=4)
+
+def test_concurrent_submits_share_one_ban():
+    async def go():
+        g = Guild()
+        member = g.members[7] = Member(7)
+        ch = g.channel(10)
+        enf = _enforcer()
+        effects = await asyncio.gather(*(enf.submit("QR", Message(100 + i, g, ch, 7), None) for i in range(2)))
+        return member, effects
+    member, effects = asyncio.run(go())
+    assert member.bans == 1
+    assert all(e.startswith("Ban") for e in effects)
+
+def test_deletes_batched_per_channel_single_falls_back():
+    async def go():
+        g = Guild()
+        a, b = g.channel(10), g.channel(20)
+        enf = _enforcer()
+        oks = await asyncio.gather(*(enf._delete(Message(100 + i, g, a, i)) for i in range(3)),
+                                   enf._delete(Message(200, g, b, 9)))
+        return a, b, oks
+    a, b, oks = asyncio.run(go())
+    assert all(oks)
+    assert a.bulk == [[100, 101, 102]] and a.single == []
+    assert b.bulk == [] and b.single == [200]
+
+def _with_recent(enf: Enforcer, g: Guild, uid: int):
+    # 같은 유저의 다른 채널 크로스포스트 사본 2건
+    other = g.channel(30)
+    enf.recent.set(uid, deque([(other.id, 301), (other.id, 302)]))
+    return other
+
+def test_failed_ban_purges_recent():
+    async def go():
+        g = Guild()
+        g.members[7] = Member(7, ban_fails=True)
+        enf = _enforcer()
+        other = _with_recent(enf, g, 7)
+        effect = await enf.submit("QR", Message(100, g, g.channel(10), 7), None)
+        return other, effect
+    other, effect = asyncio.run(go())
+    assert "Ban" not in effect
+    assert other.bulk == [[301, 302]]
+
+def test_successful_ban_skips_purge():
+    async def go():
+        g = Guild()
+        g.members[7] = Member(7)
+        enf = _enforcer()
+        other = _with_recent(enf, g, 7)
+        effect = await enf.submit("QR", Message(100, g, g.channel(10), 7), None)
+        return other, effect
+    other, effect = asyncio.run(go())
+    assert effect.startswith("Ban")
+    assert other.bulk == []     # 밴이 최근 메시지를 지우므로 생략
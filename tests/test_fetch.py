@@ -0,0 +1,152 @@
+# tests/test_fetch.py
+import asyncio
+import io
+import struct
+import zlib
+
+import pytest
+from aiohttp import web
+from PIL import Image
+
+from guard.fetch import Downloader, FetchRejected, _jpeg_size, sniff
+
+def _enc(fmt: str, size=(37, 21), mode="RGB", **kw) -> bytes:
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 10, 10, 128)[:len(mode)]).save(buf, fmt, **kw)
+    return buf.getvalue()
+
+def _png_header(w: int, h: int) -> bytes:
+    # IHDR만 있는 PNG(데이터 없음) — 픽셀 폭탄 흉내
+    ihdr = struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr
+            + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr)))
+
+def _jpeg_header(w: int, h: int, sof: int = 0xC0, app: bytes = b"") -> bytes:
+    out = b"\xff\xd8"
+    if app:
+        out += b"\xff\xe1" + struct.pack(">H", len(app) + 2) + app
+    out += b"\xff\xff"                                          # 채움 바이트
+    return out + bytes([0xFF, sof]) + struct.pack(">HBHHB", 11, 8, h, w, 3) + b"\x00" * 9
+
+_REAL = [
+    ("png", _enc("PNG")),
+    ("png", _enc("PNG", mode="P")),
+    ("gif", _enc("GIF")),
+    ("jpeg", _enc("JPEG")),
+    ("jpeg", _enc("JPEG", progressive=True)),
+    ("jpeg", _enc("JPEG", exif=b"Exif\x00\x00" + b"\x00" * 4000)),   # SOF가 APP1 뒤
+    ("webp", _enc("WEBP", quality=80)),                             # VP8
+    ("webp", _enc("WEBP", lossless=True)),                          # VP8L
+    ("webp", _enc("WEBP", mode="RGBA", quality=80)),                # VP8X
+    ("bmp", _enc("BMP")),
+]
+
+def test_sniff_real_images():
+    for fmt, b in _REAL:
+        assert sniff(b) == (fmt, (37, 21)), fmt
+
+def test_sniff_crafted_headers():
+    cases = [
+        (_png_header(50000, 40000), ("png", (50000, 40000))),
+        (_png_header(1, 1)[:20], ("png", None)),                   # IHDR 치수 전까지만 도착
+        (b"GIF89a" + struct.pack("<HH", 65535, 65535), ("gif", (65535, 65535))),
+        (b"GIF87a\x01", ("gif", None)),
+        (_jpeg_header(30000, 20000), ("jpeg", (30000, 20000))),
+        (_jpeg_header(640, 480, sof=0xC2, app=b"x" * 300), ("jpeg", (640, 480))),
+        (_jpeg_header(640, 480, app=b"x" * 300)[:200], ("jpeg", None)),  # SOF 전에 잘림
+        (b"\xff\xd8\x00\x00" + b"\x00" * 20, None),                # 마커 아님
+        (b"RIFF\x00\x00\x00\x00WEBPVP8 ", ("webp", None)),
+        (b"RIFF\x00\x00\x00\x00WEBPXXXX" + b"\x00" * 20, None),    # 모르는 청크
+        (b"BM" + b"\x00" * 16 + struct.pack("<ii", 100, -200), ("bmp", (100, 200))),  # top-down
+        (b"<html>", None),
+        (b"", None),
+    ]
+    for head, want in cases:
+        assert sniff(head) == want, head[:16]
+
+def test_jpeg_size_skips_segments():
+    b = _jpeg_header(123, 45, app=b"y" * 1000)
+    assert _jpeg_size(b) == (123, 45)
+    assert _jpeg_size(b[:500]) is None
+    with pytest.raises(ValueError):
+        _jpeg_size(b"\xff\xd8\x00\x00" + b"\x00" * 20)
+
+def _reason(head, max_pixels=0, formats=None, final=False):
+    try:
+        return Downloader._check_head(head, max_pixels, formats, len(head), final)
+    except FetchRejected as e:
+        assert e.bytes == len(head)
+        return e.reason
+
+def test_check_head_reasons():
+    png, jpg = _enc("PNG"), _enc("JPEG")
+    assert _reason(png, 37 * 21) is True
+    assert _reason(png, 37 * 21 - 1) == "pixels"
+    assert _reason(_png_header(50000, 40000), 64_000_000) == "pixels"
+    assert _reason(_jpeg_header(30000, 20000) + b"\x00" * 16, 64_000_000) == "pixels"
+    assert _reason(b"<!doctype html><html><body>.....") == "bad_magic"
+    assert _reason(jpg, 0, frozenset({"png", "webp"})) == "format"
+    assert _reason(jpg, 0, frozenset({"jpeg"})) is True
+    assert _reason(png[:20]) is False                              # 32바이트 전에는 보류
+    assert _reason(png[:20], final=True) is True                   # 끝까지 받았는데 치수 없음 → 통과
+    assert _reason(b"<html>", final=True) == "bad_magic"
+
+def _serve(routes):
+    async def start():
+        app = web.Application()
+        for path, h in routes.items():
+            app.router.add_get(path, h)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://127.0.0.1:{port}"
+    return start()
+
+def test_fetch_image_guards():
+    big = _enc("PNG", size=(600, 600))
+    bomb = _png_header(50000, 40000) + b"\x00" * 200_000
+
+    async def body(req):
+        return web.Response(body=big)
+
+    async def stream(req):
+        # content-length 없이 청크 전송 → 스트리밍 중 누적 바이트로 차단
+        resp = web.StreamResponse()
+        resp.enable_chunked_encoding()
+        await resp.prepare(req)
+        for i in range(0, len(big), 4096):
+            await resp.write(big[i:i + 4096])
+        return resp
+
+    async def bomb_h(req):
+        return web.Response(body=bomb)
+
+    async def html(req):
+        return web.Response(text="<!doctype html>" + "x" * 100, content_type="text/html")
+
+    async def main():
+        runner, base = await _serve({"/b": body, "/s": stream, "/bomb": bomb_h, "/html": html})
+        dl = Downloader(timeout_sec=5)
+        out = {}
+        try:
+            assert await dl.fetch_image(base + "/b", len(big), 600 * 600) == big
+            for path, kw in (("/b", dict(max_bytes=len(big) - 1)),
+                             ("/s", dict(max_bytes=len(big) - 1)),
+                             ("/bomb", dict(max_bytes=10 << 20, max_pixels=64_000_000)),
+                             ("/html", dict(max_bytes=10 << 20)),
+                             ("/b", dict(max_bytes=10 << 20, formats=frozenset({"jpeg"})))):
+                with pytest.raises(FetchRejected) as ei:
+                    await dl.fetch_image(base + path, **kw)
+                out[path, ei.value.reason] = ei.value.bytes
+        finally:
+            await dl.close()
+            await runner.cleanup()
+        return out
+
+    out = asyncio.run(main())
+    assert set(out) == {("/b", "too_large"), ("/s", "too_large"), ("/bomb", "pixels"),
+                        ("/html", "bad_magic"), ("/b", "format")}
+    assert 0 < out["/s", "too_large"] <= len(big) + 64 * 1024
+    assert out["/bomb", "pixels"] < len(bomb)                      # 헤더만 보고 중단
@@ -0,0 +1,58 @@
+# tests/test_matcher.py
+import os
+import random
+import re
+
+from guard.detectors.matcher import KeywordMatcher
+from guard import rules as _rules_mod
+from guard.rules import NEG_GROUP, load_rules
+
+_RULES = load_rules(os.path.join(os.path.dirname(_rules_mod.__file__), "rules.json"))
+
+def _regex_scan(groups, text):
+    # 기준: 용어별 정규식 전수 스캔(겹침 포함) — Aho-Corasick 이전 방식과 같은 히트 집합
+    out = set()
+    for g, terms in groups.items():
+        for t in dict.fromkeys(t for t in terms if t):
+            for m in re.finditer("(?=" + re.escape(t) + ")", text):
+                out.add((g, t, m.start()))
+    return out
+
+_CASES = [
+    ({"a": ["he", "she", "his", "hers"]}, "ushers"),
+    ({"a": ["a", "aa", "aaa"]}, "aaaaa"),
+    ({"a": ["abc"], "b": ["bc", "c"]}, "xabcabcx"),
+    ({"a": ["프로필"], "b": ["프로필확인", "확인"]}, "프로필확인프로필확인해"),
+    ({"a": ["gcoin"], "b": ["coin", "oin"]}, "gcoingcoin"),
+    ({"a": ["x"], "b": ["x"]}, "xx"),                   # 같은 용어가 여러 그룹
+    ({"a": ["", "ab"]}, "abab"),                        # 빈 용어 무시
+    ({}, "anything"),
+    ({"a": ["zz"]}, ""),
+]
+
+def test_scan_table_matches_regex():
+    for groups, text in _CASES:
+        got = {tuple(m) for m in KeywordMatcher(groups).scan(text)}
+        assert got == _regex_scan(groups, text), (groups, text)
+
+def test_match_end():
+    m = KeywordMatcher({"a": ["프로필"]}).scan("내프로필")[0]
+    assert (m.start, m.end) == (1, 4)
+
+def test_rules_matcher_matches_regex_on_random_text():
+    # 실제 rules.json 키워드/부정어 + 그 조각들로 만든 본문에서 히트 집합이 정규식과 같아야 함
+    groups = {**_RULES.kw, NEG_GROUP: _RULES.negations_norm}
+    terms = [t for ts in groups.values() for t in ts]
+    alphabet = sorted({ch for t in terms for ch in t}) + ["x", "1"]
+    rnd = random.Random(0)
+    for _ in range(300):
+        parts = []
+        for _ in range(rnd.randint(0, 12)):
+            if rnd.random() < 0.4:
+                t = rnd.choice(terms)
+                parts.append(t[:rnd.randint(1, len(t))])
+            else:
+                parts.append("".join(rnd.choice(alphabet) for _ in range(rnd.randint(1, 3))))
+        text = "".join(parts)
+        got = {tuple(m) for m in _RULES.matcher.scan(text)}
+        assert got == _regex_scan(groups, text), text
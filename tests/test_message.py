@@ -0,0 +1,109 @@
+# tests/test_message.py
+import os
+
+from guard import rules as _rules_mod
+from guard.detectors.message import negation_guard, negation_match, preview_with_spans, scan_message
+from guard.rules import load_rules
+
+_RULES = load_rules(os.path.join(os.path.dirname(_rules_mod.__file__), "rules.json"))
+ZW = "\u200b"
+
+def _baseline(content, rules):
+    # 매처 이전 점수 계산(condensed 문자열 find/in) — 키워드는 compile()과 같이 정규화된 목록 사용
+    cond = rules.normalizer(content).condensed
+    k, w = rules.kw, rules.get("weights") or {}
+    win = int((rules.sensitivity or {}).get("near_window", 12))
+    score, reasons, hits = 0, [], []
+    ah, bh = [], []
+    for a in k.get("profile", []):
+        i = cond.find(a)
+        if i == -1:
+            continue
+        seg = cond[i + len(a): i + len(a) + win]
+        for b in k.get("visit", []):
+            if b in seg:
+                ah.append(a); bh.append(b)
+                break
+    if ah:
+        score += int(w.get("profile_visit", 40)); reasons.append("프로필+방문")
+        hits += list(dict.fromkeys(ah)) + list(dict.fromkeys(bh))
+    for g, label in (("reward", "보상/수령/이벤트"), ("gcoin", "G-COIN")):
+        terms = [x for x in k.get(g, []) if x in cond]
+        if terms:
+            score += int(w.get(g, 25)); reasons.append(label); hits += terms
+    return score, reasons, list(dict.fromkeys(hits))
+
+_SCORE_CASES = [
+    "",
+    "안녕하세요 오늘 경기 재밌었어요",
+    "프로필 방문해주세요",
+    "프로필은 나중에 봐요 아주 아주 아주 길게 말하면서 방문",     # 창 밖
+    "제 рrоfilе 에서 이벤트 보상 확인",
+    "프" + ZW + "로" + ZW + "필 들어가서 클" + ZW + "릭",
+    "프 로-필 . 방_문 / 쿠폰코드 지급",
+    "ＧＣＯＩＮ 무료 지급 g-coin g coin 지-코인",
+    "내정보 내소개 소개 링크 url 주소",
+    "한정판 기간한정 한정 스킨 코스튬 패치보상",
+    "profileprofile visitvisit",
+    "자료 " + "x" * 9 + "확인",                                   # 창 경계 안
+    "자료 " + "x" * 11 + "확인",                                  # 창 경계 밖
+]
+
+def test_scan_matches_baseline():
+    for text in _SCORE_CASES:
+        sc = scan_message(text, _RULES)
+        assert (sc.score, sc.reasons, sc.hits) == _baseline(text, _RULES), text
+
+# (본문, hit 용어, 면책 기대) — window=20은 condensed 글자 수 기준
+_NEG_CASES = [
+    ("프로필 확인 주의", ["프로필"], True),
+    ("프로필" + " " * 40 + "주의", ["프로필"], True),                   # 구분자는 거리에 안 셈
+    ("프로필" + ZW * 40 + "주의", ["프로필"], True),                    # zero-width도 마찬가지
+    ("프로필 주" + ZW + "의", ["프로필"], True),                         # 부정어 안의 zero-width
+    ("클릭하지 - 마 " + "클릭", ["클릭"], True),
+    ("프로필" + "가" * 18 + "주의", ["프로필"], True),                  # 오른쪽 끝이 창 끝과 일치
+    ("프로필" + "가" * 19 + "주의", ["프로필"], False),                 # 한 글자 넘침
+    ("프로필" + " 가" * 18 + " 주 의", ["프로필"], True),               # 같은 거리, 사이사이 구분자
+    ("프로필" + " 가" * 19 + " 주 의", ["프로필"], False),
+    ("주의" + "가" * 18 + "프로필", ["프로필"], True),                  # 왼쪽 창 시작
+    ("주의" + "가" * 19 + "프로필", ["프로필"], False),
+    ("주의" + (ZW + "-") * 30 + "가" * 19 + "프로필", ["프로필"], False),
+    ("프로필 방문", ["프로필"], False),
+    ("주의 프로필", ["없는용어"], False),
+    ("주의 프로필", [], False),
+]
+
+def test_negation_table():
+    for text, terms, want in _NEG_CASES:
+        sc = scan_message(text, _RULES)
+        assert (negation_match(sc, terms) is not None) == want, text
+        assert negation_guard(sc, terms, _RULES) == want, text
+        assert negation_guard(text, terms, _RULES) == want, text
+
+def test_negation_span_maps_to_original():
+    text = "프로필 확인 " + ZW + "주" + ZW + "  의!!"
+    sc = scan_message(text, _RULES)
+    (a, b), neg = negation_match(sc, ["프로필"])
+    assert sc.norm.orig_text(a, b) == "프로필"
+    assert sc.norm.orig_text(neg.start, neg.end) == "주" + ZW + "  의"
+
+_PREVIEW_CASES = [
+    ("프로필 방문", ["프로필", "방문"], "**프로필** **방문**"),
+    ("제 рrоfilе 방문!", ["profile", "방문"], "제 **рrоfilе** **방문**!"),
+    ("프" + ZW + "로 필*에서", ["프로필"], "**프" + ZW + "로 필**\\*에서"),
+    ("ｇ-ｃｏｉｎ_지급", ["gcoin", "지급"], "**ｇ-ｃｏｉｎ**\\_**지급**"),
+    ("프로필확인", ["프로필", "프로필확인", "확인"], "**프로필확인**"),      # 겹치는 구간 병합
+    ("아무 말", ["프로필"], "아무 말"),
+]
+
+def test_preview_table():
+    for text, terms, want in _PREVIEW_CASES:
+        sc = scan_message(text, _RULES)
+        assert preview_with_spans(sc, terms) == want, text
+
+def test_preview_extra_span():
+    text = "프로필 보고 조심하세요"
+    sc = scan_message(text, _RULES)
+    (_, _), neg = negation_match(sc, ["프로필"])
+    extra = [sc.norm.orig_span(neg.start, neg.end)]
+    assert preview_with_spans(sc, ["프로필"], extra) == "**프로필** 보고 **조심**하세요"
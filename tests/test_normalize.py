@@ -0,0 +1,71 @@
+# tests/test_normalize.py
+import os
+import unicodedata
+
+from guard import rules as _rules_mod
+from guard.detectors.normalize import NONWORD, ZERO_WIDTH, Normalizer
+from guard.rules import load_rules
+
+_RULES = load_rules(os.path.join(os.path.dirname(_rules_mod.__file__), "rules.json"))
+_NORM = _RULES.normalizer
+
+def _baseline(text, homo):
+    # 단일 패스 정규화 이전 구현(매 호출 maketrans)
+    s = unicodedata.normalize("NFKC", text or "")
+    s = s.translate(str.maketrans(homo))
+    s = ZERO_WIDTH.sub("", s).lower()
+    return s, NONWORD.sub("", s)
+
+# (원문, condensed에서 찾을 용어, 기대 원문 구간)
+_SPANS = [
+    ("내 프로필 보세요", "프로필", "프로필"),
+    ("рrоfilе open", "profile", "рrоfilе"),                 # 키릴 homoglyph
+    ("ΡROFILE", "profile", "ΡROFILE"),                      # 그리스 대문자 + lower
+    ("ｐｒｏｆｉｌｅ!!", "profile", "ｐｒｏｆｉｌｅ"),       # 전각(NFKC)
+    ("프\u200b로\u200d필 확인", "프로필", "프\u200b로\u200d필"),
+    ("\ufeff\u2060프로필", "프로필", "프로필"),              # 앞쪽 zero-width는 구간 밖
+    ("프 로-필", "프로필", "프 로-필"),
+    ("g . - coin", "gcoin", "g . - coin"),
+    ("지__·__코  인", "지코인", "지__·__코  인"),
+    ("보상" + unicodedata.normalize("NFD", "받기"), "받기", unicodedata.normalize("NFD", "받기")),
+    (unicodedata.normalize("NFD", "프로필") + " 방문", "프로필", unicodedata.normalize("NFD", "프로필")),
+    ("㈜이벤트", "이벤트", "이벤트"),                        # NFKC 확장(1→3) 뒤 오프셋
+    ("ﬁle 선물", "선물", "선물"),                            # 합자 확장 뒤 오프셋
+    ("e\u0301vent 보상", "보상", "보상"),                    # 결합 악센트 뒤 오프셋
+]
+
+def test_matches_baseline_normalize():
+    homo = _RULES.homoglyphs
+    for text, _, _ in _SPANS:
+        n = _NORM(text)
+        assert (n.s, n.condensed) == _baseline(text, homo), text
+
+def test_orig_span_table():
+    for text, term, want in _SPANS:
+        n = _NORM(text)
+        i = n.condensed.find(term)
+        assert i >= 0, (text, term)
+        assert n.orig_text(i, i + len(term)) == want, (text, term)
+
+def test_c_s_points_at_word_chars():
+    for text, _, _ in _SPANS:
+        n = _NORM(text)
+        assert len(n.c_s) == len(n.condensed)
+        assert "".join(n.s[j] for j in n.c_s) == n.condensed
+
+def test_multi_char_homoglyph_disables_identity():
+    # 1:N 치환("@"→"at") 뒤 글자는 원문 오프셋이 밀리므로 세그먼트 맵을 써야 함
+    norm = Normalizer({"@": "at", "0": "o"})
+    n = norm("c@ 0k")
+    assert not norm.len_safe
+    assert n.condensed == "catok"
+    i = n.condensed.find("ok")
+    assert n.orig_text(i, i + 2) == "0k"
+
+def test_empty_and_degenerate_spans():
+    n = _NORM("")
+    assert (n.s, n.condensed) == ("", "")
+    assert n.orig_span(0, 1) == (0, 0)
+    n = _NORM("프로필")
+    assert n.orig_span(2, 2) == (0, 0)
+    assert n.orig_span(1, 99) == (1, 3)             # 끝 초과는 마지막 글자로 클램프
@@ -0,0 +1,120 @@
+# tests/test_qr.py
+import io
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import Image
+
+from guard.bench import fixtures
+from guard.detectors.qr import decode_pipeline, resized_url
+
+_URL = "https://scam.example/verify?id=8f3a9c2e11&ref=steam-gift"
+
+def _proxy(im: Image.Image, url: str) -> Image.Image:
+    q = dict(parse_qsl(urlsplit(url).query))
+    small = im.resize((int(q["width"]), int(q["height"])), Image.BILINEAR)
+    return Image.open(io.BytesIO(fixtures.encode(small, "WEBP", quality=80)))
+
+def test_proxy_negative_keeps_small_qr():
+    # 원본에서 디코드되는 작은 QR은 축소본에서도 히트 또는 likely(→ 원본 폴백)여야 함
+    for (w, h), sides in (((3000, 4000), (200, 260)), ((1440, 3120), (160, 220))):
+        bg = fixtures.screenshot(w, h, seed=1)
+        for side in sides:
+            im = fixtures.paste_qr(bg, _URL, side)
+            assert decode_pipeline(im).texts
+            att = SimpleNamespace(width=w, height=h, proxy_url="https://media.example/a.png")
+            url = resized_url(att, 1280, 4.0)
+            if url is None:
+                continue
+            r = decode_pipeline(_proxy(im, url))
+            assert r.texts or r.likely, (w, h, side, url)
+
+def test_corpus_recall_matches_baseline():
+    # 단계 파이프라인 이전 디코더(전 변형 × 전 바이너라이저)는 이 코퍼스 양성을 전부 찾음
+    from guard.bench.qr_corpus import build_corpus, run, summarize
+    s = summarize(run(build_corpus(seed=0, scale=1), 120.0, 500.0, 1))
+    for group, row in s.items():
+        assert row["fp"] == 0 and row["wrong"] == 0, group
+        assert row["recall"] in (None, 1.0), (group, row["recall"])
+
+def test_dhash_collision_does_not_reuse_texts():
+    # 같은 템플릿 스크린샷의 다른 QR — dHash가 겹쳐도 캐시된 피싱 URL을 돌려주면 안 됨
+    import asyncio, dataclasses
+    from guard.config import load_config
+    from guard.state import init_state
+    from guard.detectors.qr import decode_qr_bytes
+
+    cfg = dataclasses.replace(load_config(), qr_cache_phash=True)
+    state = init_state(cfg)
+    bg = fixtures.screenshot(1080, 2340, seed=7)
+    phish = fixtures.encode(fixtures.paste_qr(bg, "https://phish.example/a", 200, (60, 1800)))
+    legit = fixtures.encode(fixtures.paste_qr(bg, "https://legit.example/b", 200, (60, 1800)))
+
+    async def go():
+        a = await decode_qr_bytes(phish, cfg, state)
+        b = await decode_qr_bytes(legit, cfg, state)
+        return a, b
+    try:
+        a, b = asyncio.run(go())
+    finally:
+        state.conc.qr_pool.shutdown()
+        state.conc.phash_pool.shutdown()
+    assert a.dhash is not None and a.dhash == b.dhash
+    assert a.texts == ["https://phish.example/a"]
+    assert b.texts == ["https://legit.example/b"]
+
+def test_untyped_attachment_is_scanned():
+    from guard.config import load_config
+    from guard.detectors.qr import is_scannable_attachment
+    cfg = load_config()
+    att = lambda ct: SimpleNamespace(content_type=ct, size=1000)
+    assert is_scannable_attachment(att("application/octet-stream"), cfg)
+    assert is_scannable_attachment(att(None), cfg)
+    assert is_scannable_attachment(att("image/png"), cfg)
+    assert not is_scannable_attachment(att("video/mp4"), cfg)
+
+def test_repost_after_proxy_fallback_still_detected():
+    # 축소본: 파인더는 보이나 못 읽음(likely) → 원본에서 검출. 같은 바이트의 재게시(새 첨부 ID)도 검출돼야 함
+    import asyncio
+    import numpy as np
+    from guard.config import load_config
+    from guard.state import init_state
+    from guard.handlers.on_message_qr import scan_attachments
+
+    cfg = load_config()
+    state = init_state(cfg)
+    url = "https://phish.example/repost"
+    q = fixtures.qr_image(url, module_px=8)
+    a = np.array(q)
+    n = a.shape[0]
+    rng = np.random.default_rng(0)
+    a[n // 3: 2 * n // 3, n // 3: 2 * n // 3] = rng.integers(0, 2, (2 * n // 3 - n // 3,) * 2) * 255
+    proxy_bytes = fixtures.encode(Image.fromarray(a, "L"))
+    orig_bytes = fixtures.encode(q)
+    assert not decode_pipeline(Image.fromarray(a, "L")).texts
+
+    blobs: dict = {}
+    fetched: list = []
+
+    class _Http:
+        async def fetch_image(self, u, *args, **kw):
+            fetched.append(u)
+            return blobs[u]
+
+    def att(i: int):
+        a = SimpleNamespace(id=i, url=f"https://cdn.example/{i}.png", proxy_url=f"https://media.example/{i}.png",
+                            width=2000, height=2000, content_type="image/png", size=len(orig_bytes))
+        blobs[a.url] = orig_bytes
+        blobs[resized_url(a, cfg.qr_proxy_side, cfg.qr_min_module_px)] = proxy_bytes
+        return a
+
+    state.http = _Http()
+    try:
+        first = asyncio.run(scan_attachments([att(1)], cfg, state))
+        second = asyncio.run(scan_attachments([att(2)], cfg, state))
+    finally:
+        state.conc.qr_pool.shutdown()
+        state.conc.phash_pool.shutdown()
+    assert first == [url]
+    assert second == [url]
+    assert "https://cdn.example/2.png" in fetched
@@ -0,0 +1,27 @@
+# tests/test_resolver.py
+import asyncio
+
+from guard.resolver import MemberResolver
+from tests.fakes import Guild, Member
+
+def test_concurrent_resolves_share_one_fetch():
+    async def go():
+        g = Guild()
+        g.members[5] = Member(5)
+        r = MemberResolver()
+        got = await asyncio.gather(*(r.resolve(g, 5) for _ in range(5)))
+        return g, got
+    g, got = asyncio.run(go())
+    assert g.fetches == 1
+    assert all(m is got[0] for m in got) and got[0].id == 5
+
+def test_not_found_is_cached_negatively():
+    async def go():
+        g = Guild()
+        r = MemberResolver(neg_ttl_sec=60)
+        first = await r.resolve(g, 404)
+        second = await r.resolve(g, 404)
+        return g, first, second
+    g, first, second = asyncio.run(go())
+    assert first is None and second is None
+    assert g.fetches == 1
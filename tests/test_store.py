@@ -0,0 +1,106 @@
+# tests/test_store.py
+import asyncio, os
+
+import pytest
+
+from guard.cache import LRUTTLCache
+from guard.store import Snapshot
+
+class _Caches:
+    def __init__(self):
+        self.c = LRUTTLCache("kv", 100, 3600)
+        self.c.dirty = set()
+    def all(self):
+        return [self.c]
+
+def test_failed_checkpoint_keeps_dirty_keys(tmp_path, monkeypatch):
+    caches = _Caches()
+    caches.c.set("a", 1)
+    caches.c.set("b", 2)
+    snap = Snapshot(os.fspath(tmp_path / "snap.db"))
+
+    def boom(*_):
+        raise OSError("disk full")
+    with monkeypatch.context() as m:
+        m.setattr(snap, "_write", boom)
+        with pytest.raises(OSError):
+            asyncio.run(snap.checkpoint(caches))
+    assert caches.c.dirty == {"a", "b"}
+
+    assert asyncio.run(snap.checkpoint(caches)) == 2
+    fresh = _Caches()
+    assert asyncio.run(snap.load(fresh)) == 2
+    assert fresh.c.get("b") == 2
+    snap.close()
+
+def test_roundtrip_cache_value_shapes(tmp_path):
+    # 실제 캐시에 들어가는 키/값 모양 그대로 왕복
+    from collections import deque
+    from guard.config import load_config
+    from guard.state import init_state
+
+    st = init_state(load_config())
+    c = st.caches
+    for x in c.all():
+        x.dirty = set()
+    ring = deque([(10, 11), (10, 12)], maxlen=3)
+    c.msg_ttl.add("1:2:3")
+    c.att_ttl.add(123456789012345678)
+    c.last_avatar_key.set(7, "a_0f3c")
+    c.last_avatar_key.set(8, None)
+    c.repeat.set((7, "프로필방문"), {"count": 2, "chs": {10, 11}})
+    c.qr_verdict.set(b"\x00\xffdigest", (("https://x.example/a",), True))
+    c.qr_verdict.set(b"\x01", ((), True))
+    c.qr_phash.set(2**63 + 5, ("https://x.example/a",))
+    c.avatar_phash.set("a_0f3c", (2**64 - 1, 12345, 3, "ref.png"))
+    c.recent_msgs.set(7, ring)
+    snap = Snapshot(os.fspath(tmp_path / "snap.db"))
+    asyncio.run(snap.checkpoint(c))
+
+    fresh = init_state(load_config()).caches
+    assert asyncio.run(snap.load(fresh)) == 10
+    assert fresh.msg_ttl.contains("1:2:3") and fresh.att_ttl.contains(123456789012345678)
+    assert fresh.last_avatar_key.get(7) == "a_0f3c" and 8 in fresh.last_avatar_key
+    assert fresh.repeat.get((7, "프로필방문")) == {"count": 2, "chs": {10, 11}}
+    assert fresh.qr_verdict.get(b"\x00\xffdigest") == (("https://x.example/a",), True)
+    assert fresh.qr_verdict.get(b"\x01") == ((), True)
+    assert fresh.qr_phash.get(2**63 + 5) == ("https://x.example/a",)
+    assert fresh.avatar_phash.get("a_0f3c") == (2**64 - 1, 12345, 3, "ref.png")
+    got = fresh.recent_msgs.get(7)
+    got.append((10, 13)); got.append((10, 14))
+    assert list(got) == [(10, 12), (10, 13), (10, 14)]         # maxlen 유지
+
+    # 삭제도 같은 키 문자열로 반영
+    c.repeat.pop((7, "프로필방문"))
+    asyncio.run(snap.checkpoint(c))
+    again = init_state(load_config()).caches
+    assert asyncio.run(snap.load(again)) == 9
+    snap.close()
+
+def test_pickle_rows_are_never_loaded(tmp_path):
+    import pickle, sqlite3, time
+
+    class _Boom:
+        def __reduce__(self):
+            return (os.system, ("touch " + os.fspath(tmp_path / "pwned"),))
+
+    path = os.fspath(tmp_path / "snap.db")
+    db = sqlite3.connect(path)
+    # 구 스키마(kv, pickle BLOB) 파일에 악성 행
+    db.execute("CREATE TABLE kv (cache TEXT, k BLOB, exp REAL, v BLOB, PRIMARY KEY(cache, k)) WITHOUT ROWID")
+    db.execute("INSERT INTO kv VALUES ('kv', ?, ?, ?)", (pickle.dumps("a"), time.time() + 60, pickle.dumps(_Boom())))
+    db.commit(); db.close()
+
+    snap = Snapshot(path)
+    caches = _Caches()
+    assert asyncio.run(snap.load(caches)) == 0
+    assert not (tmp_path / "pwned").exists()
+    # 새 테이블에 pickle/모르는 태그를 넣어도 데이터로만 취급(복원 실패 → 건너뜀)
+    db = snap._conn()
+    rows = [("kv", '"p"', pickle.dumps(_Boom())), ("kv", '"u"', '{"x":1}'), ("kv", '"l"', "[1]"), ("kv", '"ok"', '{"t":[1,"a"]}')]
+    db.executemany("INSERT INTO kv_json VALUES (?, ?, ?, ?)", [(c, k, time.time() + 60, v) for c, k, v in rows])
+    db.commit()
+    assert asyncio.run(snap.load(caches)) == 1
+    assert caches.c.get("ok") == (1, "a") and "p" not in caches.c
+    assert not (tmp_path / "pwned").exists()
+    snap.close()